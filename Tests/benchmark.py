@@ -0,0 +1,165 @@
+"""
+Benchmark of the hot paths of AddressBook. It is not a test, run it from the root of the repository:
+
+    python -m Tests.benchmark --sizes 1000 100000 --output new.json --compare old.json
+
+Books are filled by the seeded generator, so results of different commits are measured on the same data.
+Time is the best of '--repeat' runs, peak memory is measured by tracemalloc in a separate run
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+import assistant
+
+SIZES = (1000, 100000, 1000000)
+SEED = 2024
+AS_OF = date(2024, 6, 1)  # fixed date for days_to_birthday, so the results do not depend on the day of the run
+
+
+def add_records_one_by_one(book_class, rows: list[tuple]) -> assistant.AddressBook:
+    """fills new book with Name, Birthday, Phone and Record objects the way code using the book does"""
+    book = book_class()
+    for name, birthday, phones in rows:
+        record = assistant.Record(assistant.Name(name), birthday=assistant.Birthday(birthday) if birthday else None)
+        for phone in phones:
+            record.add_phone(assistant.Phone(phone))
+        book.add_record(record)
+    return book
+
+
+def get_benchmarks(book: assistant.AddressBook, tmp_dir: str, workers: int) -> dict:
+    """returns functions to measure in the order of running (files are loaded after they are dumped)"""
+    json_file = os.path.join(tmp_dir, 'address_book.json')
+    pickle_file = os.path.join(tmp_dir, 'address_book.bin')
+    names = list(book.data)
+    hit = names[len(names) // 2].split()[-1]  # last name of the record in the middle of the book
+    rows = [(key, record.birthday.value if record.birthday else None, [phone.value for phone in record.phones])
+            for key, record in book.data.items()]
+    return {
+        'add_record': lambda: add_records_one_by_one(type(book), rows),
+        'add_records_bulk': lambda: type(book)().add_records_bulk(rows),
+        'search_hit': lambda: book.search(hit),
+        'search_miss': lambda: book.search('zzzz'),
+        'fuzzy_search': lambda: book.fuzzy_search(hit[:2] + hit[3:]),  # last name with a missed letter
+        'search_parallel_hit': lambda: book.search_parallel(hit, workers=workers),
+        'search_parallel_miss': lambda: book.search_parallel('zzzz', workers=workers),
+        'iter_pages': lambda: sum(len(page) for page in book),
+        'str': lambda: str(book),
+        'render_page': lambda: book.render_page(40),
+        'json_dump': lambda: book.json_dump(json_file),
+        'json_load': lambda: type(book).json_load(json_file),
+        'pickle_dump': lambda: book.pickle_dump(pickle_file),
+        'pickle_load': lambda: type(book).pickle_load(pickle_file),
+        'days_to_birthday': lambda: [record.days_to_birthday(AS_OF) for record in book.data.values()],
+    }
+
+
+def measure(func, repeat: int, memory: bool) -> dict:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    result = {'time': min(times)}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        func()
+        result['peak_memory'] = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+    return result
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, book_class, repeat: int, memory: bool, workers: int, only=None) -> dict:
+    results = {}
+    for size in sizes:
+        book = book_class()
+        start = time.perf_counter()
+        book.add_fake_records(size, seed=SEED)
+        print(f'{book_class.__name__} with {size} records generated in {time.perf_counter() - start:.2f} s')
+        results[str(size)] = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, func in get_benchmarks(book, tmp_dir, workers).items():
+                if only and name not in only:
+                    continue
+                result = results[str(size)][name] = measure(func, repeat, memory)
+                memory_text = f"{result['peak_memory'] / 2 ** 20:10.1f} MiB" if memory else ''
+                print(f"  {name:<22}{result['time'] * 1000:12.2f} ms{memory_text}")
+        book.stop_search_workers()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """prints ratios of new and old times and returns the names of benchmarks which are slower than 'threshold'"""
+    regressions = []
+    print(f"Comparison with {baseline.get('commit') or 'baseline'} (new time / old time):")
+    for size, benchmarks in results.items():
+        for name, result in benchmarks.items():
+            old = baseline['results'].get(size, {}).get(name)
+            if old is None:
+                continue
+            ratio = result['time'] / old['time'] if old['time'] else float('inf')
+            mark = ''
+            if ratio > threshold:
+                mark = '  SLOWER'
+                regressions.append(f'{name}[{size}]')
+            print(f'  {name:<22}{size:>9}{ratio:8.2f}x{mark}')
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark of AddressBook hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='numbers of records')
+    parser.add_argument('--book', default='AddressBook', choices=('AddressBook', 'ColumnarAddressBook'))
+    parser.add_argument('--only', nargs='+', help='names of benchmarks to run')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes of search_parallel')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every benchmark, the best time is taken')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure peak memory')
+    parser.add_argument('--output', help='json file to save the results')
+    parser.add_argument('--compare', help='json file with results of another run')
+    parser.add_argument('--threshold', type=float, default=1.2, help='ratio of times reported as regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, getattr(assistant, args.book), args.repeat, not args.no_memory, args.workers,
+                  args.only)
+    report = {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'book': args.book,
+        'workers': args.workers,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            print('Regressions:', ', '.join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import csv
+import os
+import tempfile
+from datetime import date, datetime
+from assistant import AddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of add_records_bulk and from_csv methods of AddressBook ... ", end='')
+    rows = [
+        {'name': 'Олена Петренко', 'birthday': '04.03.1990',
+         'phones': ['+38 (067) 123-45-67', '0501112233']},
+        {'name': "Дар'я Бондар-Коваль", 'birthday': None, 'phones': []},
+        ('Leap Day', date(2000, 2, 29), '0671234567; 0509876543'),
+        ('Іван Франко', datetime(1986, 8, 27, 12, 30), [380671234567]),
+        {'name': 'No', 'birthday': None, 'phones': []},
+        {'name': 'Bad!Name', 'birthday': None, 'phones': []},
+        {'name': 'Future Person', 'birthday': date.today().replace(year=date.today().year + 1), 'phones': []},
+        {'name': 'Too Old', 'birthday': '01.01.1800', 'phones': []},
+        {'name': 'Wrong Date', 'birthday': '31.02.1990', 'phones': []},
+        {'name': 'Short Phone', 'birthday': None, 'phones': ['12345']},
+        {'name': 'Letter Phone', 'birthday': None, 'phones': ['067abc4567']},
+        {'birthday': None, 'phones': []},
+    ]
+    address_book = AddressBook(search_index=True)
+    errors = address_book.add_records_bulk(rows)
+    assert [row_number for row_number, _ in errors] == list(range(4, 12)), errors
+    assert errors[0][1] == 'Name is too short. Must be minimum 3 characters'
+    assert errors[1][1] == 'Name contains not allowed signs'
+    assert errors[4][1].startswith('unconverted data') or 'day is out of range' in errors[4][1]
+    assert errors[5][1] == 'Phone is too short. Must be minimum 7 digits'
+    assert errors[6][1] == 'Phone contains not allowed signs'
+
+    expected = AddressBook()
+    record = Record(Name('Олена Петренко'), phone=Phone('+38 (067) 123-45-67'),
+                    birthday=Birthday(date(1990, 3, 4)))
+    record.add_phone(Phone('0501112233'))
+    expected.add_record(record)
+    expected.add_record(Record(Name("Дар'я Бондар-Коваль")))
+    record = Record(Name('Leap Day'), phone=Phone('0671234567'), birthday=Birthday(date(2000, 2, 29)))
+    record.add_phone(Phone('0509876543'))
+    expected.add_record(record)
+    expected.add_record(Record(Name('Іван Франко'), phone=Phone('380671234567'),
+                               birthday=Birthday(date(1986, 8, 27))))
+    assert str(address_book) == str(expected)
+    assert ([[rec.name.value for rec in page] for page in address_book]
+            == [[rec.name.value for rec in page] for page in expected])
+
+    # added records are linked to the book and its indexes
+    assert [rec.name.value for rec in address_book.find_by_phone('0509876543')] == ['Leap Day']
+    assert [rec.name.value for rec in address_book.search('франко')] == ['Іван Франко']
+    address_book['Leap Day'].phones[0].value = '0631112233'
+    assert [rec.name.value for rec in address_book.find_by_phone('0631112233')] == ['Leap Day']
+    assert (address_book['Олена Петренко'].days_to_birthday()
+            == expected['Олена Петренко'].days_to_birthday())
+
+    # the row with the name which is already in the book replaces the record
+    assert (address_book.add_records_bulk([('Іван Франко', None, '067空1234567')])
+            == [(0, 'Phone contains not allowed signs')])
+    assert (address_book.add_records_bulk([('Іван Франко', None, '067²1234567')])
+            == [(0, 'Phone contains not allowed signs')])
+    assert address_book.add_records_bulk([('Іван Франко', None, '٠٩٩٧٧٧٦٦٥٥')]) == []
+    assert address_book['Іван Франко'].phones[0].value == '0997776655'
+    assert address_book.add_records_bulk([('Іван Франко', None, '0997776655')]) == []
+    assert [rec.name.value for rec in address_book.find_by_phone('0997776655')] == ['Іван Франко']
+    assert [rec.name.value for rec in address_book.find_by_phone('380671234567')] == ['Олена Петренко']
+    rows = [('Новий Запис', '01.02.1990', '0441112233'), ('Ще Один', None, '0442223344'),
+            ('Новий Запис', None, '0443334455')]
+    assert address_book.add_records_bulk(rows) == []
+    assert address_book.find_by_phone('0441112233') == []
+    assert 'Новий Запис' not in [rec.name.value for rec in address_book.upcoming_birthdays(366)]
+    found = address_book.find_by_phone_prefix('044')
+    assert [rec.name.value for rec in found] == ['Ще Один', 'Новий Запис']
+
+    # the checks are the same as in the setters of the fields
+    for name, birthday, phone in (('Ok Name', '01.01.1800', '0671234567'), ('Ok Name', None, '067-12'),
+                                  ('N!', None, '0671234567'), (42, None, '0671234567'), ('Ok Name', None, '')):
+        errors = AddressBook().add_records_bulk([(name, birthday, [phone])])
+        try:
+            Record(Name(name), phone=Phone(phone), birthday=Birthday(datetime.strptime(birthday, '%d.%m.%Y'))
+                   if birthday else None)
+        except (TypeError, ValueError) as error:
+            assert errors == [(0, str(error))], (errors, error)
+        else:
+            assert False, name
+
+    # only the text of phones may have empty items between the separators
+    assert AddressBook().add_records_bulk([('Ok Name', None, ['', '0671234567'])]) == [
+        (0, 'Phone is too short. Must be minimum 7 digits')]
+    assert AddressBook().add_records_bulk([('Ok Name', None, ';0671234567, ')]) == []
+
+    fake_book = AddressBook()
+    fake_book.add_fake_records(300)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'contacts.csv')
+        with open(filename, 'w', encoding='utf-8', newline='') as fh:
+            writer = csv.writer(fh, delimiter=';')
+            writer.writerow(['name', 'birthday', 'phones'])
+            for record in fake_book.data.values():
+                birthday = str(record.birthday) if record.birthday else ''
+                writer.writerow([record.name.value, birthday, ','.join(phone.value for phone in record.phones)])
+            writer.writerow(['x', '', ''])
+        csv_book, errors = AddressBook.from_csv(filename, delimiter=';')
+    assert errors == [(len(fake_book), 'Name is too short. Must be minimum 3 characters')]
+    assert str(csv_book) == str(fake_book)
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
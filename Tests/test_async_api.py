@@ -0,0 +1,103 @@
+import asyncio
+import os
+import tempfile
+from assistant import AddressBook, ColumnarAddressBook, SQLiteAddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of asyncio API of AddressBook ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(1500, seed=11)
+
+    def names(records):
+        return [rec.name.value for rec in records]
+
+    async def collect(async_iterable):
+        return [item async for item in async_iterable]
+
+    async def check(book, tmp_dir):
+        json_filename = os.path.join(tmp_dir, 'address_book.json')
+        binary_filename = os.path.join(tmp_dir, 'address_book.bin')
+        await book.json_dump_async(json_filename)
+        loaded = await type(book).json_load_async(json_filename)
+        assert str(loaded) == str(book)
+        await book.pickle_dump_async(binary_filename)
+        loaded = await type(book).pickle_load_async(binary_filename)
+        assert str(loaded) == str(book)
+        assert sorted(os.listdir(tmp_dir)) == ['address_book.bin', 'address_book.json']  # no temporary files left
+
+        for phrase in ('1972', 'ОЛЕ', 'оле', 'None', '|38', 'zzz', ''):
+            for ignore_case in (True, False):
+                found = await collect(book.search_async(phrase, ignore_case, chunk_size=100))
+                assert names(found) == names(book.search(phrase, ignore_case)), (phrase, ignore_case)
+        pages = await collect(book)
+        assert [names(page) for page in pages] == [names(page) for page in book]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(check(address_book, tmp_dir))
+    address_book.enable_search_index()
+    columnar_book = ColumnarAddressBook()
+    for record in list(address_book.data.values())[:300]:
+        birthday = Birthday(record.birthday.value) if record.birthday else None
+        columnar_book.add_record(Record(Name(record.name.value), birthday=birthday))
+    for book in (address_book, columnar_book):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            asyncio.run(check(book, tmp_dir))
+
+    # the snapshot saved in the executor does not see changes made after it is taken
+    for book in (address_book, columnar_book):
+        expected = str(book)
+        snapshot = book._snapshot()
+        name = next(iter(book.data))
+        book[name].add_phone(Phone('0631234567'))
+        book[name].birthday = None
+        del book[next(iter(book.data))]
+        book.add_record(Record(Name('Пізніше Доданий'), phone=Phone('0671234567')))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'address_book.bin')
+            type(book)._pickle_dump_snapshot(snapshot, filename)
+            loaded = type(book).pickle_load(filename)
+        assert type(loaded) is type(book) and str(loaded) == expected
+
+    # the database opened by the loader in the executor is used in the thread of the event loop
+    async def load_sqlite(tmp_dir):
+        json_filename = os.path.join(tmp_dir, 'address_book.json')
+        address_book.json_dump(json_filename)
+        return await SQLiteAddressBook.json_load_async(json_filename, os.path.join(tmp_dir, 'address_book.db'))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sqlite_book = asyncio.run(load_sqlite(tmp_dir))
+        assert names(sqlite_book.search('оле')) == names(address_book.search('оле'))
+        sqlite_book.add_record(Record(Name('Після Завантаження'), phone=Phone('0671234567')))
+        assert len(sqlite_book) == len(address_book) + 1
+        found = asyncio.run(collect(sqlite_book.search_async('Після')))
+        assert names(found) == ['Після Завантаження']
+        sqlite_book.close()
+
+    # other tasks run between the chunks, changes made by them do not break the search and paging
+    async def search_while_changing():
+        ticks = []
+
+        async def change_book():
+            for name in list(address_book.data)[:50]:
+                ticks.append(name)
+                del address_book[name]
+                address_book.add_record(Record(Name(name + ' Новий'), phone=Phone('0671234567')))
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(change_book())
+        found = await collect(address_book.search_async('а', chunk_size=10))
+        changed_during_search = len(ticks)
+        pages = await collect(address_book)
+        await task
+        return changed_during_search, found, pages
+
+    changed_during_search, found, pages = asyncio.run(search_while_changing())
+    assert changed_during_search > 0
+    assert all('а' in rec.name.value.lower() or 'а' in str(rec) for rec in found)
+    assert all(rec.name.value in address_book for page in pages for rec in page)
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,76 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date
+
+import cli
+from assistant import AddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of command line interface with snapshot cache ... ", end='')
+    code = 'import sys, assistant; print("faker" in sys.modules)'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=root,
+                          check=True).stdout.split() == ['False']
+
+    address_book = AddressBook()
+    address_book.add_fake_records(300, seed=24)
+    address_book.add_record(Record(Name('Олена Петренко'), phone=Phone('0671234567'),
+                                   birthday=Birthday(date(1990, 5, 17))))
+
+    def run(*argv):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            result = cli.main(['--file', json_file, *argv])
+        return result, output.getvalue()
+
+    def opened():
+        book, how = cli.open_book(json_file)
+        if how != 'new':
+            book.close()
+        return how
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = os.path.join(tmp_dir, 'address_book.json')
+        assert opened() == 'new'
+        address_book.json_dump(json_file)
+        assert opened() == 'rebuilt'
+        assert opened() == 'cache'
+        os.utime(json_file, ns=(0, 0))
+        assert opened() == 'revalidated'
+        assert opened() == 'cache'
+
+        assert run('show', '--page', '2', '--size', '15') == (0, address_book.render_page(2, 15))
+        result, output = run('search', 'петренко')
+        assert result == 0 and output == AddressBook._render_table(
+            [f'{i:>4} |' + str(record) + '\n' for i, record in enumerate(address_book.search('петренко'), 1)])
+        result, output = run('birthdays', '--days', '366')
+        assert result == 0 and 'Олена Петренко' in output
+
+        assert run('add', 'Олена Петренко', '--phone', '0501112233')[0] == 0
+        assert run('add', 'Ірина Нова', '--phone', '0631112233', '--birthday', '01.02.2003')[0] == 0
+        assert opened() == 'cache'  # the snapshot is saved together with the json file
+        saved = AddressBook.json_load(json_file)
+        assert [phone.value for phone in saved['Олена Петренко'].phones] == ['0671234567', '0501112233']
+        assert saved['Ірина Нова'].birthday.value == date(2003, 2, 1)
+        assert len(saved) == len(address_book) + 1
+        assert run('add', 'Ір') == (1, '')
+        assert run('add', 'Ірина Нова', '--phone', '12') == (1, '')
+        assert len(AddressBook.json_load(json_file)) == len(saved)
+
+        # the json file changed by someone else is loaded again
+        address_book.json_dump(json_file)
+        assert opened() == 'rebuilt'
+        assert 'Ірина Нова' not in run('search', 'Нова')[1]
+        with open(json_file + cli.CACHE_SUFFIX, 'ab') as fh:
+            fh.write(b'broken')
+        assert opened() == 'rebuilt'
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,92 @@
+import os
+import pickle
+import tempfile
+from datetime import date
+from assistant import AddressBook, ColumnarAddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of ColumnarAddressBook ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(500)
+    address_book.add_record(Record(Name('Leap Day'), phone=Phone('0671234567'), birthday=Birthday(date(2000, 2, 29))))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'address_book.json')
+        address_book.json_dump(filename)
+        columnar_book = ColumnarAddressBook.json_load(filename)
+    assert isinstance(columnar_book, ColumnarAddressBook)
+
+    def names(records):
+        return [rec.name.value for rec in records]
+
+    def assert_same(phrases=('1972', '19', 'ОЛЕ', 'оле', 'None', 'none', '.03.', '|38', '67', 'Leap', 'zzz',
+                             'а')):
+        assert str(columnar_book) == str(address_book)
+        assert len(columnar_book) == len(address_book)
+        for phrase in phrases:
+            for ignore_case in (True, False):
+                assert (names(columnar_book.search(phrase, ignore_case))
+                        == names(address_book.search(phrase, ignore_case)))
+        for number in ('0671234567', '067', '38', '4567', '7'):
+            assert set(names(columnar_book.find_by_phone(number))) == set(names(address_book.find_by_phone(number)))
+            assert (set(names(columnar_book.find_by_phone_prefix(number)))
+                    == set(names(address_book.find_by_phone_prefix(number))))
+            assert (set(names(columnar_book.find_by_phone_suffix(number)))
+                    == set(names(address_book.find_by_phone_suffix(number))))
+        for as_of in (date(2023, 2, 27), date(2024, 2, 27), date(2023, 12, 25)):
+            for days in (1, 3, 40, 400):
+                assert (names(columnar_book.upcoming_birthdays(days, as_of))
+                        == names(address_book.upcoming_birthdays(days, as_of)))
+
+    assert_same()
+
+    for book in (address_book, columnar_book):
+        leap = book['Leap Day']
+        leap.add_phone(Phone('0509998877'))
+        leap.change_phone(leap.phones[0], '0631112233')
+        leap.birthday.value = date(1990, 3, 1)
+        book.add_record(Record(Name('New Person'), phone=Phone('0441234567')))
+        book.add_record(Record(Name('Arabic Digits'), phone=Phone('٠٥٠٩٨٧٦٥٤٣')))  # stored as ASCII digits
+    assert repr(columnar_book['Leap Day']) == repr(address_book['Leap Day'])
+    assert names(columnar_book.find_by_phone('٠٥٠٩٨٧٦٥٤٣')) == ['Arabic Digits']
+    assert_same(('112233', '998877', '01.03.1990', 'new', '0441234567'))
+
+    # records got by the same name while they are used are one record, so no change is lost
+    first, second = columnar_book['New Person'], columnar_book['New Person']
+    assert first is second
+    first.add_phone(Phone('0442223344'))
+    second.birthday = Birthday(date(1995, 6, 7))
+    assert [phone.value for phone in columnar_book['New Person'].phones] == ['0441234567', '0442223344']
+    assert columnar_book['New Person'].birthday.value == date(1995, 6, 7)
+    person = Record(Name('New Person'), phone=Phone('0449876543'))
+    columnar_book.add_record(person)
+    assert columnar_book['New Person'] is person and first._book is None
+    first.add_phone(Phone('0445556677'))  # the replaced record does not change the book
+    assert repr(columnar_book['New Person']) == repr(person)
+    del columnar_book['New Person']
+    columnar_book.add_record(Record(Name('New Person'), phone=Phone('0441234567')))
+    assert columnar_book['New Person'] is not person
+    assert [phone.value for phone in columnar_book['New Person'].phones] == ['0441234567']
+    del first, second, person
+    for book in (address_book, columnar_book):
+        book['New Person'].add_phone(Phone('0442223344'))
+        book['New Person'].birthday = Birthday(date(1995, 6, 7))
+    assert_same(('1995', '0442223344'))
+
+    for name in list(address_book.data)[:400]:
+        del address_book[name]
+        del columnar_book[name]
+    assert_same()
+    columnar_book.data._compact()
+    assert_same()
+
+    restored = pickle.loads(pickle.dumps(columnar_book))
+    assert str(restored) == str(columnar_book)
+    columnar_book.enable_search_index()
+    assert names(columnar_book.search('новий')) == names(address_book.search('новий'))
+    assert names(columnar_book.search('0631112233')) == ['Leap Day']
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
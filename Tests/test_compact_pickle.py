@@ -0,0 +1,67 @@
+import os
+import pickle
+import tempfile
+from datetime import date
+from assistant import AddressBook, Birthday, Name, Phone, Record, ThreadSafeAddressBook
+
+# AddressBook with two records pickled by the first version of assistant.py
+OLD_PICKLE = (
+    b'\x80\x04\x95\xb0\x01\x00\x00\x00\x00\x00\x00\x8c\tassistant\x94\x8c\x0bAddressBook\x94\x93\x94)\x81\x94}\x94'
+    b'(\x8c\x04data\x94}\x94(\x8c\nBill Gates\x94h\x00\x8c\x06Record\x94\x93\x94)\x81\x94}\x94(\x8c\r_Record__name'
+    b'\x94h\x00\x8c\x04Name\x94\x93\x94)\x81\x94}\x94(\x8c\r_Field__value\x94N\x8c\x0c_Name__value\x94h\x07ub\x8c'
+    b'\x11_Record__birthday\x94h\x00\x8c\x08Birthday\x94\x93\x94)\x81\x94}\x94(h\x11N\x8c\x10_Birthday__value\x94'
+    b'\x8c\x08datetime\x94\x8c\x04date\x94\x93\x94C\x04\x07\xc6\x03\x04\x94\x85\x94R\x94ub\x8c\x06phones\x94]\x94'
+    b'(h\x00\x8c\x05Phone\x94\x93\x94)\x81\x94}\x94(h\x11N\x8c\r_Phone__value\x94\x8c\x0c380501112233\x94ubh")'
+    b'\x81\x94}\x94(h\x11Nh%\x8c\n0671234567\x94ubeub\x8c\x19\xd0\x9b\xd0\xb5\xd1\x81\xd1\x8f \xd0\xa3\xd0\xba\xd1'
+    b'\x80\xd0\xb0\xd1\x97\xd0\xbd\xd0\xba\xd0\xb0\x94h\t)\x81\x94}\x94(h\x0ch\x0e)\x81\x94}\x94(h\x11Nh\x12h*ubh'
+    b'\x13Nh\x1f]\x94ubu\x8c\x15number_records_return\x94K\x05ub.'
+)
+
+
+def test():
+    print("Test of compact pickle format of AddressBook ... ", end='')
+    old_book = pickle.loads(OLD_PICKLE)
+    assert old_book.number_records_return == 5
+    assert repr(old_book['Bill Gates']) == ("Record(name=Name('Bill Gates'), phones=[Phone('380501112233'), "
+                                            "Phone('0671234567')], birthday=Birthday(datetime.date(1990, 3, 4)))")
+    assert old_book.find_by_phone('0671234567') == [old_book['Bill Gates']]
+    old_book['Леся Українка'].add_phone(Phone('0509998877'))
+    assert old_book.find_by_phone('0509998877') == [old_book['Леся Українка']]
+
+    book = AddressBook(search_index=True)
+    book.add_fake_records(200, seed=20)
+    book.add_record(Record(Name('Ярослав Зоря'), phone=Phone('0671112233'),
+                           birthday=Birthday(date(1990, 3, 4))))
+    book['Ярослав Зоря'].name.value = 'Ярослав Зорян'  # key differs from the name after renaming
+    book.number_records_return = 7
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'address_book.bin')
+        book.pickle_dump(filename)
+        with open(filename, 'rb') as fh:
+            data = fh.read()
+        assert data[1] == pickle.HIGHEST_PROTOCOL
+        assert b'Name' not in data and b'Phone' not in data and b'__value' not in data
+        loaded = AddressBook.pickle_load(filename)
+    assert list(loaded.data) == list(book.data) and str(loaded) == str(book)
+    assert repr(loaded['Ярослав Зоря']) == repr(book['Ярослав Зоря'])
+    assert loaded.number_records_return == 7 and loaded.search('112233') == [loaded['Ярослав Зоря']]
+    loaded['Ярослав Зоря'].birthday.value = date(1985, 12, 31)
+    assert loaded['Ярослав Зоря'] in loaded.upcoming_birthdays(1, date(2000, 12, 31))
+
+    thread_safe_book = ThreadSafeAddressBook()
+    thread_safe_book.data.update(loaded.data)
+    assert str(pickle.loads(pickle.dumps(thread_safe_book))) == str(loaded)
+
+    state = book.__getstate__()
+    state['_format'] = 99
+    try:
+        AddressBook.__new__(AddressBook).__setstate__(state)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('unknown format was loaded')
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
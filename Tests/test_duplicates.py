@@ -0,0 +1,77 @@
+from datetime import date
+
+from assistant import AddressBook, Birthday, Name, Phone, Record, ThreadSafeAddressBook
+
+
+def test():
+    print("Test of find_duplicates and merge_duplicates methods of AddressBook ... ", end='')
+    for book_class in (AddressBook, ThreadSafeAddressBook):
+        address_book = book_class()
+        address_book.add_fake_records(2000, seed=22)
+        fake_names = set(address_book.data)
+        fake_groups = [[rec.name.value for rec in group] for group in address_book.find_duplicates()]
+
+        olena = Record(Name('Олена Петренко-Коваль'), phone=Phone('0671234567'),
+                       birthday=Birthday(date(1991, 5, 17)))
+        address_book.add_record(olena)
+        same_olena = Record(Name('Петренко-Коваль Олена'), phone=Phone('+38 067 123 45 67'),
+                            birthday=Birthday(date(1990, 5, 17)))
+        same_olena.add_phone(Phone('0509876543'))
+        address_book.add_record(same_olena)
+        address_book.add_record(Record(Name('коваль олена петренко'),
+                                       birthday=Birthday(date(1990, 5, 17))))
+        address_book.add_record(Record(Name('Олена Петрук'), phone=Phone('+380671234567')))
+        address_book.add_record(Record(Name("Дар'я Бондар"), phone=Phone('0731112233')))
+        address_book.add_record(Record(Name('Дарья Бондар'), phone=Phone('0731112233')))
+        # the same home number of the family does not join all of them into one group
+        address_book.add_record(Record(Name('Андрій Домашній'), phone=Phone('0441000001')))
+        maria = Record(Name('Марія Домашня'), phone=Phone('0441000001'))
+        maria.add_phone(Phone('0441000002'))
+        address_book.add_record(maria)
+        address_book.add_record(Record(Name('Зоя Робоча'), phone=Phone('0441000002')))
+
+        groups = [[rec.name.value for rec in group] for group in address_book.find_duplicates()]
+        assert ['Олена Петренко-Коваль', 'Петренко-Коваль Олена'] in groups
+        for name in ('коваль олена петренко', 'Олена Петрук', "Дар'я Бондар",
+                     'Андрій Домашній', 'Зоя Робоча'):
+            assert not any(name in group for group in groups), name
+        by_name = [[rec.name.value for rec in group] for group in address_book.find_duplicates(by_phone=False)]
+        assert ['Олена Петренко-Коваль', 'Петренко-Коваль Олена',
+                'коваль олена петренко'] in by_name
+        by_phone = [[rec.name.value for rec in group] for group in address_book.find_duplicates(by_name=False)]
+        assert ['Олена Петренко-Коваль', 'Олена Петрук',
+                'Петренко-Коваль Олена'] in by_phone
+        assert ["Дар'я Бондар", 'Дарья Бондар'] in by_phone
+        assert ['Андрій Домашній', 'Марія Домашня'] in by_phone
+        assert not any('Зоя Робоча' in group for group in by_phone)
+        assert address_book.find_duplicates(by_phone=False, by_name=False) == []
+
+        merges = address_book.merge_duplicates()
+        assert len(merges) == len(fake_groups) + 1
+        report = next(merge for merge in merges if merge['kept'] == 'Петренко-Коваль Олена')
+        assert report == {'kept': 'Петренко-Коваль Олена',
+                          'merged': ['Олена Петренко-Коваль'],
+                          'added_phones': [],
+                          'dropped_birthdays': [('Олена Петренко-Коваль', date(1991, 5, 17))]}
+        assert 'Олена Петренко-Коваль' not in address_book
+        kept = address_book['Петренко-Коваль Олена']
+        assert [phone.value for phone in kept.phones] == ['380671234567', '0509876543']
+        assert kept.birthday.value == date(1990, 5, 17)
+        assert address_book.find_by_phone('0509876543') == [kept]
+        for name in ('коваль олена петренко', 'Олена Петрук', "Дар'я Бондар",
+                     'Дарья Бондар', 'Зоя Робоча'):
+            assert name in address_book
+        assert address_book.find_duplicates() == []
+        assert address_book.merge_duplicates() == []
+        assert len(address_book) == len(fake_names) + 9 - sum(len(group) - 1 for group in fake_groups) - 1
+
+        # merging by name only is asked explicitly
+        merges = address_book.merge_duplicates(by_phone=False)
+        assert {'kept': 'Петренко-Коваль Олена',
+                'merged': ['коваль олена петренко'],
+                'added_phones': [], 'dropped_birthdays': []} in merges
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,56 @@
+from assistant import AddressBook, Name, Phone, Record, _edit_distance, _FuzzyIndex
+
+
+def test():
+    print("Test of fuzzy_search method of AddressBook ... ", end='')
+    assert _edit_distance('петренко', 'петрэнко') == 1
+    assert _edit_distance('', 'abc') == _edit_distance('abc', '') == 3
+    assert _edit_distance('kitten', 'sitting') == 3
+
+    address_book = AddressBook()
+    address_book.add_fake_records(3000, seed=21)
+    for name in ('Олена Петренко', 'Ольга Петрук',
+                 'Петро Коваль-Петренко', "Дар'я Бондар"):
+        address_book.add_record(Record(Name(name), phone=Phone('0671234567')))
+
+    def names(records):
+        return [rec.name.value for rec in records]
+
+    def brute_force(query, max_distance, limit):
+        ranked = []
+        for key in address_book.data:
+            words = _FuzzyIndex.words(address_book[key].name.value)
+            total = sum(min(_edit_distance(word, other) for other in words) for word in _FuzzyIndex.words(query))
+            if total <= max_distance:
+                ranked.append((total, key))
+        return [key for _, key in sorted(ranked)][:limit]
+
+    assert names(address_book.fuzzy_search('Петрэнко', limit=None)) == brute_force('Петрэнко', 2, None)
+    assert 'Олена Петренко' in names(address_book.fuzzy_search('Петрэнко', limit=None))
+    assert 'Петро Коваль-Петренко' in names(
+        address_book.fuzzy_search('петрэнко', limit=None))
+    assert names(address_book.fuzzy_search('олена петрэнко')) == ['Олена Петренко']
+    assert names(address_book.fuzzy_search('ОЛЕНА ПЕТРЕНКО', max_distance=0)) == [
+        'Олена Петренко']
+    assert names(address_book.fuzzy_search('дарья бондар')) == ["Дар'я Бондар"]
+    for query in ('Олга', 'петрко', 'Ковал', 'зззззз', 'Євгенй Мельник'):
+        for max_distance in (0, 1, 2, 3):
+            expected = brute_force(query, max_distance, 7)
+            assert names(address_book.fuzzy_search(query, max_distance, limit=7)) == expected, (query, max_distance)
+    assert address_book.fuzzy_search('') == []
+
+    # the index follows the changes of the book
+    del address_book['Олена Петренко']
+    assert 'Олена Петренко' not in names(address_book.fuzzy_search('Петрэнко', limit=None))
+    address_book['Ольга Петрук'].name.value = 'Ольга Петрюк'
+    assert 'Ольга Петрюк' not in names(address_book.fuzzy_search('ольга петрук', max_distance=0))
+    assert 'Ольга Петрюк' in names(address_book.fuzzy_search('ольга петрук', max_distance=1))
+    for name in list(address_book.data)[:2500]:
+        del address_book[name]
+    address_book.add_record(Record(Name('Олена Петренко')))
+    assert names(address_book.fuzzy_search('Петрэнко', limit=None)) == brute_force('Петрэнко', 2, None)
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+from datetime import date
+from assistant import AddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of journaled saving of AddressBook ... ", end='')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'address_book.ndjson')
+        log_filename = filename + '.log'
+        address_book = AddressBook()
+        address_book.add_fake_records(300)
+        address_book.open_journal(filename)
+        assert os.path.getsize(log_filename) == 0
+
+        bill = Record(Name('Bill'), phone=Phone('0671234567'))
+        address_book.add_record(bill)
+        bill.add_phone(Phone('0509998877'))
+        bill.change_phone(bill.phones[0], '0631112233')
+        bill.birthday = Birthday(date(1990, 3, 1))
+        bill.birthday.value = date(1991, 4, 2)
+        bill.delete_phone(bill.phones[1])
+        del address_book[next(iter(address_book.data))]
+        with open(log_filename, encoding='utf-8') as fh:
+            assert len(fh.readlines()) == 7
+
+        restored = AddressBook.journal_load(filename)
+        assert str(restored) == str(address_book)
+        restored.close_journal()
+
+        with open(log_filename, 'a', encoding='utf-8') as fh:
+            fh.write('{"op": "del", "key": "Bi')  # the program stopped in the middle of writing
+        restored = AddressBook.journal_load(filename)
+        assert str(restored) == str(address_book)
+        restored['Bill'].add_phone(Phone('0441234567'))
+        restored.close_journal()
+        assert AddressBook.journal_load(filename).find_by_phone('0441234567')[0].name.value == 'Bill'
+
+        address_book.compact_journal()
+        assert os.path.getsize(log_filename) == 0
+        assert str(AddressBook.ndjson_load(filename)) == str(address_book)
+        address_book.close_journal()
+        assert [name for name in os.listdir(tmp_dir) if name.endswith('.tmp')] == []
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+from assistant import (AddressBook, ColumnarAddressBook, LazyAddressBook, MappedAddressBook, SQLiteAddressBook,
+                       ThreadSafeAddressBook, Name, Phone, Record)
+
+
+def test():
+    print("Test of keyset pagination with page method of AddressBook ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(300, seed=23)
+
+    def all_pages(book, limit, order='name'):
+        names, cursor = [], None
+        while True:
+            records, cursor = book.page(cursor, limit, order)
+            names.append([rec.name.value for rec in records])
+            if cursor is None:
+                return names
+
+    def assert_paged(book):
+        expected = sorted(book.data)
+        for limit in (1, 7, 10, 300, 1000):
+            pages = all_pages(book, limit)
+            assert [name for page in pages for name in page] == expected
+            assert all(len(page) == limit for page in pages[:-1]) and 0 < len(pages[-1]) <= limit
+            assert [name for page in all_pages(book, limit, '-name') for name in page] == expected[::-1]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sqlite_book = SQLiteAddressBook(os.path.join(tmp_dir, 'address_book.db'))
+        columnar_book, thread_safe_book = ColumnarAddressBook(), ThreadSafeAddressBook()
+        for book in (sqlite_book, columnar_book, thread_safe_book):
+            for record in list(address_book.data.values())[:120]:
+                book.add_record(Record(Name(record.name.value), phone=Phone('0671234567')))
+            assert_paged(book)
+        sqlite_book.close()
+
+        # the mapped book seeks the cursor in the index of the snapshot, the lazy book keeps its sorted keys
+        address_book.snapshot_dump(os.path.join(tmp_dir, 'address_book.snapshot'))
+        mapped_book = MappedAddressBook(os.path.join(tmp_dir, 'address_book.snapshot'))
+        address_book.json_dump(os.path.join(tmp_dir, 'address_book.json'))
+        lazy_book = LazyAddressBook.json_load(os.path.join(tmp_dir, 'address_book.json'))
+        for book in (mapped_book, lazy_book):
+            for attempt in range(2):  # the first time the records which are changed are not built yet
+                book.page(limit=5)
+                names = sorted(book.data)
+                for name in names[:2] + names[50:90:7] + names[-1:]:
+                    del book[name]
+                book.add_record(Record(Name('Аа Перший' + str(attempt))))
+                book.add_record(Record(Name(names[60] + ' Другий')))
+                book[names[70]] = Record(Name(names[70]), phone=Phone('0509876543'))
+                assert_paged(book)
+        mapped_book.close()
+    assert_paged(address_book)
+
+    # the cursor keeps its position while records are added and removed
+    address_book.number_records_return = 20
+    first, cursor = address_book.page()
+    assert [rec.name.value for rec in first] == sorted(address_book.data)[:20]
+    last_name = first[-1].name.value
+    del address_book[last_name]
+    address_book.add_record(Record(Name('Аа Перший')))
+    address_book.add_record(Record(Name(last_name + ' Другий')))
+    second, _ = address_book.page(after=cursor)
+    assert second[0].name.value == last_name + ' Другий'
+    assert [rec.name.value for rec in second] == [name for name in sorted(address_book.data) if name > last_name][:20]
+
+    empty_book = AddressBook()
+    assert empty_book.page() == ([], None)
+    for kwargs in ({'limit': -1}, {'order': 'phone'}, {'after': 'not a cursor'}, {'after': cursor, 'order': '-name'}):
+        try:
+            address_book.page(**kwargs)
+        except ValueError:
+            pass
+        else:
+            assert False, kwargs
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
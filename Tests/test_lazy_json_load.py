@@ -0,0 +1,83 @@
+import json
+import os
+import pickle
+import tempfile
+from datetime import date
+from assistant import AddressBook, Birthday, LazyAddressBook, Name, Phone, Record
+
+
+def test():
+    print("Test of lazy loading of AddressBook from json file ... ", end='')
+    book = AddressBook()
+    book.add_fake_records(300, seed=19)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'address_book.json')
+        book.json_dump(filename)
+        eager_book = AddressBook.json_load(filename)
+        lazy_book = LazyAddressBook.json_load(filename)
+        assert len(lazy_book) == len(eager_book) and list(lazy_book.data) == list(eager_book.data)
+        assert lazy_book.data.hydrated == 0
+
+        found = lazy_book.search('19')
+        assert [str(record) for record in found] == [str(record) for record in eager_book.search('19')]
+        assert lazy_book.data.hydrated == len(found)
+        for phrase in ('ОЛЕ', 'None', '.03.', '067', 'zzz', list(book.data)[7][3:9]):
+            for ignore_case in (True, False):
+                expected = [record.name.value for record in eager_book.search(phrase, ignore_case)]
+                assert [record.name.value for record in lazy_book.search(phrase, ignore_case)] == expected
+
+        key = list(book.data)[5]
+        assert str(lazy_book[key]) == str(eager_book[key])
+        assert lazy_book.render_page(3, 20) == eager_book.render_page(3, 20)
+        assert str(lazy_book) == str(eager_book)
+        assert lazy_book.data.hydrated == len(lazy_book)
+
+        lazy_book[key].birthday.value = date(1990, 3, 4)
+        lazy_book[key].add_phone(Phone('0671112233'))
+        lazy_book.add_record(Record(Name('Ярослав Зоря'), birthday=Birthday(date(1985, 12, 31))))
+        assert [record.name.value for record in lazy_book.search('04.03.1990')] == [key]
+        assert lazy_book.find_by_phone('0671112233') == [lazy_book[key]]
+        assert lazy_book.search('31.12.1985')[0].name.value == 'Ярослав Зоря'
+        assert [str(record) for record in pickle.loads(pickle.dumps(lazy_book)).data.values()] == \
+               [str(record) for record in lazy_book.data.values()]
+
+        with open(filename, 'w', encoding='utf-8') as fh:
+            json.dump([{'name': 'Іван Франко', 'birthday': None, 'phones': ['12-34']},
+                       {'name': 'Леся Українка', 'birthday': '25.02.1971', 'phones': []}], fh)
+        invalid_book = LazyAddressBook.json_load(filename)
+        assert invalid_book.search('Леся')[0].birthday.value == date(1971, 2, 25)
+
+        # raw birthdays are searched as the built records show them
+        with open(filename, 'w', encoding='utf-8') as fh:
+            json.dump([{'name': 'Леся Українка', 'birthday': '1.2.1990', 'phones': []}], fh)
+        short_date_book = LazyAddressBook.json_load(filename)
+        assert [record.name.value for record in short_date_book.search('01.02.1990')] == ['Леся Українка']
+        assert short_date_book.search('1.2.1990') == []
+        assert str(short_date_book['Леся Українка'].birthday) == '01.02.1990'
+        try:
+            invalid_book['Іван Франко']
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('invalid record was built')
+
+        # invalid data is skipped by search and can be deleted or replaced without building it
+        with open(filename, 'w', encoding='utf-8') as fh:
+            json.dump([{'name': 'Іван Франко', 'birthday': None, 'phones': ['12-34']},
+                       {'name': 'Іван Вишенський', 'birthday': '31.02.1970', 'phones': []},
+                       {'name': 'Іван Котляревський', 'birthday': None, 'phones': ['0671234567']}], fh)
+        invalid_book = LazyAddressBook.json_load(filename)
+        assert [record.name.value for record in invalid_book.search('Іван')] == [
+            'Іван Котляревський']
+        assert set(invalid_book.errors) == {'Іван Франко', 'Іван Вишенський'}
+        del invalid_book['Іван Франко']
+        assert 'Іван Франко' not in invalid_book and 'Іван Франко' not in invalid_book.errors
+        invalid_book['Іван Вишенський'] = Record(Name('Іван Вишенський'),
+                                                 birthday=Birthday(date(1970, 2, 28)))
+        assert invalid_book.search('28.02.1970') == [invalid_book['Іван Вишенський']]
+        assert invalid_book.errors == {} and len(invalid_book) == 2
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
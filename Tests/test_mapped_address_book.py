@@ -0,0 +1,65 @@
+import os
+import tempfile
+from datetime import date
+from assistant import AddressBook, MappedAddressBook, Name, Phone, Record, _MappedRecords
+
+
+def test():
+    print("Test of snapshot_dump and MappedAddressBook ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(500)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'address_book.snapshot')
+        address_book.snapshot_dump(filename)
+        mapped_book = MappedAddressBook(filename)
+
+        def names(records):
+            return [rec.name.value for rec in records]
+
+        def assert_same():
+            assert len(mapped_book) == len(address_book)
+            assert str(mapped_book) == str(address_book)
+            assert [names(page) for page in mapped_book] == [names(page) for page in address_book]
+            for phrase in ('1972', 'ОЛЕ', 'None', '067', 'zzz'):
+                assert names(mapped_book.search(phrase)) == names(address_book.search(phrase))
+            assert (set(names(mapped_book.find_by_phone_prefix('38')))
+                    == set(names(address_book.find_by_phone_prefix('38'))))
+            as_of = date(2023, 12, 25)
+            assert names(mapped_book.upcoming_birthdays(30, as_of)) == names(address_book.upcoming_birthdays(30, as_of))
+
+        assert_same()
+
+        # search and upcoming_birthdays build only the records they return
+        decode, decoded = _MappedRecords._decode, []
+        _MappedRecords._decode = lambda self, position: decoded.append(position) or decode(self, position)
+        try:
+            found = mapped_book.search('ОЛЕ') + mapped_book.upcoming_birthdays(30, date(2023, 12, 25))
+        finally:
+            _MappedRecords._decode = decode
+        assert len(decoded) == len(found)
+
+        for name in list(address_book.data)[::50]:
+            assert repr(mapped_book[name]) == repr(address_book[name])
+            assert name in mapped_book
+        assert 'Nobody' not in mapped_book
+
+        first, second = list(address_book.data)[:2]
+        for book in (address_book, mapped_book):
+            book[first].add_phone(Phone('0671234567'))
+            del book[second]
+            book.add_record(Record(Name('New Person'), phone=Phone('0441234567')))
+            book.add_record(Record(Name('Arabic Digits'), phone=Phone('٠٥٠٩٨٧٦٥٤٣')))
+        assert_same()
+        assert names(mapped_book.find_by_phone('0671234567')) == [first]
+        assert names(mapped_book.find_by_phone('0509876543')) == ['Arabic Digits']
+
+        mapped_book.snapshot_dump(filename)
+        mapped_book.close()
+        mapped_book = MappedAddressBook(filename)
+        assert_same()
+        mapped_book.close()
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
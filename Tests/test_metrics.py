@@ -0,0 +1,80 @@
+import os
+import tempfile
+import warnings
+from datetime import date
+from assistant import AddressBook, ColumnarAddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of metrics of AddressBook operations ... ", end='')
+    original_search, original_setter = AddressBook.search, Phone.value
+    AddressBook.stats(reset=True)
+    calls = []
+    AddressBook.enable_metrics(hook=lambda *call: calls.append(call))
+    try:
+        address_book = AddressBook()
+        address_book.add_record(Record(Name('Олена Петренко'), phone=Phone('0671234567'),
+                                       birthday=Birthday(date(1990, 3, 4))))
+        address_book.add_fake_records(30, seed=3)
+        for phone in ('12', '067abc4567'):
+            try:
+                Phone(phone)
+            except ValueError:
+                pass
+        assert [rec.name.value for rec in address_book.search('Петренко')] == ['Олена Петренко']
+        columnar_book = ColumnarAddressBook()
+        columnar_book.add_record(Record(Name('Ольга Петрук')))
+        columnar_book.search('Петрук')
+        pages = list(address_book)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_file, binary_file = os.path.join(tmp_dir, 'book.json'), os.path.join(tmp_dir, 'book.bin')
+            address_book.json_dump(json_file)
+            AddressBook.json_load(json_file)
+            address_book.pickle_dump(binary_file)
+            AddressBook.pickle_load(binary_file)
+            json_size, binary_size = os.path.getsize(json_file), os.path.getsize(binary_file)
+    finally:
+        AddressBook.disable_metrics()
+    assert AddressBook.search is original_search and Phone.value is original_setter
+
+    stats = AddressBook.stats()
+    assert stats['search']['calls'] == 2
+    assert stats['add_record']['calls'] == 2 + 31  # json_load adds records one by one
+    assert stats['iter_page']['calls'] == len(pages)
+    assert stats['json_dump']['bytes'] == stats['json_load']['bytes'] == json_size
+    assert stats['pickle_dump']['bytes'] == stats['pickle_load']['bytes'] == binary_size
+    assert stats['Phone.value']['errors'] == 2
+    assert stats['Phone.value']['calls'] >= 3
+    assert stats['Name.value']['calls'] >= 32 and stats['Birthday.value']['calls'] >= 1
+    for stat in stats.values():
+        assert sum(stat['histogram'].values()) == stat['calls']
+        assert 0 <= stat['max_time'] <= stat['total_time']
+    assert len(calls) == sum(stat['calls'] for stat in stats.values())
+    assert ('search', calls[[call[0] for call in calls].index('search')][1], 0, False) in calls
+
+    # nothing is measured when metrics are off
+    address_book.search('Петренко')
+    Phone('0671234567')
+    assert AddressBook.stats(reset=True) == stats
+    assert AddressBook.stats() == {}
+
+    # the error of the hook is reported as a warning, the measured call still returns its result
+    AddressBook.enable_metrics(hook=lambda *call: 1 / 0)
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            found = address_book.search('Петренко')
+            Phone('0671234567')
+    finally:
+        AddressBook.disable_metrics()
+    assert {str(warning.message) for warning in caught} == {
+        'metrics hook failed on search: ZeroDivisionError: division by zero',
+        'metrics hook failed on Phone.value: ZeroDivisionError: division by zero'}
+    assert all(warning.category is RuntimeWarning for warning in caught)
+    assert [rec.name.value for rec in found] == ['Олена Петренко']
+    assert AddressBook.stats(reset=True)['search']['calls'] == 1
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
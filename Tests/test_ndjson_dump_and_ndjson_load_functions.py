@@ -0,0 +1,22 @@
+from assistant import AddressBook
+
+
+def test():
+    print("Testing 'ndjson_dump', 'ndjson_load' and 'iter_json_records' methods of AddressBook ... ", end='')
+    my_address_book = AddressBook()
+    my_address_book.add_fake_records(1000)
+    my_address_book.ndjson_dump()
+    with open(AddressBook.NDJSON_FILE, encoding='utf-8') as fh:
+        assert sum(1 for _ in fh) == len(my_address_book)
+
+    my_address_book_restored = AddressBook.ndjson_load()
+    assert str(my_address_book) == str(my_address_book_restored)
+
+    with_birthday = [rec.name.value for rec in AddressBook.iter_json_records() if rec.birthday]
+    assert with_birthday == [rec.name.value for rec in my_address_book.data.values() if rec.birthday]
+    print('passed')
+    print("1000 of fake contacts saved in 'address_book.ndjson'")
+
+
+if __name__ == '__main__':
+    test()
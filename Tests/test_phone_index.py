@@ -0,0 +1,89 @@
+from assistant import AddressBook, Name, Phone, Record
+
+
+def test():
+    print("Test of phone lookup methods of AddressBook ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(200)
+    bill = Record(Name('Bill'), phone=Phone('0671234567'))
+    bill.add_phone(Phone('+38 (050) 111-45-67'))
+    address_book.add_record(bill)
+    address_book.add_record(Record(Name('John'), phone=Phone('067-123-99-99')))
+
+    assert address_book.find_by_phone('067 123 45 67') == [bill]
+    assert address_book.find_by_phone(380501114567) == [bill]
+    assert [rec.name.value for rec in address_book.find_by_phone_prefix('0671234')] == ['Bill']
+    assert {rec.name.value for rec in address_book.find_by_phone_prefix('067123')} >= {'Bill', 'John'}
+    assert bill in address_book.find_by_phone_suffix('4567')
+    assert address_book.find_by_phone_suffix('1114567') == [bill]
+
+    for suffix in ('7', '67', '00', '123'):
+        expected = {rec.name.value for rec in address_book.data.values()
+                    if any(phone.value.endswith(suffix) for phone in rec.phones)}
+        assert {rec.name.value for rec in address_book.find_by_phone_suffix(suffix)} == expected
+
+    bill.change_phone(bill.phones[0], '0939876543')
+    assert address_book.find_by_phone('0671234567') == []
+    assert address_book.find_by_phone_prefix('0671234') == []
+    assert address_book.find_by_phone('0939876543') == [bill]
+
+    # the record and its fields report changes to one owner, so sharing them would leave the other one stale
+    other_book = AddressBook()
+    shared_phone = bill.phones[0]
+    for share in (lambda: other_book.add_record(bill), lambda: address_book.__setitem__('Bill Copy', bill),
+                  lambda: Record(Name('Bill Copy'), phone=shared_phone),
+                  lambda: Record(Name('Bill Copy')).add_phone(shared_phone),
+                  lambda: Record(bill.name)):
+        try:
+            share()
+        except ValueError:
+            pass
+        else:
+            assert False, 'shared object was accepted'
+    assert len(other_book) == 0 and 'Bill Copy' not in address_book
+    bill.add_phone(Phone('0501234567'))
+    assert address_book.find_by_phone('0501234567') == [bill]
+    assert address_book.search('0501234567') == [bill]
+
+    bill.delete_phone(bill.phones[2])
+    bill.delete_phone(bill.phones[1])
+    assert address_book.find_by_phone_suffix('1114567') == []
+    del address_book['Bill']
+    assert address_book.find_by_phone('0939876543') == []
+
+    # removed numbers are skipped until the index is compacted
+    names = list(address_book.data)
+    for i, name in enumerate(names):
+        if i % 3 == 0:
+            del address_book[name]
+        elif i % 3 == 1 and address_book[name].phones:
+            address_book[name].add_phone(address_book[name].phones[0])  # the same number twice
+        for start in ('0', '38', '5'):
+            if i % 40 == 0:
+                expected = sorted(phone.value for rec in address_book.data.values() for phone in rec.phones
+                                  if phone.value.startswith(start))
+                assert address_book._phone_index.count_prefix(start) == len(expected)
+                found = address_book.find_by_phone_prefix(start)
+                assert sorted(rec.name.value for rec in found) == sorted(set(
+                    rec.name.value for rec in address_book.data.values()
+                    if any(phone.value.startswith(start) for phone in rec.phones)))
+                assert address_book._phone_index.count_suffix(start[::-1]) == len(
+                    [phone for rec in address_book.data.values() for phone in rec.phones
+                     if phone.value.endswith(start[::-1])])
+
+    # the queries skip the removed numbers found by bisecting, the lists are not compacted for a few of them
+    phone_index = address_book._phone_index
+    phone_index.prefix('')
+    phone_index.suffix('')
+    name = next(name for name, rec in address_book.data.items() if rec.phones)
+    number = address_book[name].phones[0].value
+    del address_book[name]
+    assert name not in phone_index.prefix(number) and name not in phone_index.suffix(number)
+    assert phone_index.count_prefix(number) == len([phone for rec in address_book.data.values()
+                                                    for phone in rec.phones if phone.value.startswith(number)])
+    assert (number, name) in phone_index._removed_by_prefix and (number, name) in phone_index._by_prefix
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,81 @@
+from datetime import date
+from assistant import (AddressBook, Birthday, BirthdayQuery, ColumnarAddressBook, Name, NameQuery, Phone,
+                       PhoneQuery, Record, ThreadSafeAddressBook)
+
+
+def test():
+    print("Test of structured queries of AddressBook ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(500, seed=21)
+    address_book.add_record(Record(Name('Ярослав Зоря'), phone=Phone('0671112233'),
+                                   birthday=Birthday(date(1990, 3, 4))))
+    address_book['Ярослав Зоря'].add_phone(Phone('0509998877'))
+    rows = [(record.name.value, record.birthday.value if record.birthday else None,
+             [phone.value for phone in record.phones]) for record in address_book.data.values()]
+    columnar_book = ColumnarAddressBook()
+    columnar_book.add_records_bulk(rows)
+    thread_safe_book = ThreadSafeAddressBook(search_index=True)
+    thread_safe_book.add_records_bulk(rows)
+    first_letter = list(address_book.data)[3][:2]
+
+    queries = [
+        NameQuery(starts_with='Ярослав З') & BirthdayQuery(month=3) & PhoneQuery(min_count=2),
+        NameQuery(starts_with=first_letter, ignore_case=False),
+        NameQuery(starts_with=first_letter.lower()) & PhoneQuery(max_count=0),
+        NameQuery(equals='Ярослав Зоря', ignore_case=False),
+        NameQuery(equals='ярослав зоря'),
+        NameQuery(contains='енко') | BirthdayQuery(day=1),
+        BirthdayQuery(month=2, day=29) | PhoneQuery(prefix='067') | PhoneQuery(suffix='77'),
+        BirthdayQuery(min_year=1980, max_year=1989) & PhoneQuery(prefix='38'),
+        BirthdayQuery(min_age=30, max_age=34, as_of=date(2024, 3, 4)),
+        BirthdayQuery(),
+        PhoneQuery(min_count=2) | NameQuery(starts_with='zzz'),
+    ]
+    for query in queries:
+        expected = [record for key, record in sorted(address_book.data.items()) if query.matches(key, record)]
+        assert address_book.query(query) == expected, query
+        assert [record.name.value for record in columnar_book.query(query)] == \
+               [record.name.value for record in expected], query
+        assert [record.name.value for record in thread_safe_book.query(query)] == \
+               [record.name.value for record in expected], query
+
+    assert [record.name.value for record in address_book.query(queries[0])] == ['Ярослав Зоря']
+    assert BirthdayQuery(min_age=34, max_age=34, as_of=date(2024, 3, 4)).matches(
+        '', address_book['Ярослав Зоря'])
+    assert not BirthdayQuery(min_age=34, as_of=date(2024, 3, 3)).matches('', address_book['Ярослав Зоря'])
+
+    assert address_book.explain(queries[0]).startswith(
+        "index lookup: sorted folded names starting with 'ярослав з' (~1 ")
+    assert address_book.explain(queries[3]).startswith("index lookup: key 'Ярослав Зоря' (~1 records)")
+    assert address_book.explain(queries[6]).startswith('index lookup: union of calendar of birthdays, phone prefixes')
+    assert address_book.explain(queries[8]) == ('scan of all 501 records\n'
+                                                'filter: (age on 2024-03-04 >= 30 AND age on 2024-03-04 <= 34)')
+    assert address_book.explain(queries[5]).startswith('scan of all 501 records')
+    assert thread_safe_book.explain(queries[5]).startswith('index lookup: union of n-gram index')
+    assert columnar_book.explain(queries[0]).startswith('scan of all 501 records\nfilter: (name starts with')
+
+    # names in any case are found by the folded names which follow the changes of the book
+    for book in (address_book, thread_safe_book):
+        book.add_record(Record(Name('ЯРОСЛАВ ЗОРЯН')))
+        book.add_record(Record(Name('яРослав Зоряний')))
+        names = [record.name.value for record in book.query(NameQuery(starts_with='Ярослав З'))]
+        assert names == ['ЯРОСЛАВ ЗОРЯН', 'Ярослав Зоря', 'яРослав Зоряний'], names
+        del book['ЯРОСЛАВ ЗОРЯН']
+        names = [record.name.value for record in book.query(NameQuery(equals='ЯРОСЛАВ ЗОРЯНИЙ'))]
+        assert names == ['яРослав Зоряний'], names
+        del book['яРослав Зоряний']
+
+    address_book['Ярослав Зоря'].birthday.value = date(1990, 4, 4)
+    assert address_book.query(queries[0]) == []
+    for query in (lambda: NameQuery(), lambda: PhoneQuery(prefix='+'), lambda: BirthdayQuery(month=13)):
+        try:
+            query()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('invalid query was created')
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
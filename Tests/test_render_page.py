@@ -0,0 +1,88 @@
+import os
+import tempfile
+from datetime import date
+from assistant import (AddressBook, ColumnarAddressBook, MappedAddressBook, SQLiteAddressBook,
+                       Birthday, Name, Phone, Record)
+
+
+def test():
+    print("Test of cached rendering and render_page method of AddressBook ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(250, seed=1)
+
+    def expected_lines(book):
+        records = book.data
+        return [f'{i:>4} |' + str(records[name]) + '\n' for i, name in enumerate(sorted(records), 1)]
+
+    def assert_rendered(book):
+        lines = expected_lines(book)
+        assert str(book) == AddressBook._render_table(lines)
+        for page, size in ((1, 10), (3, 7), (25, 10), (26, 10), (1, 1000)):
+            start = (page - 1) * size
+            assert book.render_page(page, size) == AddressBook._render_table(lines[start:start + size])
+        book.number_records_return = 12
+        assert book.render_page(2) == AddressBook._render_table(lines[12:24])
+
+    assert_rendered(address_book)
+
+    # cached lines and order follow all the changes of the book and its records
+    record = Record(Name('Аарон Перший'), phone=Phone('0671112233'), birthday=Birthday(date(1990, 3, 4)))
+    address_book.add_record(record)
+    page = sorted(address_book.data).index('Аарон Перший') + 1
+    assert address_book.render_page(page, 1).splitlines()[3].startswith(f'{page:>4} |Аарон Перший')
+    record.add_phone(Phone('0509998877'))
+    record.birthday.value = date(1985, 12, 31)
+    assert '31.12.1985' in address_book.render_page(page, 1)
+    names = list(address_book.data)
+    address_book[names[0]].add_phone(Phone('0001112233'))
+    for name in names[5:60]:
+        del address_book[name]
+    address_book.add_fake_records(100, seed=2)
+    address_book[names[100]] = Record(Name(names[100]))
+    assert_rendered(address_book)
+
+    def copy_birthday(record):  # fields of the record stored in the book cannot be shared with another record
+        return Birthday(record.birthday.value) if record.birthday else None
+
+    columnar_book = ColumnarAddressBook()
+    for record in list(address_book.data.values())[:50]:
+        columnar_book.add_record(Record(Name(record.name.value), birthday=copy_birthday(record)))
+    assert_rendered(columnar_book)
+    del columnar_book[next(iter(columnar_book.data))]
+    columnar_book.add_record(Record(Name('Аарон Перший')))
+    assert_rendered(columnar_book)
+
+    # the mapped book finds the first record of the page by binary search, the SQLite book by the index of names
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        address_book.snapshot_dump(os.path.join(tmp_dir, 'address_book.snapshot'))
+        mapped_book = MappedAddressBook(os.path.join(tmp_dir, 'address_book.snapshot'))
+        sqlite_book = SQLiteAddressBook(os.path.join(tmp_dir, 'address_book.db'))
+        for record in address_book.data.values():
+            sqlite_book.add_record(Record(Name(record.name.value), birthday=copy_birthday(record)))
+        for book in (mapped_book, sqlite_book):
+            assert_rendered(book)
+            names = sorted(book.data)
+            for name in names[:3] + names[100:140:3] + names[-2:]:
+                del book[name]
+            book.add_record(Record(Name('Аа Найперший')))
+            book.add_record(Record(Name('Яя Останній'), phone=Phone('0671234567')))
+            book[names[50]] = Record(Name(names[50]), phone=Phone('0509876543'))
+            book.add_fake_records(30, seed=3)
+            assert_rendered(book)
+            lines = expected_lines(book)
+            for page in range(1, len(lines) + 2):
+                assert book.render_page(page, 1) == AddressBook._render_table(lines[page - 1:page])
+            book.close()
+
+    for page, size in ((0, 10), (1, -1)):
+        try:
+            address_book.render_page(page, size)
+        except ValueError:
+            pass
+        else:
+            assert False, (page, size)
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
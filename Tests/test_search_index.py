@@ -0,0 +1,39 @@
+from datetime import date
+from assistant import AddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of n-gram search index of AddressBook ... ", end='')
+    indexed_book = AddressBook(search_index=True)
+    indexed_book.add_fake_records(300)
+
+    def assert_same_results(phrases):
+        plain_book = AddressBook()
+        plain_book.data.update(indexed_book.data)  # bypasses linking of records to the plain book
+        for phrase in phrases:
+            for ignore_case in (True, False):
+                expected = [rec.name.value for rec in plain_book.search(phrase, ignore_case)]
+                actual = [rec.name.value for rec in indexed_book.search(phrase, ignore_case)]
+                assert actual == expected, (phrase, ignore_case)
+
+    names = list(indexed_book.data)
+    phrases = ['1972', '19', 'ОЛЕ', 'оле', 'None', 'none', '.03.', '|38', 'zzz', 'а', '067',
+               names[0], names[1][2:7]]
+    assert_same_results(phrases)
+
+    record = Record(Name('Ярослав Зоря'), phone=Phone('0671112233'), birthday=Birthday(date(1990, 3, 4)))
+    indexed_book.add_record(record)
+    record.add_phone(Phone('0509998877'))
+    record.change_phone(record.phones[0], '0631234567')
+    record.birthday.value = date(1985, 12, 31)
+    assert_same_results(['112233', '1234567', '998877', '04.03.1990', '31.12.1985', 'зоря', 'ЗОРЯ'])
+
+    record.delete_phone(record.phones[1])
+    del indexed_book['Ярослав Зоря']
+    assert_same_results(['1234567', '998877', '31.12.1985', 'зоря'])
+    assert indexed_book.search('Ярослав Зоря') == []
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
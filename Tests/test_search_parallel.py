@@ -0,0 +1,57 @@
+import gc
+import pickle
+from datetime import date
+from assistant import AddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of search_parallel method of AddressBook ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(2000, seed=5)
+
+    def assert_same_results(phrases, workers=3):
+        for phrase in phrases:
+            for ignore_case in (True, False):
+                expected = [rec.name.value for rec in address_book.search(phrase, ignore_case)]
+                actual = [rec.name.value for rec in address_book.search_parallel(phrase, ignore_case, workers)]
+                assert actual == expected, (phrase, ignore_case)
+
+    names = list(address_book.data)
+    phrases = ['1972', '19', 'ОЛЕ', 'оле', 'None', 'none', '.03.', '|38', 'zzz', 'а', '067', '',
+               names[0], names[1][2:7]]
+    assert_same_results(phrases)
+
+    # changes of the book are passed to the workers
+    record = Record(Name('Ярослав Зоря'), phone=Phone('0671112233'), birthday=Birthday(date(1990, 3, 4)))
+    address_book.add_record(record)
+    record.add_phone(Phone('0509998877'))
+    record.birthday.value = date(1985, 12, 31)
+    del address_book[names[0]]
+    address_book[names[1]] = Record(Name(names[1]), phone=Phone('0631234567'))
+    address_book.add_record(Record(Name(names[0])))
+    assert_same_results(['112233', '998877', '31.12.1985', 'зоря', 'ЗОРЯ',
+                         names[0], names[1], '1234567', 'None'])
+
+    # other number of workers restarts the pool
+    assert_same_results(['зоря', '19', 'None'], workers=2)
+    state = pickle.loads(pickle.dumps(address_book))
+    assert ([rec.name.value for rec in state.search('зоря')]
+            == [rec.name.value for rec in address_book.search('зоря')])
+    address_book.stop_search_workers()
+    address_book.stop_search_workers()
+    assert [rec.name.value for rec in address_book.search_parallel('Ярослав Зоря', workers=1)] == [
+        'Ярослав Зоря']
+    address_book.stop_search_workers()
+
+    # workers of the book which is garbage collected without stop_search_workers are stopped
+    address_book.search_parallel('зоря', workers=2)
+    processes = address_book._search_shards._processes
+    assert all(process.is_alive() for process in processes)
+    del address_book, state, record
+    gc.collect()
+    assert not any(process.is_alive() for process in processes)
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,47 @@
+from assistant import AddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of seeded generator of fake records ... ", end='')
+    first_book = AddressBook()
+    first_book.add_fake_records(12000, seed=42)
+    assert len(first_book) == 12000
+    second_book = AddressBook()
+    second_book.add_fake_records(12000, seed=42, workers=2)
+    assert str(second_book) == str(first_book)
+    other_book = AddressBook()
+    other_book.add_fake_records(12000, seed=43)
+    assert str(other_book) != str(first_book)
+
+    # generated values pass the checks of the fields
+    for record in list(first_book.data.values())[:2000]:
+        Record(Name(record.name.value), birthday=Birthday(record.birthday.value) if record.birthday else None)
+        for phone in record.phones:
+            Phone(phone.value)
+    phones_count = sum(len(record.phones) for record in first_book.data.values())
+    assert 1.3 < phones_count / len(first_book) < 1.7
+    assert 0.6 < sum(1 for record in first_book.data.values() if record.birthday) / len(first_book) < 0.8
+
+    # records of the book are never overwritten
+    names = list(first_book.data)[:10]
+    first_book.add_fake_records(500, seed=42)
+    assert len(first_book) == 12500
+    assert list(first_book.data)[:10] == names
+
+    class RejectingBook(AddressBook):  # rejects the rows with names of 17 letters as if they were invalid
+        def add_records_bulk(self, rows):
+            super().add_records_bulk([row for row in rows if len(row[0]) != 17])
+            return [(i, 'rejected') for i, row in enumerate(rows) if len(row[0]) == 17]
+
+    rejecting_book = RejectingBook()
+    rejecting_book.add_fake_records(12000, seed=42, workers=2)
+    assert len(rejecting_book) == 12000
+
+    address_book = AddressBook()
+    address_book.add_fake_records(300)
+    assert len(address_book) == 300
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
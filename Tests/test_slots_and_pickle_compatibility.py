@@ -0,0 +1,34 @@
+import pickle
+from datetime import date
+from assistant import AddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print('Test of __slots__ and pickle compatibility of Name, Phone, Birthday and Record .....', end=' ')
+    rec = Record(Name('Vasya'), phone=Phone('0671234567'), birthday=Birthday(date(1996, 10, 15)))
+    for obj in (rec, rec.name, rec.phones[0], rec.birthday):
+        assert not hasattr(obj, '__dict__')
+
+    restored = pickle.loads(pickle.dumps(rec))
+    assert repr(restored) == repr(rec)
+
+    # state of objects pickled before __slots__ were introduced
+    name = Name.__new__(Name)
+    name.__setstate__({'_Field__value': None, '_Name__value': 'Bill'})
+    phone = Phone.__new__(Phone)
+    phone.__setstate__({'_Field__value': None, '_Phone__value': '0501112233'})
+    old_rec = Record.__new__(Record)
+    old_rec.__setstate__({'_Record__name': name, '_Record__birthday': None, 'phones': [phone]})
+    assert repr(old_rec) == "Record(name=Name('Bill'), phones=[Phone('0501112233')], birthday=None)"
+
+    address_book = AddressBook()
+    address_book.data['Bill'] = old_rec  # as restored by old pickles, without linking to the book
+    address_book = pickle.loads(pickle.dumps(address_book))
+    bill = address_book['Bill']
+    bill.change_phone(bill.phones[0], '0509998877')
+    assert address_book.find_by_phone('0509998877') == [bill]
+    print(' passed')
+
+
+if __name__ == '__main__':
+    test()
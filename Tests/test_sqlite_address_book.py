@@ -0,0 +1,92 @@
+import gc
+import os
+import tempfile
+from datetime import date
+from assistant import AddressBook, SQLiteAddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of SQLiteAddressBook ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(500)
+    address_book.add_record(Record(Name('Leap Day'), phone=Phone('0671234567'), birthday=Birthday(date(2000, 2, 29))))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_filename = os.path.join(tmp_dir, 'address_book.json')
+        database = os.path.join(tmp_dir, 'address_book.db')
+        address_book.json_dump(json_filename)
+        sqlite_book = SQLiteAddressBook(database)
+        loaded_book = AddressBook.json_load(json_filename)
+        for key, record in list(loaded_book.data.items()):
+            del loaded_book[key]  # the record can be stored only in one book
+            sqlite_book.add_record(record)
+
+        def names(records):
+            return [rec.name.value for rec in records]
+
+        def assert_same(book):
+            assert len(book) == len(address_book)
+            assert str(book) == str(address_book)
+            assert [names(page) for page in book] == [names(page) for page in address_book]
+            for phrase in ('1972', '19', 'ОЛЕ', 'оле', 'None', 'none', '.03.', '|38', 'Leap', 'zzz', 'а'):
+                for ignore_case in (True, False):
+                    assert names(book.search(phrase, ignore_case)) == names(address_book.search(phrase, ignore_case))
+            for number in ('0671234567', '067', '38', '4567'):
+                assert set(names(book.find_by_phone(number))) == set(names(address_book.find_by_phone(number)))
+                assert (set(names(book.find_by_phone_prefix(number)))
+                        == set(names(address_book.find_by_phone_prefix(number))))
+                assert (set(names(book.find_by_phone_suffix(number)))
+                        == set(names(address_book.find_by_phone_suffix(number))))
+            for as_of in (date(2023, 2, 27), date(2024, 2, 27), date(2023, 12, 25)):
+                assert names(book.upcoming_birthdays(40, as_of)) == names(address_book.upcoming_birthdays(40, as_of))
+
+        assert_same(sqlite_book)
+
+        first, second = list(address_book.data)[:2]
+        for book in (address_book, sqlite_book):
+            leap = book['Leap Day']
+            leap.add_phone(Phone('0509998877'))
+            leap.change_phone(leap.phones[0], '0631112233')
+            leap.birthday.value = date(1990, 3, 1)
+            del book[second]
+            book.add_record(Record(Name('New Person'), phone=Phone('0441234567')))
+        assert_same(sqlite_book)
+
+        another_connection = SQLiteAddressBook(database)  # every change is committed at once
+        assert_same(another_connection)
+        another_connection.add_record(Record(Name('Other Process'), phone=Phone('0447654321')))
+        assert 'Other Process' in sqlite_book
+        del another_connection['Other Process']
+        with sqlite_book.batch():
+            sqlite_book.add_record(Record(Name('In Batch'), phone=Phone('0447654321')))
+            assert 'In Batch' not in another_connection
+        assert 'In Batch' in another_connection
+        del sqlite_book['In Batch']
+        another_connection.close()
+
+        # the changes are kept when the book is dropped without close()
+        dropped_book = SQLiteAddressBook(os.path.join(tmp_dir, 'dropped.db'))
+        dropped_book.add_record(Record(Name('Not Closed')))
+        del dropped_book
+        gc.collect()
+        reopened = SQLiteAddressBook(os.path.join(tmp_dir, 'dropped.db'))
+        assert list(reopened.data) == ['Not Closed']
+        reopened.close()
+
+        # json_load starts from the empty database
+        address_book.json_dump(json_filename)
+        loaded = SQLiteAddressBook.json_load(json_filename, os.path.join(tmp_dir, 'dropped.db'))
+        assert_same(loaded)
+        loaded.close()
+
+        address_book.json_dump(json_filename)
+        with open(json_filename, encoding='utf-8') as fh:
+            expected = fh.read()
+        sqlite_book.json_dump(json_filename)
+        with open(json_filename, encoding='utf-8') as fh:
+            assert fh.read() == expected
+        sqlite_book.close()
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
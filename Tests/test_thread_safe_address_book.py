@@ -0,0 +1,179 @@
+import asyncio
+import os
+import pickle
+import tempfile
+import threading
+from datetime import date
+from assistant import AddressBook, MappedAddressBook, ThreadSafeAddressBook, Birthday, Name, Phone, Record
+
+
+def test():
+    print("Test of ThreadSafeAddressBook ... ", end='')
+    address_book = ThreadSafeAddressBook(search_index=True)
+    address_book.add_fake_records(500, seed=17)
+
+    # every version of the contact has consistent fields: birthday day, phone and the number in the name
+    def version_of(record):
+        version = int(record.name.value.split()[-1].removeprefix('В'))
+        assert record.birthday.value.day == version % 28 + 1, record
+        assert [phone.value for phone in record.phones] == [f'067{version:07d}', f'050{version:07d}'], record
+        return version
+
+    for i in range(20):
+        record = Record(Name(f'Контакт В{i}'), phone=Phone(f'067{i:07d}'),
+                        birthday=Birthday(date(1990, 1, i % 28 + 1)))
+        record.add_phone(Phone(f'050{i:07d}'))
+        address_book.add_record(record)
+
+    errors = []
+    stop = threading.Event()
+
+    def writer():
+        try:
+            for step in range(20, 400):
+                key = f'Контакт В{step % 20}'
+                with address_book.edit(key) as record:
+                    record.phones[0].value = f'067{step:07d}'
+                    record.birthday.value = date(1990, 1, step % 28 + 1)
+                    record.phones[1].value = f'050{step:07d}'
+                    record.name.value = f'Контакт В{step}'
+                new_record = Record(Name(f'Новий {step}'), phone=Phone(f'063{step:07d}'))
+                address_book.add_record(new_record)
+                del address_book[f'Новий {step}']
+        except Exception as error:  # noqa
+            errors.append(error)
+        finally:
+            stop.set()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                for page in address_book:
+                    for record in page:
+                        if record.name.value.startswith('Контакт'):
+                            version_of(record)
+                for record in address_book.search('Контакт'):
+                    version_of(record)
+                for record in address_book.find_by_phone_prefix('067'):
+                    if record.name.value.startswith('Контакт'):
+                        version_of(record)
+                str(address_book)
+        except Exception as error:  # noqa
+            errors.append(error)
+
+    # async methods and dumps take their snapshots under the lock, so they never see half-done changes
+    async def read_async(tmp_dir):
+        async for record in address_book.search_async('Контакт', chunk_size=50):
+            version_of(record)
+        async for page in address_book:
+            for record in page:
+                if record.name.value.startswith('Контакт'):
+                    version_of(record)
+        await address_book.json_dump_async(os.path.join(tmp_dir, 'async.json'))
+        await address_book.pickle_dump_async(os.path.join(tmp_dir, 'async.bin'))
+        return [AddressBook.json_load(os.path.join(tmp_dir, 'async.json')),
+                ThreadSafeAddressBook.pickle_load(os.path.join(tmp_dir, 'async.bin'))]
+
+    def dump_reader():
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                while True:
+                    books = asyncio.run(read_async(tmp_dir))
+                    address_book.snapshot_dump(os.path.join(tmp_dir, 'address_book.snapshot'))
+                    mapped_book = MappedAddressBook(os.path.join(tmp_dir, 'address_book.snapshot'))
+                    address_book.ndjson_dump(os.path.join(tmp_dir, 'address_book.ndjson'))
+                    books += [mapped_book, AddressBook.ndjson_load(os.path.join(tmp_dir, 'address_book.ndjson'))]
+                    for book in books:  # the files keep the keys as names, so the versions are checked by phones
+                        assert len(book) in (520, 521), len(book)
+                        for record in book.data.values():
+                            if record.name.value.startswith('Контакт'):
+                                version = int(record.phones[0].value[3:])
+                                assert record.phones[1].value == f'050{version:07d}', record
+                                assert record.birthday.value.day == version % 28 + 1, record
+                    mapped_book.close()
+                    if stop.is_set():
+                        break
+        except Exception as error:  # noqa
+            errors.append(error)
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=dump_reader)]
+    threads += [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+    versions = sorted(version_of(address_book[f'Контакт В{i}']) for i in range(20))
+    assert versions == list(range(380, 400))
+    assert len(address_book) == 520
+    assert [rec.name.value for rec in address_book.find_by_phone('0670000399')] == ['Контакт В399']
+    assert [rec.name.value for rec in address_book.find_by_phone('0670000001')] == []
+
+    # the readers wait while another thread holds the lock for writing
+    async def collect(async_iterable):
+        return [item async for item in async_iterable]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reads = (lambda: asyncio.run(collect(address_book.search_async('Контакт'))),
+                 lambda: asyncio.run(collect(address_book)),
+                 lambda: asyncio.run(address_book.json_dump_async(os.path.join(tmp_dir, 'async.json'))),
+                 lambda: asyncio.run(address_book.pickle_dump_async(os.path.join(tmp_dir, 'async.bin'))),
+                 lambda: address_book.snapshot_dump(os.path.join(tmp_dir, 'address_book.snapshot')),
+                 lambda: address_book.ndjson_dump(os.path.join(tmp_dir, 'address_book.ndjson')))
+        for read in reads:
+            address_book._records = None  # iteration takes new snapshot
+            thread = threading.Thread(target=read)
+            with address_book._lock.write():
+                thread.start()
+                thread.join(0.2)
+                assert thread.is_alive()
+            thread.join()
+
+    # records changed in the failed edit block stay the same
+    try:
+        with address_book.edit('Контакт В0') as record:
+            record.add_phone(Phone('0999999999'))
+            raise ValueError
+    except ValueError:
+        pass
+    assert len(address_book['Контакт В0'].phones) == 2
+
+    # stored records are changed only inside the lock, other threads cannot see half of the change
+    record = address_book['Контакт В0']
+    changes = (lambda: record.add_phone(Phone('0999999999')), lambda: record.delete_phone(record.phones[0]),
+               lambda: record.delete_all_phones(), lambda: record.change_phone(record.phones[0], '0999999999'),
+               lambda: setattr(record.phones[1], 'value', '0999999999'),
+               lambda: setattr(record.name, 'value', 'Інше Імя'),
+               lambda: setattr(record, 'birthday', Birthday(date(1991, 1, 1))),
+               lambda: setattr(record.birthday, 'value', date(1991, 1, 1)))
+    for change in changes:
+        try:
+            change()
+        except RuntimeError:
+            pass
+        else:
+            assert False, 'stored record was changed outside the lock'
+        assert address_book['Контакт В0'] is record and version_of(record) == 380
+        assert address_book.find_by_phone('0670000380') == [record]
+    del address_book['Контакт В0']
+    record.add_phone(Phone('0999999999'))  # the record is not in the book anymore
+    address_book['Контакт В0'] = record
+    assert len(address_book['Контакт В0'].phones) == 3
+    address_book.add_fake_records(10)
+    assert len(address_book) == 530
+
+    records = address_book.data
+    lines = [f'{i:>4} |' + str(records[name]) + '\n' for i, name in enumerate(sorted(records), 1)]
+    assert str(address_book) == AddressBook._render_table(lines)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filename = os.path.join(tmp_dir, 'address_book.bin')
+        address_book.pickle_dump(filename)
+        loaded = ThreadSafeAddressBook.pickle_load(filename)
+    assert type(loaded) is ThreadSafeAddressBook and str(loaded) == str(address_book)
+    assert str(pickle.loads(pickle.dumps(address_book))) == str(address_book)
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
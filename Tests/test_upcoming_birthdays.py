@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+from assistant import AddressBook, Birthday, Name, Record
+
+
+def test():
+    print("Test of method AddressBook.upcoming_birthdays ... ", end='')
+    address_book = AddressBook()
+    address_book.add_fake_records(500)
+    leap = Record(Name('Leap Day'), birthday=Birthday(date(2000, 2, 29)))
+    address_book.add_record(leap)
+
+    assert leap.days_to_birthday(as_of=date(2023, 2, 27)) == 1
+    assert leap.days_to_birthday(as_of=date(2024, 2, 28)) == 1
+    assert leap in address_book.upcoming_birthdays(1, as_of=date(2023, 2, 28))
+    assert leap not in address_book.upcoming_birthdays(1, as_of=date(2024, 2, 28))
+    assert leap in address_book.upcoming_birthdays(2, as_of=date(2024, 2, 28))
+
+    for as_of in (date(2023, 1, 1), date(2023, 12, 20), date(2024, 2, 25)):
+        for days in (1, 7, 30, 365, 400):
+            expected = sorted((rec.days_to_birthday(as_of), rec.name.value) for rec in address_book.data.values()
+                              if rec.birthday and rec.days_to_birthday(as_of) < days)
+            actual = [(rec.days_to_birthday(as_of), rec.name.value)
+                      for rec in address_book.upcoming_birthdays(days, as_of=as_of)]
+            assert actual == expected, (as_of, days)
+
+    birth_date = date.today().replace(year=1992)
+    leap.birthday.value = birth_date
+    assert leap in address_book.upcoming_birthdays(1)
+    leap.birthday = Birthday(birth_date - timedelta(days=100))
+    assert leap not in address_book.upcoming_birthdays(1)
+    print('passed')
+
+
+if __name__ == '__main__':
+    test()
@@ -1,36 +1,147 @@
-from collections import UserDict
-from datetime import datetime, date
-from faker import Faker
+from abc import ABC, abstractmethod
+from array import array
+import base64
+from bisect import bisect_left, bisect_right, insort
+from calendar import isleap
+from collections import UserDict, defaultdict
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from contextlib import contextmanager
+import csv
+from datetime import datetime, date, timedelta
+import gc
+from math import gcd
+from functools import partial, wraps
+from heapq import merge, nsmallest
+from itertools import count, islice
 import json
+import mmap
+import multiprocessing
+import os
 import pickle
-from random import randint, choice
+import sqlite3
+import struct
+import tempfile
+import textwrap
+import threading
+import time
+import warnings
+import weakref
+from random import randint, choice, Random
+# faker, asyncio and concurrent.futures take most of the import time, they are imported by the functions using them
+
+
+_PHONE_SIGNS = b'()-*x '  # signs removed from phone numbers
+
+
+# checks of the values shared by the setters of the fields and AddressBook.add_records_bulk
+
+def _validate_name(name: str) -> str:
+    """returns the name if it is valid, raises TypeError or ValueError otherwise"""
+    if type(name) is not str:
+        raise TypeError('Name must be string')
+    if len(name) < 3:
+        raise ValueError('Name is too short. Must be minimum 3 characters')
+    if not name.replace(' ', '').replace("'", '').replace('-', '').isalnum():
+        raise ValueError('Name contains not allowed signs')
+    return name
+
+
+def _validate_phone(number: str) -> str:
+    """returns sanitized phone number if it is valid, raises ValueError otherwise"""
+    if len(number) < 7:
+        raise ValueError('Phone is too short. Must be minimum 7 digits')
+    if not number.isdigit() or not number.isascii():
+        raise ValueError('Phone contains not allowed signs')
+    return number
+
+
+def _parse_date(text: str) -> date:
+    """
+    returns date from text 'dd.mm.yyyy' as datetime.strptime(text, '%d.%m.%Y') does. Text of exactly this
+    form is parsed by slicing, which is many times faster; any other text is left to strptime
+    """
+    if len(text) == 10 and text[2] == text[5] == '.' and (text[:2] + text[3:5] + text[6:]).isdigit() \
+            and text.isascii():
+        try:
+            return date(int(text[6:]), int(text[3:5]), int(text[:2]))
+        except ValueError:
+            pass  # strptime raises the error with its own message
+    return datetime.strptime(text, '%d.%m.%Y').date()
+
+
+def _validate_birthday(birthday: date | datetime, curr_date: date) -> date:
+    """returns birthday as date if it is valid on 'curr_date', raises TypeError or ValueError otherwise"""
+    if type(birthday) not in (date, datetime):
+        raise TypeError('Birthday must be date or datetime object')
+    if type(birthday) == datetime:
+        birthday = birthday.date()
+    if birthday > curr_date:
+        raise ValueError('Birthday cannot be the date after today')
+    if curr_date.year - birthday.year > 150:
+        raise ValueError('Person cannot be such old')
+    return birthday
 
 
 class Field:
     """parent class for fields in records such as Name, Phone, Birthday"""
 
+    __slots__ = ('_value', '_owner')  # '_owner' is the Record containing this field
+
     def __init__(self, value):
-        self.__value = None
+        self._value = None
+        self._owner = None
         self.value = value
 
     def __repr__(self):
         return f'Field({repr(self.value)})'
 
+    def __getstate__(self):
+        return (self._value,)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):  # fields pickled before __slots__ were introduced
+            values = [value for key, value in state.items() if key.endswith('__value') and key != '_Field__value']
+            state = values or [state.get('_Field__value')]
+        self._value, = state
+        self._owner = None
+
+    @classmethod
+    def _from_value(cls, value):
+        """creates field with the value which is known to be valid skipping the validation"""
+        field = cls.__new__(cls)
+        field._value = value
+        field._owner = None
+        return field
+
+    def _check_change(self) -> None:
+        """asks the Record containing this field whether the value of the field may be changed now"""
+        if self._owner is not None:
+            self._owner._check_change()
+
+    def _notify(self) -> None:
+        """informs the Record containing this field that the value of the field was changed"""
+        if self._owner is not None:
+            self._owner._notify()
+
     def __str__(self):
         return f'This is Field with value: {self.value}'
 
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, new_value):
-        self.__value = new_value
+        self._check_change()
+        self._value = new_value
+        self._notify()
 
 
 class Name(Field):
     """Class for name field"""
 
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
 
@@ -42,27 +153,20 @@ class Name(Field):
 
     @property
     def value(self):
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, name: str):
-        if type(name) is not str:
-            raise TypeError('Name must be string')
-        if len(name) < 3:
-            raise ValueError('Name is too short. Must be minimum 3 characters')
-        if not (name
-                .replace(' ', '')
-                .replace("'", '')
-                .replace('-', '')
-                .isalnum()):
-            print(name)
-            raise ValueError('Name contains not allowed signs')
-        self.__value = name
+        self._check_change()
+        self._value = _validate_name(name)
+        self._notify()
 
 
 class Phone(Field):
     """Class for phone field"""
 
+    __slots__ = ()
+
     def __init__(self, phone: str):
         super().__init__(phone)
 
@@ -70,50 +174,50 @@ class Phone(Field):
         return f'Phone({repr(self.value)})'
 
     def __str__(self):
+        return self._format_number(self.value)
+
+    @staticmethod
+    def _format_number(number: str) -> str:
+        """formats sanitized phone number for output"""
         result_string = ''
-        if len(self.value) > 10:
-            result_string += self.value[-15:-10]
-        if len(self.value) > 7:
-            result_string += f'({self.value[-10:-7]})'
-        result_string += f'{self.value[-7:-4]}-{self.value[-4:-2]}-{self.value[-2:]}'
+        if len(number) > 10:
+            result_string += number[-15:-10]
+        if len(number) > 7:
+            result_string += f'({number[-10:-7]})'
+        result_string += f'{number[-7:-4]}-{number[-4:-2]}-{number[-2:]}'
         return result_string
 
     @property
     def value(self) -> str:
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, phone: str | int):
-        phone = str(phone)
-        phone = self._sanitize_phone_number(phone)
-        if len(phone) < 7:
-            raise ValueError('Phone is too short. Must be minimum 7 digits')
-        if not phone.isdigit():
-            raise ValueError('Phone contains not allowed signs')
-        self.__value = phone
+        self._check_change()
+        self._value = _validate_phone(self._sanitize_phone_number(str(phone)))
+        self._notify()
 
-    def _sanitize_phone_number(self, phone: str) -> str:
+    @staticmethod
+    def _sanitize_phone_number(phone: str) -> str:
         """
         helper function for deleting all unnecessary signs from phone number
         :param phone: string representing phone number
         :return: sanitized phone number string
         """
-        new_phone = (
-            phone.strip()
-            .removeprefix("+")
-            .replace("(", "")
-            .replace(")", "")
-            .replace("-", "")
-            .replace('*', "")
-            .replace('x', "")
-            .replace(" ", "")
-        )
-        return new_phone
+        phone = phone.strip().removeprefix('+')
+        if phone.isascii():  # deleting with bytes.translate is faster than a chain of str.replace
+            return phone.encode('ascii').translate(None, _PHONE_SIGNS).decode('ascii')
+        phone = (phone.replace('(', '').replace(')', '').replace('-', '').replace('*', '')
+                 .replace('x', '').replace(' ', ''))
+        # decimal digits of other scripts (e.g. Arabic-Indic) are stored as ASCII ones, storages encode them as ASCII
+        return ''.join(str(int(char)) if char.isdecimal() else char for char in phone)
 
 
 class Birthday(Field):
     """Class for field of birthday. Birthday is stored as datetime.date object"""
 
+    __slots__ = ()
+
     def __init__(self, birthday: date | datetime):
         super().__init__(birthday)
 
@@ -125,20 +229,20 @@ class Birthday(Field):
 
     @property
     def value(self) -> date:
-        return self.__value
+        return self._value
 
     @value.setter
     def value(self, birthday: date | datetime):
-        if type(birthday) not in (date, datetime):
-            raise TypeError('Birthday must be date or datetime object')
-        if type(birthday) == datetime:
-            birthday = birthday.date()
-        curr_date = datetime.now().date()
-        if birthday > curr_date:
-            raise ValueError('Birthday cannot be the date after today')
-        if curr_date.year - birthday.year > 150:
-            raise ValueError('Person cannot be such old')
-        self.__value = birthday
+        self._check_change()
+        self._value = _validate_birthday(birthday, datetime.now().date())
+        self._notify()
+
+
+def _birthday_in_year(birth: date, year: int) -> date:
+    """returns date of the birthday in given 'year'. Birthday on 29th of February is on 28th in non-leap years"""
+    if birth.month == 2 and birth.day == 29 and not isleap(year):
+        return date(year, 2, 28)
+    return birth.replace(year=year)
 
 
 class Record:
@@ -151,23 +255,86 @@ class Record:
         birthday (Birthday): date of the birth of the contact. Optional
     """
 
+    # '_book' is the AddressBook containing this record under the key '_key'
+    # '__weakref__' lets books which build records from stored data share one record per key
+    __slots__ = ('__name', '__birthday', 'phones', '_book', '_key', '__weakref__')
+
     def __init__(self, name: Name, phone: Phone = None, birthday: Birthday = None):
         self.__name = None
         self.__birthday = None
+        self._book = None
+        self._key = None
         self.name = name
         self.birthday = birthday
 
         self.phones = list()
         if phone and type(phone) is Phone:
+            self._own(phone)
             self.phones.append(phone)
 
     def __repr__(self):
         return f'Record(name={repr(self.name)}, phones={self.phones}, birthday={repr(self.birthday)})'
 
+    def __getstate__(self):
+        # values instead of fields: name, ordinal of birthday (0 if not set) and phone numbers
+        birthday = self.__birthday.value.toordinal() if self.__birthday is not None else 0
+        return self.__name.value, birthday, tuple(phone.value for phone in self.phones)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):  # records pickled with their fields by older versions
+            self.__name = state['_Record__name']
+            self.__birthday = state['_Record__birthday']
+            self.phones = state['phones']
+        else:
+            name, birthday, phones = state
+            self.__name = Name._from_value(name)
+            self.__birthday = Birthday._from_value(date.fromordinal(birthday)) if birthday else None
+            self.phones = [Phone._from_value(phone) for phone in phones]
+        self._book = self._key = None
+
+    @classmethod
+    def _from_fields(cls, name: Name, birthday: Birthday | None, phones: list[Phone]):
+        """creates Record from the fields which are known to be valid skipping the checks"""
+        record = cls.__new__(cls)
+        record.__name = name
+        record.__birthday = birthday
+        record.phones = phones
+        record._book = record._key = None
+        name._owner = record
+        if birthday is not None:
+            birthday._owner = record
+        for phone in phones:
+            phone._owner = record
+        return record
+
+    def _own(self, field: Field) -> None:
+        """
+        makes current Record the owner of given field which reports its changes to it.
+        Raises ValueError if the field belongs to another Record: only one of them would learn about the changes
+        """
+        if field._owner is not None and field._owner is not self:
+            raise ValueError(f'{field!r} already belongs to another record, create a new {type(field).__name__}')
+        field._owner = self
+
+    def _check_change(self) -> None:
+        """asks the AddressBook containing this record whether the record may be changed now"""
+        if self._book is not None:
+            self._book._record_changing(self._key, self)
+
+    def _notify(self) -> None:
+        """informs the AddressBook containing this record that the record was changed"""
+        if self._book is not None:
+            self._book._record_changed(self._key, self)
+
     def __str__(self):
-        return (f'{self.name.value:<28}|  '
-                f'{str(self.birthday) if self.birthday else "":<12}|  ' +
-                ', '.join(str(phone) for phone in self.phones))
+        return self._format_line(self.name.value,
+                                 str(self.birthday) if self.birthday else '',
+                                 [str(phone) for phone in self.phones])
+
+    @staticmethod
+    def _format_line(name: str, birthday: str, phones: list[str]) -> str:
+        """formats name, birthday and phones of the record for output as a row of table"""
+        return f'{name:<28}|  {birthday:<12}|  ' + ', '.join(phones)
 
     @property
     def name(self) -> Name:
@@ -179,6 +346,7 @@ class Record:
             raise AttributeError('Name already exist for this record')
         if type(new_name) is not Name:
             raise TypeError('Wrong type of given name')
+        self._own(new_name)
         self.__name = new_name
 
     @property
@@ -188,7 +356,12 @@ class Record:
     @birthday.setter
     def birthday(self, birth: Birthday):
         if type(birth) is Birthday:
+            self._check_change()
+            self._own(birth)
+            if self.__birthday is not None and self.__birthday is not birth:
+                self.__birthday._owner = None
             self.__birthday = birth
+            self._notify()
 
     def add_phone(self, phone: Phone) -> None:
         """
@@ -196,7 +369,10 @@ class Record:
         :param phone: Phone obj with value of phone
         :return: None
         """
+        self._check_change()
+        self._own(phone)
         self.phones.append(phone)
+        self._notify()
 
     def change_phone(self, phone: Phone, new_value: str) -> None:
         """
@@ -214,7 +390,11 @@ class Record:
         :return: None
         """
         if phone in self.phones:
+            self._check_change()
             self.phones.remove(phone)
+            if phone not in self.phones:  # the same Phone may be added twice
+                phone._owner = None
+            self._notify()
         else:
             raise KeyError(f'{self.name} does not have such phone number {phone.value}')
 
@@ -223,26 +403,1078 @@ class Record:
         removes all phone numbers in list of phones in current Record
         :return:
         """
+        self._check_change()
+        for phone in self.phones:
+            phone._owner = None
         self.phones.clear()
+        self._notify()
 
-    def days_to_birthday(self) -> int | None:
+    def days_to_birthday(self, as_of: date = None) -> int | None:
         """
         calculates and returns number of day to the next birthday.
         returns None if no birthday set in the current Record
+        :param as_of: date from which days are counted. Optional (today if not given)
         """
         if not self.birthday:
             return None
-        curr_date = datetime.now().date()
+        curr_date = as_of or datetime.now().date()
         curr_year = curr_date.year
-        birthday_in_curr_year = self.birthday.value.replace(year=curr_year)
+        birthday_in_curr_year = _birthday_in_year(self.birthday.value, curr_year)
         if curr_date <= birthday_in_curr_year:
             delta = birthday_in_curr_year - curr_date
             return delta.days
-        birthday_in_next_year = birthday_in_curr_year.replace(year=curr_year + 1)
+        birthday_in_next_year = _birthday_in_year(self.birthday.value, curr_year + 1)
         delta = birthday_in_next_year - curr_date
         return delta.days
 
 
+def _fold(text: str) -> str:
+    """
+    lowercases text character by character. Unlike plain str.lower the result does not depend
+    on the context of the characters (final sigma), so a substring of the text (in any case)
+    always folds to a substring of the folded text
+    """
+    return text.lower().replace('ς', 'σ')
+
+
+def _name_key(name: str) -> str:
+    """
+    returns normalized name for finding duplicates: folded case, without apostrophes,
+    with hyphens as spaces and with words sorted,
+    so 'Петренко-Коваль Іван' and "іван петренко коваль" are equal
+    """
+    return ' '.join(sorted(_fold(name).replace("'", '').replace('-', ' ').split()))
+
+
+def _phone_key(number: str) -> str:
+    """
+    returns the last 10 digits of phone number sanitized by Phone (value of Phone),
+    so the numbers with and without country code are equal
+    """
+    return number[-10:]
+
+
+class _NGramIndex:
+    """
+    Inverted index of n-grams of the texts searched by AddressBook.search.
+    Maps every n-gram of folded name, birthday and phones of a record to the set of keys
+    of the records containing it. The index is notified by AddressBook about every change
+    """
+    N = 3
+
+    def __init__(self):
+        self._postings = defaultdict(set)  # n-gram -> keys of records
+        self._texts = {}  # key -> folded texts of the record which are in the index now
+        self._order = {}  # key -> number reflecting order of insertion to the address book
+        self._counter = count()
+
+    def _grams(self, text: str) -> set[str]:
+        return {text[i:i + self.N] for i in range(len(text) - self.N + 1)}
+
+    def _index(self, key: str, record: Record) -> None:
+        texts = tuple(_fold(text) for text in AddressBook._search_texts(key, record))
+        self._texts[key] = texts
+        for text in texts:
+            for gram in self._grams(text):
+                self._postings[gram].add(key)
+
+    def _unindex(self, key: str) -> None:
+        for text in self._texts.pop(key):
+            for gram in self._grams(text):
+                keys = self._postings[gram]
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def record_added(self, key: str, record: Record) -> None:
+        self._order[key] = next(self._counter)
+        self._index(key, record)
+
+    def record_changed(self, key: str, record: Record) -> None:
+        self._unindex(key)
+        self._index(key, record)
+
+    def record_removed(self, key: str, record: Record) -> None:
+        self._unindex(key)
+        del self._order[key]
+
+    def candidates(self, phrase: str) -> list[str] | None:
+        """
+        returns keys of records which may contain given 'phrase' in order of their insertion
+        to the address book, or None if the phrase is too short for the index
+        """
+        grams = self._grams(_fold(phrase))
+        if not grams:
+            return None
+        postings = []
+        for gram in grams:
+            keys = self._postings.get(gram)
+            if not keys:
+                return []
+            postings.append(keys)
+        postings.sort(key=len)
+        return sorted(postings[0].intersection(*postings[1:]), key=self._order.__getitem__)
+
+    def estimate(self, phrase: str) -> int | None:
+        """returns the size of the smallest posting list of n-grams of the phrase, or None if the phrase is too short"""
+        grams = self._grams(_fold(phrase))
+        if not grams:
+            return None
+        return min(len(self._postings.get(gram, ())) for gram in grams)
+
+
+class _PhoneIndex:
+    """
+    Reverse index of phone numbers of records: dictionary for exact numbers and
+    sorted lists of numbers and of reversed numbers for prefix and suffix queries.
+    New numbers are merged into the sorted lists at once before the next prefix or suffix query,
+    so filling the book does not pay for insertion into the middle of the lists. Removed numbers
+    stay in the lists and are skipped by queries until there are too many of them, then the lists
+    are compacted at once, so removal does not shift the lists either. The removed entries are kept
+    in sorted lists too, so a query finds the ones to skip by bisecting as it finds the numbers
+    """
+
+    def __init__(self):
+        self._exact = defaultdict(list)  # number -> keys of records having it
+        self._numbers = {}  # key -> numbers of the record which are in the index now
+        self._by_prefix = []  # sorted (number, key)
+        self._by_suffix = []  # sorted (reversed number, key)
+        self._pending = defaultdict(int)  # (number, key) -> count of the entries not merged into the lists yet
+        self._removed = []  # (number, key) of the entries removed but still in the lists, not merged yet
+        self._removed_by_prefix = []  # sorted (number, key) of the merged removed entries
+        self._removed_by_suffix = []  # sorted (reversed number, key) of the merged removed entries
+
+    def _index(self, key: str, record: Record) -> None:
+        numbers = tuple(phone.value for phone in record.phones)
+        self._numbers[key] = numbers
+        for number in numbers:
+            self._exact[number].append(key)
+            self._pending[number, key] += 1
+
+    def _unindex(self, key: str) -> None:
+        for number in self._numbers.pop(key):
+            keys = self._exact[number]
+            keys.remove(key)
+            if not keys:
+                del self._exact[number]
+            if self._pending.get((number, key)):
+                self._pending[number, key] -= 1
+                if not self._pending[number, key]:
+                    del self._pending[number, key]
+            else:
+                self._removed.append((number, key))
+
+    def _merge_pending(self) -> None:
+        if self._removed:
+            self._removed_by_prefix.extend(self._removed)
+            self._removed_by_suffix.extend((number[::-1], key) for number, key in self._removed)
+            self._removed_by_prefix.sort()
+            self._removed_by_suffix.sort()
+            self._removed.clear()
+        if len(self._removed_by_prefix) * 4 > len(self._by_prefix):  # compacting costs as much as sorting
+            removed = self._counts(self._removed_by_prefix)
+            self._by_prefix = [entry for entry in self._by_prefix if not self._take(removed, entry)]
+            self._by_suffix = [(number[::-1], key) for number, key in self._by_prefix]
+            self._by_suffix.sort()
+            self._removed_by_prefix = []
+            self._removed_by_suffix = []
+        if self._pending:
+            for (number, key), number_count in self._pending.items():
+                self._by_prefix.extend([(number, key)] * number_count)
+                self._by_suffix.extend([(number[::-1], key)] * number_count)
+            self._by_prefix.sort()
+            self._by_suffix.sort()
+            self._pending.clear()
+
+    @staticmethod
+    def _counts(entries: list[tuple[str, str]]) -> dict:
+        """returns dictionary (number, key) -> count of the entries"""
+        counts = defaultdict(int)
+        for entry in entries:
+            counts[entry] += 1
+        return counts
+
+    @staticmethod
+    def _take(removed: dict, entry: tuple[str, str]) -> bool:
+        """returns True if the entry (number, key) is removed and counts it off from 'removed'"""
+        if removed and removed.get(entry):
+            removed[entry] -= 1
+            return True
+        return False
+
+    def record_added(self, key: str, record: Record) -> None:
+        self._index(key, record)
+
+    def records_added(self, items: list[tuple[str, Record]]) -> None:
+        """does the same as 'record_added' for every (key, record) pair of new records"""
+        exact, numbers, pending = self._exact, self._numbers, self._pending
+        for key, record in items:
+            record_numbers = numbers[key] = tuple([phone._value for phone in record.phones])
+            for number in record_numbers:
+                exact[number].append(key)
+                pending[number, key] += 1
+
+    def record_changed(self, key: str, record: Record) -> None:
+        self._unindex(key)
+        self._index(key, record)
+
+    def record_removed(self, key: str, record: Record) -> None:
+        self._unindex(key)
+
+    @staticmethod
+    def _starting_with(entries: list[tuple[str, str]], start: str) -> list[tuple[str, str]]:
+        # numbers consist of digits, so all the numbers starting with 'start' are less than start + ':'
+        return entries[bisect_left(entries, (start,)):bisect_left(entries, (start + ':',))]
+
+    def _keys_starting_with(self, entries: list[tuple[str, str]], removed_entries: list[tuple[str, str]],
+                            start: str) -> list[str]:
+        found = self._starting_with(entries, start)
+        removed = self._starting_with(removed_entries, start)
+        if not removed:
+            return [key for _, key in found]
+        removed = self._counts(removed)  # only the removed entries among the found ones are counted
+        return [key for number, key in found if not self._take(removed, (number, key))]
+
+    @staticmethod
+    def _count_starting_with(entries: list[tuple[str, str]], removed_entries: list[tuple[str, str]],
+                             start: str) -> int:
+        return (bisect_left(entries, (start + ':',)) - bisect_left(entries, (start,))
+                - bisect_left(removed_entries, (start + ':',)) + bisect_left(removed_entries, (start,)))
+
+    def exact(self, number: str) -> list[str]:
+        """returns keys of records having given number"""
+        return list(self._exact.get(number, ()))
+
+    def prefix(self, prefix: str) -> list[str]:
+        """returns keys of records having numbers which start with given 'prefix' ordered by numbers"""
+        self._merge_pending()
+        return self._keys_starting_with(self._by_prefix, self._removed_by_prefix, prefix)
+
+    def suffix(self, suffix: str) -> list[str]:
+        """returns keys of records having numbers which end with given 'suffix' ordered by reversed numbers"""
+        self._merge_pending()
+        return self._keys_starting_with(self._by_suffix, self._removed_by_suffix, suffix[::-1])
+
+    def count_prefix(self, prefix: str) -> int:
+        """returns number of phone numbers starting with given 'prefix'"""
+        self._merge_pending()
+        return self._count_starting_with(self._by_prefix, self._removed_by_prefix, prefix)
+
+    def count_suffix(self, suffix: str) -> int:
+        """returns number of phone numbers ending with given 'suffix'"""
+        self._merge_pending()
+        return self._count_starting_with(self._by_suffix, self._removed_by_suffix, suffix[::-1])
+
+
+def _birthday_buckets(days: int, as_of: date):
+    """
+    creates generator which returns for each of 'days' days starting from 'as_of' the list of
+    (month, day) of birthdays celebrated on that day. Every (month, day) is returned only once
+    """
+    visited = set()
+    for offset in range(min(days, 366)):
+        curr_date = as_of + timedelta(days=offset)
+        buckets = [(curr_date.month, curr_date.day)]
+        if buckets[0] == (2, 28) and not isleap(curr_date.year):
+            buckets.append((2, 29))
+        yield [bucket for bucket in buckets if bucket not in visited]
+        visited.update(buckets)
+
+
+class _BirthdayIndex:
+    """Calendar index of birthdays: maps (month, day) of the birthday to the keys of records"""
+
+    def __init__(self):
+        self._buckets = defaultdict(set)  # (month, day) -> keys of records
+        self._days = {}  # key -> (month, day) of the record which is in the index now
+
+    def _index(self, key: str, record: Record) -> None:
+        if record.birthday:
+            day = record.birthday.value.month, record.birthday.value.day
+            self._days[key] = day
+            self._buckets[day].add(key)
+
+    def _unindex(self, key: str) -> None:
+        day = self._days.pop(key, None)
+        if day is not None:
+            keys = self._buckets[day]
+            keys.discard(key)
+            if not keys:
+                del self._buckets[day]
+
+    def record_added(self, key: str, record: Record) -> None:
+        self._index(key, record)
+
+    def records_added(self, items: list[tuple[str, Record]]) -> None:
+        """does the same as 'record_added' for every (key, record) pair of new records"""
+        buckets, days = self._buckets, self._days
+        for key, record in items:
+            birthday = record.birthday
+            if birthday is not None:
+                day = days[key] = birthday._value.month, birthday._value.day
+                buckets[day].add(key)
+
+    def record_changed(self, key: str, record: Record) -> None:
+        self._unindex(key)
+        self._index(key, record)
+
+    def record_removed(self, key: str, record: Record) -> None:
+        self._unindex(key)
+
+    def upcoming(self, days: int, as_of: date) -> list[str]:
+        """returns keys of records with birthdays in 'days' days starting from 'as_of' ordered by date and key"""
+        keys = []
+        for buckets in _birthday_buckets(days, as_of):
+            keys.extend(sorted(key for bucket in buckets for key in self._buckets.get(bucket, ())))
+        return keys
+
+    def on_days(self, days: list[tuple[int, int]]) -> list[str]:
+        """returns keys of records with birthdays on given (month, day) days"""
+        return [key for day in days for key in self._buckets.get(day, ())]
+
+    def count_on_days(self, days: list[tuple[int, int]]) -> int:
+        """returns number of records with birthdays on given (month, day) days"""
+        return sum(len(self._buckets.get(day, ())) for day in days)
+
+
+_FAKE_BATCH_SIZE = 10000  # rows generated from one random state, so the result does not depend on the workers
+_FAKE_BIRTHDAYS = date(1911, 1, 1).toordinal(), date(2010, 12, 31).toordinal()  # fixed, so results do not age
+_FAKE_PHONES_COUNT = (0, 1, 1, 2, 2, 3)  # 1.5 phones per record as in add_fake_records
+_FAKE_STEP = 1000003  # prime step scattering the indexes of the rows over all combinations of names
+
+
+def _fake_pools() -> tuple[tuple[str, ...], tuple[str, ...], tuple[tuple[str, int], ...]]:
+    """
+    returns pools of the generator taken from Faker 'uk_UA' providers: first names, last names
+    (double ones are excluded to keep generated double last names unique) and phone formats
+    as str.format templates with the number of digits in them
+    """
+    from faker.providers.person.uk_UA import Provider as _PersonProvider
+    from faker.providers.phone_number.uk_UA import Provider as _PhoneProvider
+
+    first_names = tuple(dict.fromkeys(_PersonProvider.first_names_male + _PersonProvider.first_names_female))
+    last_names = tuple(name for name in _PersonProvider.last_names if '-' not in name)
+    phone_formats = tuple((fmt.replace('{', '{{').replace('}', '}}').replace('#', '{}'), fmt.count('#'))
+                          for fmt in _PhoneProvider.formats)
+    return first_names, last_names, phone_formats
+
+
+def _fake_names(seed: int, start: int, stop: int, first_names: tuple[str, ...], last_names: tuple[str, ...]):
+    """
+    yields names from 'start' to 'stop' of the sequence of unique names for the given 'seed'.
+    The first names of the sequence are 'First Last', then 'First Last-Last' ones follow.
+    Indexes are scattered over the combinations by the step coprime with their number
+    """
+    offset = 0
+    for space in (len(first_names) * len(last_names), len(first_names) * len(last_names) ** 2):
+        if start < offset + space:
+            step = _FAKE_STEP if gcd(_FAKE_STEP, space) == 1 else 1
+            shift = Random(f'{seed}:{space}').randrange(space)
+            for index in range(start - offset, min(stop - offset, space)):
+                number, first = divmod((index * step + shift) % space, len(first_names))
+                if offset:
+                    second, number = divmod(number, len(last_names))
+                    yield f'{first_names[first]} {last_names[number]}-{last_names[second]}'
+                else:
+                    yield f'{first_names[first]} {last_names[number]}'
+            start = offset + space
+        offset += space
+    if start < stop:
+        raise ValueError(f'Cannot generate more than {offset} unique names')
+
+
+def _fake_rows(seed: int, start: int, stop: int) -> list[tuple[str, date | None, list[str]]]:
+    """
+    generates rows for AddressBook.add_records_bulk with numbers from 'start' to 'stop'.
+    The rows depend only on 'seed' and their numbers, so batches can be generated in any process
+    """
+    first_names, last_names, phone_formats = _fake_pools()
+    random = Random(f'{seed}:{start}').random  # scaling random() is much faster than randrange()
+    first_birthday, last_birthday = _FAKE_BIRTHDAYS
+    birthdays_count = last_birthday - first_birthday + 1
+    rows = []
+    for name in _fake_names(seed, start, stop, first_names, last_names):
+        birthday = None
+        if random() < 0.7:  # not every but only 7 of 10 records will be with birthdays
+            birthday = date.fromordinal(first_birthday + int(random() * birthdays_count))
+        phones = []
+        for _ in range(_FAKE_PHONES_COUNT[int(random() * len(_FAKE_PHONES_COUNT))]):
+            template, digits = phone_formats[int(random() * len(phone_formats))]
+            phones.append(template.format(*f'{int(random() * 10 ** digits):0{digits}d}'))
+        rows.append((name, birthday, phones))
+    return rows
+
+
+@contextmanager
+def _gc_paused():
+    """
+    disables the cyclic garbage collector while many objects are created: they all stay alive,
+    so the collections started by the allocations only walk over the growing heap
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _edit_distance(first: str, second: str) -> int:
+    """returns Levenshtein distance between two strings: number of inserted, deleted and replaced characters"""
+    if len(first) < len(second):
+        first, second = second, first
+    previous = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        current = [i]
+        for j, other in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        previous = current
+    return previous[-1]
+
+
+class _FuzzyIndex:
+    """
+    Index of AddressBook.fuzzy_search: BK-tree of distinct lowercased words of names with edit distance
+    as the metric and sets of keys of records having each word. Words of removed records stay in the tree
+    and are skipped by queries until there are too many of them and the tree is rebuilt
+    """
+
+    def __init__(self):
+        self._root = None  # node of the tree: [word, {distance to the word: child node}]
+        self._tree_size = 0
+        self._postings = {}  # word -> keys of records having it
+        self._words = {}  # key -> words of the name of the record which are in the index now
+
+    @staticmethod
+    def words(name: str) -> tuple[str, ...]:
+        """splits name to lowercased words (parts of double names are separate words)"""
+        return tuple(dict.fromkeys(name.lower().replace('-', ' ').split()))
+
+    def _insert(self, word: str) -> None:
+        if self._root is None:
+            self._root = [word, {}]
+            self._tree_size = 1
+            return
+        node = self._root
+        while True:
+            distance = _edit_distance(word, node[0])
+            if not distance:
+                return  # the word stayed in the tree after removing the records having it
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [word, {}]
+                self._tree_size += 1
+                return
+            node = child
+
+    def _index(self, key: str, record: Record) -> None:
+        words = self._words[key] = self.words(record.name.value)
+        for word in words:
+            if word not in self._postings:
+                self._postings[word] = set()
+                self._insert(word)
+            self._postings[word].add(key)
+
+    def _unindex(self, key: str) -> None:
+        for word in self._words.pop(key):
+            keys = self._postings[word]
+            keys.discard(key)
+            if not keys:
+                del self._postings[word]
+        if self._tree_size > 2 * len(self._postings) + 100:
+            self._root, self._tree_size = None, 0
+            for word in self._postings:
+                self._insert(word)
+
+    def record_added(self, key: str, record: Record) -> None:
+        self._index(key, record)
+
+    def record_changed(self, key: str, record: Record) -> None:
+        self._unindex(key)
+        self._index(key, record)
+
+    def record_removed(self, key: str, record: Record) -> None:
+        self._unindex(key)
+
+    def _similar_words(self, word: str, max_distance: int):
+        """yields (distance, word) for the indexed words not farther than 'max_distance' from the given one"""
+        nodes = [self._root] if self._root is not None else []
+        while nodes:
+            node_word, children = nodes.pop()
+            distance = _edit_distance(word, node_word)
+            if distance <= max_distance and node_word in self._postings:
+                yield distance, node_word
+            nodes.extend(child for edge, child in children.items() if abs(edge - distance) <= max_distance)
+
+    def find(self, name: str, max_distance: int, limit: int | None) -> list[str]:
+        """
+        returns keys of records having a word similar to every word of the 'name', ordered by the sum
+        of edit distances of the words and by keys. The sum is not greater than 'max_distance'
+        """
+        distances = None  # key -> sum of distances for the words of the name checked so far
+        for word in self.words(name):
+            budget = max_distance - (min(distances.values()) if distances else 0)
+            matches = {}  # key -> distance to the closest word of the record
+            for distance, similar in self._similar_words(word, budget):
+                for key in self._postings[similar]:
+                    if distance < matches.get(key, budget + 1):
+                        matches[key] = distance
+            if distances is None:
+                distances = matches
+            else:
+                distances = {key: total + matches[key] for key, total in distances.items()
+                             if key in matches and total + matches[key] <= max_distance}
+            if not distances:
+                return []
+        if not distances:
+            return []
+        ranked = sorted if limit is None else partial(nsmallest, limit)
+        return [key for key, _ in ranked(distances.items(), key=lambda item: (item[1], item[0]))]
+
+
+class _SortedKeys:
+    """
+    Keeps keys of records sorted. Keys of new records are merged into the sorted list at once
+    when the sorted keys are needed next time
+    """
+    INSORT_LIMIT = 32  # fewer pending keys are inserted one by one, more are merged by sorting
+
+    def __init__(self, keys=()):
+        self._keys = []  # sorted keys of records
+        self._pending = dict.fromkeys(keys)  # keys which are not in the sorted list yet (dict keeps their order)
+
+    def record_added(self, key: str, record: Record) -> None:
+        self._pending[key] = None
+
+    def records_added(self, items: list[tuple[str, Record]]) -> None:
+        self._pending.update(dict.fromkeys([key for key, _ in items]))
+
+    def record_changed(self, key: str, record: Record) -> None:
+        pass
+
+    def record_removed(self, key: str, record: Record) -> None:
+        if key in self._pending:
+            del self._pending[key]
+        else:
+            del self._keys[bisect_left(self._keys, key)]
+
+    def keys(self) -> list[str]:
+        """returns sorted list of keys of all the records. It must not be changed"""
+        if self._pending:
+            if len(self._pending) < self.INSORT_LIMIT:
+                for key in self._pending:
+                    insort(self._keys, key)
+            else:
+                self._keys.extend(self._pending)
+                self._keys.sort()
+            self._pending.clear()
+        return self._keys
+
+
+class _FoldedKeys(_SortedKeys):
+    """
+    Keeps (folded key, key) pairs of records sorted, so the keys starting with a text in any case
+    are found by binary search (see NameQuery)
+    """
+
+    def record_added(self, key: str, record: Record) -> None:
+        super().record_added((_fold(key), key), record)
+
+    def records_added(self, items: list[tuple[str, Record]]) -> None:
+        self._pending.update(dict.fromkeys([(_fold(key), key) for key, _ in items]))
+
+    def record_removed(self, key: str, record: Record) -> None:
+        super().record_removed((_fold(key), key), record)
+
+
+class _RenderCache(_SortedKeys):
+    """
+    Keeps keys of records sorted and the rendered lines of records for printing the book.
+    Line of the record is dropped on its change and rendered again when it is printed next time
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lines = {}  # key -> str(record)
+
+    def record_changed(self, key: str, record: Record) -> None:
+        self._lines.pop(key, None)
+
+    def record_removed(self, key: str, record: Record) -> None:
+        self._lines.pop(key, None)
+        super().record_removed(key, record)
+
+    def lines(self, keys: list[str], data) -> list[str]:
+        """returns str() of the records stored in 'data' under given 'keys' rendering only the missing lines"""
+        cached, result = self._lines, []
+        birthdays = {}  # date -> formatted birthday, computed once for every distinct birthday
+        for key in keys:
+            line = cached.get(key)
+            if line is None:
+                record = data[key]
+                birthday = record.birthday.value if record.birthday else None
+                if birthday not in birthdays:
+                    birthdays[birthday] = str(record.birthday) if birthday else ''
+                line = cached[key] = Record._format_line(record.name.value, birthdays[birthday],
+                                                         [Phone._format_number(phone.value) for phone in record.phones])
+            result.append(line)
+        return result
+
+
+def _prefix_bounds(keys: list[str], prefix: str) -> tuple[int, int]:
+    """returns positions of the first key starting with 'prefix' and of the first greater key in sorted 'keys'"""
+    return bisect_left(keys, prefix), bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+class _IndexLookup:
+    """
+    Way to get the candidates for AddressBook.query from one of the indexes of the book:
+    'keys' returns keys of all the records which may satisfy the query (may be repeated),
+    'estimate' is the number of the keys known before they are got
+    """
+
+    def __init__(self, description: str, estimate: int, keys):
+        self.description = description
+        self.estimate = estimate
+        self.keys = keys
+
+
+class Query(ABC):
+    """
+    Base class of predicates of AddressBook.query. Predicates are combined with '&' (AND) and '|' (OR):
+    NameQuery(starts_with='Ко') & BirthdayQuery(month=3) & PhoneQuery(min_count=2)
+    """
+
+    def __and__(self, other):
+        return _AndQuery(self, other)
+
+    def __or__(self, other):
+        return _OrQuery(self, other)
+
+    @abstractmethod
+    def matches(self, key: str, record: Record) -> bool:
+        """returns True if the record stored under 'key' satisfies the predicate"""
+
+    def _lookups(self, book) -> list[_IndexLookup]:
+        """returns lookups of the indexes of the 'book' each of which finds all the records satisfying the predicate"""
+        return []
+
+
+def _conditions_text(conditions: list[str]) -> str:
+    return conditions[0] if len(conditions) == 1 else '(' + ' AND '.join(conditions) + ')'
+
+
+class _AndQuery(Query):
+
+    def __init__(self, *queries: Query):
+        # a & b & c is kept as one AND of three predicates
+        self.queries = tuple(part for query in queries
+                             for part in (query.queries if type(query) is _AndQuery else (query,)))
+
+    def __str__(self):
+        return '(' + ' AND '.join(str(query) for query in self.queries) + ')'
+
+    def matches(self, key: str, record: Record) -> bool:
+        return all(query.matches(key, record) for query in self.queries)
+
+    def _lookups(self, book) -> list[_IndexLookup]:
+        # records satisfying all the predicates are found by the lookup of any of them
+        return [lookup for query in self.queries for lookup in query._lookups(book)]
+
+
+class _OrQuery(Query):
+
+    def __init__(self, *queries: Query):
+        self.queries = tuple(part for query in queries
+                             for part in (query.queries if type(query) is _OrQuery else (query,)))
+
+    def __str__(self):
+        return '(' + ' OR '.join(str(query) for query in self.queries) + ')'
+
+    def matches(self, key: str, record: Record) -> bool:
+        return any(query.matches(key, record) for query in self.queries)
+
+    def _lookups(self, book) -> list[_IndexLookup]:
+        # records satisfying any of the predicates are found only by the union of lookups of all of them
+        lookups = []
+        for query in self.queries:
+            query_lookups = query._lookups(book)
+            if not query_lookups:
+                return []
+            lookups.append(min(query_lookups, key=lambda lookup: lookup.estimate))
+        return [_IndexLookup('union of ' + ', '.join(lookup.description for lookup in lookups),
+                             sum(lookup.estimate for lookup in lookups),
+                             lambda: [key for lookup in lookups for key in lookup.keys()])]
+
+
+class NameQuery(Query):
+    """
+    Predicate on the name under which the record is stored: the name is equal to 'equals',
+    starts with 'starts_with' and contains 'contains' (the given conditions must be all true)
+    """
+
+    def __init__(self, equals: str = '', starts_with: str = '', contains: str = '', ignore_case: bool = True):
+        if not (equals or starts_with or contains):
+            raise ValueError('NameQuery needs equals, starts_with or contains')
+        self.equals, self.starts_with, self.contains = equals, starts_with, contains
+        self.ignore_case = ignore_case
+        fold = _fold if ignore_case else str
+        self._equals, self._starts_with, self._contains = fold(equals), fold(starts_with), fold(contains)
+
+    def __str__(self):
+        conditions = [f'{condition} {value!r}' for condition, value in (
+            ('name equals', self.equals), ('name starts with', self.starts_with), ('name contains', self.contains))
+            if value]
+        if self.ignore_case:
+            conditions = [condition + ' ignoring case' for condition in conditions]
+        return _conditions_text(conditions)
+
+    def matches(self, key: str, record: Record) -> bool:
+        name = _fold(key) if self.ignore_case else key
+        return ((not self._equals or name == self._equals)
+                and name.startswith(self._starts_with)
+                and self._contains in name)
+
+    def _lookups(self, book) -> list[_IndexLookup]:
+        lookups = []
+        if self.equals and not self.ignore_case:
+            lookups.append(_IndexLookup(f'key {self.equals!r}', 1,
+                                        lambda: [self.equals] if self.equals in book.data else []))
+        prefix = self.equals or self.starts_with
+        if prefix and book._render_cache is not None and not self.ignore_case:
+            keys = book._render_cache.keys()
+            start, stop = _prefix_bounds(keys, prefix)
+            lookups.append(_IndexLookup(f'sorted names starting with {prefix!r}', stop - start,
+                                        lambda: keys[start:stop]))
+        elif prefix and book._render_cache is not None:
+            folded = book._folded_keys()
+            prefix = self._equals or self._starts_with
+            start = bisect_left(folded, (prefix,))
+            stop = bisect_left(folded, (prefix[:-1] + chr(ord(prefix[-1]) + 1),))
+            lookups.append(_IndexLookup(f'sorted folded names starting with {prefix!r}', stop - start,
+                                        lambda: [key for _, key in folded[start:stop]]))
+        phrase = self.equals or self.starts_with or self.contains
+        if book._search_index is not None:
+            estimate = book._search_index.estimate(phrase)
+            if estimate is not None:
+                lookups.append(_IndexLookup(f'n-gram index of {phrase!r}', estimate,
+                                            lambda: book._search_index.candidates(phrase)))
+        return lookups
+
+
+class BirthdayQuery(Query):
+    """
+    Predicate on the birthday of the record: the birthday is in 'month', on 'day' of the month,
+    the year of the birth is between 'min_year' and 'max_year' and the age on 'as_of' date (today by default)
+    is between 'min_age' and 'max_age' (bounds are included). Records without birthday never match
+    """
+
+    def __init__(self, month: int = None, day: int = None, min_year: int = None, max_year: int = None,
+                 min_age: int = None, max_age: int = None, as_of: date = None):
+        if month is not None and not 1 <= month <= 12:
+            raise ValueError('Month must be from 1 to 12')
+        if day is not None and not 1 <= day <= 31:
+            raise ValueError('Day must be from 1 to 31')
+        self.month, self.day = month, day
+        self.min_year, self.max_year = min_year, max_year
+        self.min_age, self.max_age = min_age, max_age
+        self.as_of = as_of or datetime.now().date()
+
+    def __str__(self):
+        conditions = [f'birthday {condition} {value}' for condition, value in (
+            ('month =', self.month), ('day =', self.day), ('year >=', self.min_year), ('year <=', self.max_year))
+            if value is not None]
+        conditions += [f'age on {self.as_of} {condition} {value}'
+                       for condition, value in (('>=', self.min_age), ('<=', self.max_age)) if value is not None]
+        return _conditions_text(conditions) if conditions else 'birthday is set'
+
+    def _age(self, birthday: date) -> int:
+        age = self.as_of.year - birthday.year
+        return age - 1 if _birthday_in_year(birthday, self.as_of.year) > self.as_of else age
+
+    def matches(self, key: str, record: Record) -> bool:
+        if not record.birthday:
+            return False
+        birthday = record.birthday.value
+        return ((self.month is None or birthday.month == self.month)
+                and (self.day is None or birthday.day == self.day)
+                and (self.min_year is None or birthday.year >= self.min_year)
+                and (self.max_year is None or birthday.year <= self.max_year)
+                and (self.min_age is None or self._age(birthday) >= self.min_age)
+                and (self.max_age is None or self._age(birthday) <= self.max_age))
+
+    def _lookups(self, book) -> list[_IndexLookup]:
+        if book._birthday_index is None or (self.month is None and self.day is None):
+            return []
+        months = [self.month] if self.month is not None else range(1, 13)
+        days = [(month, day) for month in months for day in ([self.day] if self.day is not None else range(1, 32))]
+        index = book._birthday_index
+        return [_IndexLookup('calendar of birthdays', index.count_on_days(days), lambda: index.on_days(days))]
+
+
+class PhoneQuery(Query):
+    """
+    Predicate on the phones of the record: some phone number starts with 'prefix' and ends with 'suffix'
+    (the numbers are sanitized as in Phone), the number of phones is between 'min_count' and 'max_count'
+    """
+
+    def __init__(self, prefix: str | int = '', suffix: str | int = '', min_count: int = None, max_count: int = None):
+        self.prefix = Phone._sanitize_phone_number(str(prefix))
+        self.suffix = Phone._sanitize_phone_number(str(suffix))
+        if not (self.prefix or self.suffix or min_count is not None or max_count is not None):
+            raise ValueError('PhoneQuery needs prefix, suffix, min_count or max_count')
+        self.min_count, self.max_count = min_count, max_count
+
+    def __str__(self):
+        conditions = [f'phone {condition} {value!r}'
+                      for condition, value in (('starts with', self.prefix), ('ends with', self.suffix)) if value]
+        conditions += [f'phones count {condition} {value}'
+                       for condition, value in (('>=', self.min_count), ('<=', self.max_count)) if value is not None]
+        return _conditions_text(conditions)
+
+    def matches(self, key: str, record: Record) -> bool:
+        phones = record.phones
+        return ((self.min_count is None or len(phones) >= self.min_count)
+                and (self.max_count is None or len(phones) <= self.max_count)
+                and (not (self.prefix or self.suffix)
+                     or any(phone.value.startswith(self.prefix) and phone.value.endswith(self.suffix)
+                            for phone in phones)))
+
+    def _lookups(self, book) -> list[_IndexLookup]:
+        index = book._phone_index
+        if index is None:
+            return []
+        lookups = []
+        if self.prefix:
+            lookups.append(_IndexLookup(f'phone prefixes {self.prefix!r}', index.count_prefix(self.prefix),
+                                        lambda: index.prefix(self.prefix)))
+        if self.suffix:
+            lookups.append(_IndexLookup(f'phone suffixes {self.suffix!r}', index.count_suffix(self.suffix),
+                                        lambda: index.suffix(self.suffix)))
+        return lookups
+
+
+def _search_worker(connection) -> None:
+    """
+    runs in the worker process of AddressBook.search_parallel. Keeps one shard of the texts searched
+    by AddressBook.search and answers queries until the connection is closed
+    """
+    shard = {}  # key -> (number of the record in order of insertion, texts, lowered texts)
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message[0] == 'update':
+            for key, number, texts in message[1]:
+                if number is None:
+                    shard.pop(key, None)
+                else:
+                    shard[key] = number, texts, tuple(text.lower() for text in texts)
+        elif message[0] == 'search':
+            _, phrase, ignore_case = message
+            column = 2 if ignore_case else 1
+            connection.send([(entry[0], key) for key, entry in shard.items()
+                             if any(phrase in text for text in entry[column])])
+        else:
+            break
+    connection.close()
+
+
+def _stop_search_workers(connections: list, processes: list) -> None:
+    # forked workers hold copies of the connections, so they are asked to stop instead of waiting for EOF
+    for connection in connections:
+        try:
+            connection.send(('stop',))
+        except OSError:
+            pass  # the worker has already exited
+        connection.close()
+    for process in processes:
+        process.join()
+
+
+class _SearchShards:
+    """
+    Pool of worker processes for AddressBook.search_parallel. Records are spread over the workers
+    by the order of their insertion, every worker keeps texts of its shard of records between queries.
+    Changes of the book are collected and sent to the workers before the next query
+    """
+
+    def __init__(self, workers: int):
+        self._order = {}  # key -> (number of the record in order of insertion, number of the shard)
+        self._counter = count()
+        self._pending = [[] for _ in range(workers)]  # changes not sent to the workers yet
+        self._connections, self._processes = [], []
+        for _ in range(workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_search_worker, args=(worker_connection,), daemon=True)
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+        # the workers are stopped when the shards are garbage collected or at exit if 'close' was not called
+        self._finalizer = weakref.finalize(self, _stop_search_workers, self._connections, self._processes)
+
+    @property
+    def workers(self) -> int:
+        return len(self._processes)
+
+    def record_added(self, key: str, record: Record) -> None:
+        number = next(self._counter)
+        self._order[key] = number, number % self.workers
+        self._pending[number % self.workers].append((key, number, AddressBook._search_texts(key, record)))
+
+    def record_changed(self, key: str, record: Record) -> None:
+        number, shard = self._order[key]
+        self._pending[shard].append((key, number, AddressBook._search_texts(key, record)))
+
+    def record_removed(self, key: str, record: Record) -> None:
+        _, shard = self._order.pop(key)
+        self._pending[shard].append((key, None, None))
+
+    def search(self, phrase: str, ignore_case: bool) -> list[str]:
+        """returns keys of the records matching the phrase in order of their insertion to the address book"""
+        for connection, pending in zip(self._connections, self._pending):
+            if pending:
+                connection.send(('update', pending))
+                pending.clear()
+        for connection in self._connections:
+            connection.send(('search', phrase, ignore_case))
+        found = [connection.recv() for connection in self._connections]
+        return [key for _, key in merge(*found)]
+
+    def close(self) -> None:
+        self._finalizer()
+
+
+@contextmanager
+def atomic_write(filename: str, mode: str = 'w', **kwargs):
+    """
+    opens temporary file next to the file with given 'filename' for writing.
+    The temporary file replaces the file only after all the data is written and flushed to disk,
+    so the file always contains either old or new data
+    """
+    directory, base_name = os.path.split(os.path.abspath(filename))
+    fd, tmp_name = tempfile.mkstemp(prefix=base_name + '.', suffix='.tmp', dir=directory)
+    try:
+        with open(fd, mode, **kwargs) as fh:
+            yield fh
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_name, filename)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+class _Journal:
+    """
+    Write-ahead log of changes of AddressBook. Every change of a record is appended to the log file
+    as a json line with the new state of the record. Compaction saves the whole book to snapshot file
+    and empties the log
+    """
+    COMPACT_AFTER = 10000  # minimum number of entries in the log before automatic compaction
+
+    def __init__(self, book, filename: str, sync: bool, entries: int = 0):
+        self._book = book
+        self.filename = filename
+        self._sync = sync
+        self._entries = entries
+        self._log = open(self.log_filename(filename), 'a', encoding='utf-8')
+
+    @staticmethod
+    def log_filename(filename: str) -> str:
+        return filename + '.log'
+
+    def _append(self, entry: dict) -> None:
+        self._log.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._log.flush()
+        if self._sync:
+            os.fsync(self._log.fileno())
+        self._entries += 1
+        if self._entries > max(self.COMPACT_AFTER, len(self._book)):
+            self.compact()
+
+    def record_added(self, key: str, record: Record) -> None:
+        self._append({'op': 'set', 'key': key, 'record': AddressBook._record_to_dict(record)})
+
+    record_changed = record_added
+
+    def record_removed(self, key: str, record: Record) -> None:
+        self._append({'op': 'del', 'key': key})
+
+    def compact(self) -> None:
+        """saves snapshot of the book and empties the log"""
+        with atomic_write(self.filename, encoding='utf-8') as fh:
+            fh.writelines(json.dumps(AddressBook._record_to_dict(record), ensure_ascii=False) + '\n'
+                          for record in self._book.data.values())
+        # if the program stops here, replaying of the old log over the new snapshot gives the same book
+        self._log.close()
+        self._log = open(self.log_filename(self.filename), 'w', encoding='utf-8')
+        self._entries = 0
+
+    def close(self) -> None:
+        self._log.close()
+
+    @staticmethod
+    def replay(book, filename: str) -> int:
+        """applies entries of the log to the 'book' and returns their number. Incomplete last line is skipped"""
+        entries, complete_length = 0, 0
+        if not os.path.exists(_Journal.log_filename(filename)):
+            return entries
+        with open(_Journal.log_filename(filename), 'rb+') as fh:
+            for line in fh:
+                if not line.endswith(b'\n'):
+                    # the program stopped while the line was being written. The rest is cut off
+                    # so that new entries are not appended to the incomplete line
+                    fh.truncate(complete_length)
+                    break
+                entry = json.loads(line)
+                if entry['op'] == 'set':
+                    book[entry['key']] = AddressBook._record_from_dict(entry['record'])
+                elif entry['key'] in book:
+                    del book[entry['key']]
+                entries += 1
+                complete_length += len(line)
+        return entries
+
+
+_PICKLE_FORMAT = 2  # version of pickled AddressBook: 1 - dictionary of Record objects, 2 - tuples of values
+_SNAPSHOT_MAGIC = b'ABOOK\x00\x00\x01'
+_SNAPSHOT_HEADER = struct.Struct('<8sQQ')  # magic, number of records, position of the index
+_RECORD_HEADER = struct.Struct('<IiH')  # length of name, ordinal of birthday (0 if not set), number of phones
+_PHONE_HEADER = struct.Struct('<H')  # length of phone number
+
+
+def _encode_record(key: str, record: Record) -> bytes:
+    """encodes record stored under given 'key' for binary snapshot file"""
+    name = key.encode('utf-8')
+    parts = [_RECORD_HEADER.pack(len(name), record.birthday.value.toordinal() if record.birthday else 0,
+                                 len(record.phones)), name]
+    for phone in record.phones:
+        parts.append(_PHONE_HEADER.pack(len(phone.value)))
+        parts.append(phone.value.encode('ascii'))
+    return b''.join(parts)
+
+
+def _new_book(book_class: type):
+    """creates empty object of given class of address book, its state is set by pickle after that"""
+    return book_class.__new__(book_class)
+
+
+class _BookSnapshot:
+    """State of the address book taken by AddressBook._snapshot. Pickle loads it as the book itself"""
+
+    def __init__(self, book_class: type, state: dict):
+        self.book_class = book_class
+        self.state = state
+
+    def __reduce__(self):
+        return _new_book, (self.book_class,), self.state
+
+
 class AddressBook(UserDict):
     """
     Class representing address book. It is a dictionary with name of the contact as key
@@ -250,19 +1482,185 @@ class AddressBook(UserDict):
     """
     BINARY_FILE = 'address_book.bin'
     JSON_FILE = 'address_book.json'
-
-    def __init__(self):
+    NDJSON_FILE = 'address_book.ndjson'
+    SNAPSHOT_FILE = 'address_book.snapshot'
+    _RECORDS_ARE_VIEWS = False  # True if the storage returns new Record built from stored data on every access
+
+    def __init__(self, search_index: bool = False):
+        self._listeners = []  # indexes etc. which are notified about every change of records
+        self._search_index = None
+        self._search_shards = None
+        self._fuzzy_index = None
+        self._folded_index = None
+        self._journal = None
         super().__init__()
+        self._create_indexes()
         self.number_records_return = 10
+        if search_index:
+            self.enable_search_index()
+
+    def __setitem__(self, key: str, record: Record):
+        if record._book is not None and (record._book is not self or record._key != key):
+            raise ValueError(f'Record {record.name.value!r} is already stored in an address book, add its copy instead')
+        replaced = self.data.get(key)
+        if replaced is not None and replaced is not record:
+            self._detach(replaced)
+        self._attach(key, record)
+        self.data[key] = record
+        for listener in self._listeners:
+            if replaced is None:
+                listener.record_added(key, record)
+            else:
+                listener.record_changed(key, record)
+
+    def __delitem__(self, key: str):
+        record = self.data.pop(key)
+        self._detach(record)
+        for listener in self._listeners:
+            listener.record_removed(key, record)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_listeners'], state['_phone_index'], state['_birthday_index'], state['_render_cache']
+        del state['_sorted_keys']
+        state.pop('_journal', None)
+        state.pop('_search_shards', None)
+        state.pop('_fuzzy_index', None)
+        state.pop('_folded_index', None)
+        state['_search_index'] = self._search_index is not None
+        if type(self.data) is dict:
+            state['data'] = self._pack_records(self.data.items())
+            state['_format'] = _PICKLE_FORMAT
+        return state
+
+    def __setstate__(self, state):
+        search_index = state.pop('_search_index', False)
+        state['data'] = self._unpack_records(state.pop('data'), state.pop('_format', 1))
+        self.__dict__.update(state)
+        self._listeners = []
+        self._search_index = None
+        self._search_shards = None
+        self._fuzzy_index = None
+        self._folded_index = None
+        self._journal = None
+        self._link_records()
+        self._create_indexes()
+        if search_index:
+            self.enable_search_index()
+
+    @staticmethod
+    def _pack_records(items) -> list[tuple]:
+        """converts (key, Record) pairs to tuples of values saved by pickle instead of Record objects"""
+        return [(key, *record.__getstate__()) for key, record in items]
+
+    @staticmethod
+    def _unpack_records(data, version: int):
+        """returns storage of records from the pickled data of given format 'version'"""
+        if version == 1:
+            return data  # stored as it is: dictionary of Records or columns
+        if version != _PICKLE_FORMAT:
+            raise ValueError(f'Unknown format {version} of pickled AddressBook')
+        records, birthdays = {}, {0: None}  # ordinal -> Birthday value, created once for every distinct birthday
+        for key, name, birthday, phones in data:
+            if birthday not in birthdays:
+                birthdays[birthday] = date.fromordinal(birthday)
+            birthday = birthdays[birthday]
+            records[key] = Record._from_fields(Name._from_value(name),
+                                               Birthday._from_value(birthday) if birthday else None,
+                                               [Phone._from_value(phone) for phone in phones])
+        return records
+
+    def _create_indexes(self) -> None:
+        """creates indexes which are always kept by the address book"""
+        self._phone_index = _PhoneIndex()
+        self._add_listener(self._phone_index)
+        self._birthday_index = _BirthdayIndex()
+        self._add_listener(self._birthday_index)
+        self._render_cache = self._sorted_keys = _RenderCache()
+        self._add_listener(self._render_cache)
+
+    def _link_records(self) -> None:
+        """links all the stored records to the address book (after unpickling)"""
+        for key, record in self.data.items():
+            self._attach(key, record)
+
+    def _attach(self, key: str, record: Record) -> None:
+        """
+        links the record and its fields to the current address book so that they report their changes.
+        Raises ValueError if any field belongs to another record
+        """
+        record._own(record.name)
+        if record.birthday is not None:
+            record._own(record.birthday)
+        for phone in record.phones:
+            record._own(phone)
+        record._book, record._key = self, key
+
+    @staticmethod
+    def _detach(record: Record) -> None:
+        record._book = record._key = None
+
+    def _record_changing(self, key: str, record: Record) -> None:
+        """called by the Record stored under given 'key' before any change of it, raises the error if it must not"""
+
+    def _record_changed(self, key: str, record: Record) -> None:
+        """called by the Record stored under given 'key' after any change of it"""
+        if self._RECORDS_ARE_VIEWS:
+            if key not in self.data:
+                return
+            self.data[key] = record  # the storage keeps its own copy of the record
+        elif self.data.get(key) is not record:
+            return
+        for listener in self._listeners:
+            listener.record_changed(key, record)
+
+    def _add_listener(self, listener) -> None:
+        """registers listener of changes and passes all the existing records to it"""
+        for key, record in self.data.items():
+            listener.record_added(key, record)
+        self._listeners.append(listener)
+
+    def enable_search_index(self) -> None:
+        """
+        builds n-gram index which speeds up 'search'. Index is kept up to date
+        on every change of the address book and its records
+        """
+        if self._search_index is None:
+            self._search_index = _NGramIndex()
+            self._add_listener(self._search_index)
+
+    def disable_search_index(self) -> None:
+        """drops n-gram index. 'search' scans all the records after that"""
+        if self._search_index is not None:
+            self._listeners.remove(self._search_index)
+            self._search_index = None
 
     def __iter__(self):  # implementation through generator using yield (works more efficiently with memory)
         """creating generator which returns list with 'self.number_records_return' Records each time"""
         result = []
-        for id_name in self.data:
-            result.append(self.data[id_name])
+        for record in self.data.values():
+            result.append(record)
+            if len(result) == self.number_records_return:
+                yield result
+                result = []
+        yield result
+
+    async def __aiter__(self):
+        """
+        creating async generator which returns the same pages as __iter__ and gives control
+        to the event loop after each page. Records removed while iterating are skipped
+        """
+        import asyncio
+        data, result = self.data, []
+        for key in list(data):
+            record = data.get(key)
+            if record is None:
+                continue
+            result.append(record)
             if len(result) == self.number_records_return:
                 yield result
                 result = []
+                await asyncio.sleep(0)
         yield result
 
     # def __iter__(self):  # implementation through iterator a
@@ -281,34 +1679,150 @@ class AddressBook(UserDict):
         return f'AddressBook({repr(self.data)})'
 
     def __str__(self):
+        return self._render_table(self._get_records_strings())
+
+    def render_page(self, page: int, size: int = 0) -> str:
+        """
+        returns the table as printed by str(address_book) but only with the records of the given page.
+        Records keep their numbers in the whole book sorted by names. Rendering of the page does not
+        depend on the size of the book
+        :param page: int. Number of the page starting from 1
+        :param size: int. Number of records on the page (if not given then 'self.number_records_return' is used)
+        :return: str
+        """
+        size = size or self.number_records_return
+        if page < 1 or size < 1:
+            raise ValueError('Page number and page size must be positive')
+        start = (page - 1) * size
+        return self._render_table(self._get_records_strings(start, start + size))
+
+    def page(self, after: str | None = None, limit: int = 0, order: str = 'name') -> tuple[list[Record], str | None]:
+        """
+        returns the records following the cursor 'after' and the cursor of the next page. The cursor keeps
+        the last name of the page, so the next page is found by binary search over the sorted names and
+        records added or removed while paging do not shift or repeat the records of the next pages
+        :param after: str. Cursor returned with the previous page (if not given then the first page is returned)
+        :param limit: int. Number of records on the page (if not given then 'self.number_records_return' is used)
+        :param order: str. 'name' for ascending order of names or '-name' for descending one
+        :return: tuple of list of Records and cursor of the next page (None for the last page)
+        """
+        limit = limit or self.number_records_return
+        if limit < 1:
+            raise ValueError('Page size must be positive')
+        if order not in ('name', '-name'):
+            raise ValueError(f"Unknown order {order!r}. Must be 'name' or '-name'")
+        items = self._page_items(self._decode_cursor(after, order) if after else None, limit + 1, order == '-name')
+        cursor = self._encode_cursor(items[limit - 1][0], order) if len(items) > limit else None
+        return [record for _, record in items[:limit]], cursor
+
+    @staticmethod
+    def _encode_cursor(key: str, order: str) -> str:
+        return base64.urlsafe_b64encode(json.dumps([order, key]).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor: str, order: str) -> str:
+        """returns the last key of the page from the 'cursor' made for given 'order'"""
+        try:
+            cursor_order, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor') from None
+        if cursor_order != order or type(key) is not str:
+            raise ValueError(f'Cursor was not made for order {order!r}')
+        return key
+
+    def _page_items(self, after_key: str | None, count: int, descending: bool) -> list[tuple[str, Record]]:
+        """returns 'count' (key, Record) pairs following 'after_key' in the order of keys"""
+        keys = self._sorted_key_list()
+        if descending:
+            stop = len(keys) if after_key is None else bisect_left(keys, after_key)
+            selected = keys[max(stop - count, 0):stop][::-1]
+        else:
+            start = 0 if after_key is None else bisect_right(keys, after_key)
+            selected = keys[start:start + count]
+        data = self.data
+        return [(key, data[key]) for key in selected]
+
+    def _sorted_key_list(self) -> list[str]:
+        """
+        returns sorted keys of all the records from the index of sorted keys. Books without it build
+        the index on the first call, and it follows all the changes after that. The list must not be changed
+        """
+        if self._sorted_keys is None:
+            self._sorted_keys = _SortedKeys(self.data)  # only the keys are read, so lazy records are not built
+            self._listeners.append(self._sorted_keys)
+        return self._sorted_keys.keys()
+
+    @staticmethod
+    def _render_table(lines: list[str]) -> str:
         h_line = '-----|----------------------------|--------------|------------------------------------------\n'
         result = [h_line, '  #  |            Name            |   Birthday   |  Phones\n', h_line]
-        result.extend(self.__get_records_strings())
+        result.extend(lines)
         result.append(h_line)
         return ''.join(result)
 
-    def __get_records_strings(self) -> list[str]:
-        """creates and returns list with numerated string representation of all Records"""
-        i, lines = 1, []
-        for name in sorted(self.data.keys()):
-            lines.append(f'{i:>4} |' + str(self.data[name]) + '\n')
-            i += 1
-        return lines
+    def _get_records_strings(self, start: int = 0, stop: int | None = None) -> list[str]:
+        """
+        creates and returns list with numerated string representation of Records
+        from 'start' to 'stop' positions of the records sorted by names
+        """
+        cache = self._render_cache
+        lines = cache.lines(cache.keys()[start:stop], self.data)
+        return [f'{i:>4} |' + line + '\n' for i, line in enumerate(lines, start + 1)]
 
     def add_record(self, record: Record):
         """adds Record object to address book"""
-        self.data[record.name.value] = record
+        self[record.name.value] = record
 
-    def add_fake_records(self, quantity: int):
+    @staticmethod
+    def enable_metrics(hook=None) -> None:
         """
-        fills current address_book with given 'quantity' of fake records
+        turns on measuring of calls of 'search', 'add_record', 'page', json and pickle dump and load methods,
+        pages of iteration and validation of values of Name, Phone and Birthday in all address books.
+        Metrics are off by default and cost nothing then
+        :param hook: callable(operation: str, seconds: float, size: int, failed: bool) called after
+        every measured call. 'size' is the size of the file in bytes for dump and load methods.
+        Errors of the hook are reported as RuntimeWarning and do not fail the measured call
         """
+        _metrics.enable(hook)
+
+    @staticmethod
+    def disable_metrics() -> None:
+        """turns off measuring of calls. Collected statistics are kept"""
+        _metrics.disable()
+
+    @staticmethod
+    def stats(reset: bool = False) -> dict:
+        """
+        returns snapshot of collected metrics: operation -> dict with 'calls', 'errors', 'total_time',
+        'max_time' (seconds), 'bytes' and latency 'histogram' (upper bound of the bucket -> calls)
+        :param reset: bool. If True then the statistics are cleared after taking the snapshot
+        """
+        snapshot = _metrics.stats()
+        if reset:
+            _metrics.reset()
+        return snapshot
+
+    def add_fake_records(self, quantity: int, seed: int | None = None, workers: int = 1):
+        """
+        fills current address_book with given 'quantity' of fake records with new names.
+        If 'seed' is given the records are generated from pools of names and phone formats of Faker
+        in batches, so the same seed always gives the same records and millions of them are made in seconds.
+        :param quantity: int. Number of records to add
+        :param seed: int. Optional seed of the fast reproducible generator
+        :param workers: int. Number of processes generating batches when 'seed' is given
+        """
+        if seed is not None:
+            self._add_generated_records(quantity, seed, workers)
+            return
+
+        from faker import Faker
+
         fake = Faker('uk_UA')
 
         # populating address_book with fake names and birthdays
         for _ in range(quantity):
             name_str = fake.name()
-            while 'пан' in name_str:
+            while 'пан' in name_str or name_str in self.data:
                 name_str = fake.name()
             name = Name(name_str)
             birth = None
@@ -327,6 +1841,134 @@ class AddressBook(UserDict):
             phone_number = Phone(phone_str)
             choice(records).add_phone(phone_number)
 
+    def _add_generated_records(self, quantity: int, seed: int, workers: int) -> None:
+        first_names, last_names, _ = _fake_pools()
+        space = len(first_names) * len(last_names) * (len(last_names) + 1)
+        start = 0
+        executor = None  # pool of 'workers' processes created once for all the batches
+        try:
+            with _gc_paused():
+                while quantity > 0:
+                    # rows with names which are already in the book are skipped, so the next rows are generated
+                    starts = range(start, min(start + quantity + _FAKE_BATCH_SIZE - 1, space), _FAKE_BATCH_SIZE)
+                    if not starts:
+                        raise ValueError(f'Cannot generate more than {space} unique names')
+                    batches = [(seed, first, min(first + _FAKE_BATCH_SIZE, space)) for first in starts]
+                    if workers > 1 and len(batches) > 1:
+                        if executor is None:
+                            from concurrent.futures import ProcessPoolExecutor
+                            executor = ProcessPoolExecutor(min(workers, len(batches)))
+                        batches = list(executor.map(_fake_rows, *zip(*batches)))
+                    else:
+                        batches = (_fake_rows(*batch) for batch in batches)
+                    for rows in batches:
+                        rows = [row for row in rows if row[0] not in self.data]
+                        while rows and quantity:
+                            chunk, rows = rows[:quantity], rows[quantity:]
+                            quantity -= len(chunk) - len(self.add_records_bulk(chunk))  # rejected rows are not counted
+                        if not quantity:
+                            break
+                    start = starts[-1] + _FAKE_BATCH_SIZE
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def add_records_bulk(self, rows) -> list[tuple[int, str]]:
+        """
+        validates and adds many records at once. It is much faster than creating Name, Phone,
+        Birthday and Record objects one by one: the checks are the same but they are done
+        without creating objects for invalid values and with single current date for the whole batch.
+        Invalid rows are skipped and reported instead of raising the error.
+        @param rows: iterable of dicts with keys 'name', 'birthday' and 'phones' (as in json files)
+        or of tuples (name, birthday, phones). Birthday is date, datetime, str 'dd.mm.yyyy' or None.
+        Phones is list of str or int, or str with numbers separated by ',' or ';'
+        @return: list of (number of the row, error message) for the rows which were not added
+        """
+        curr_date = datetime.now().date()
+        birthdays = {}  # text of birthday -> date, the same birthdays are parsed once
+        errors = []
+        new_name, new_birthday, new_phone = Name.__new__, Birthday.__new__, Phone.__new__
+        sanitize = Phone._sanitize_phone_number
+        validate_name, validate_phone, validate_birthday = _validate_name, _validate_phone, _validate_birthday
+        data, added = self.data, []  # new records are passed to the listeners together
+        with _gc_paused():
+            for row_number, row in enumerate(rows):
+                try:
+                    name, birth, phones = (row['name'], row.get('birthday'), row.get('phones')) \
+                        if isinstance(row, dict) else row
+                    validate_name(name)
+                    if birth:
+                        if type(birth) is str:
+                            if birth not in birthdays:
+                                birthdays[birth] = validate_birthday(_parse_date(birth), curr_date)
+                            birth = birthdays[birth]
+                        else:
+                            birth = validate_birthday(birth, curr_date)
+
+                    from_text = isinstance(phones, str)
+                    if from_text:
+                        phones = phones.replace(';', ',').split(',')
+                    numbers = []
+                    for phone in phones or ():
+                        if type(phone) is str and phone.isascii():
+                            number = phone.strip().removeprefix('+').encode('ascii')
+                            if not number and from_text:
+                                continue  # nothing between the separators in the text
+                            number = number.translate(None, _PHONE_SIGNS).decode('ascii')
+                        else:
+                            number = sanitize(str(phone))
+                        numbers.append(validate_phone(number))
+                except (TypeError, ValueError, KeyError) as error:
+                    errors.append((row_number, str(error)))
+                    continue
+
+                # the values are valid, so the fields are created the same way as Field._from_value does
+                name_field = new_name(Name)
+                name_field._value = name
+                birthday = None
+                if birth:
+                    birthday = new_birthday(Birthday)
+                    birthday._value = birth
+                for i, number in enumerate(numbers):
+                    numbers[i] = phone = new_phone(Phone)
+                    phone._value = number
+                record = Record._from_fields(name_field, birthday, numbers)
+                if name in data:
+                    self._notify_added(added)  # the listeners must know the record before its change
+                    added = []
+                    self[name] = record
+                else:  # the same as self[name] = record but without the checks needed for replacing
+                    data[name] = record
+                    record._book, record._key = self, name
+                    added.append((name, record))
+            self._notify_added(added)
+        return errors
+
+    def _notify_added(self, items: list[tuple[str, Record]]) -> None:
+        """passes new (key, record) pairs to the listeners at once if they can take them so"""
+        for listener in self._listeners:
+            records_added = getattr(listener, 'records_added', None)
+            if records_added is not None:
+                records_added(items)
+            else:
+                for key, record in items:
+                    listener.record_added(key, record)
+
+    @classmethod
+    def from_csv(cls, filename: str, **csv_params):
+        """
+        creates AddressBook from csv file with columns 'name', 'birthday' ('dd.mm.yyyy', may be empty)
+        and 'phones' (numbers separated by ',' or ';') using 'add_records_bulk'.
+        :param filename: str. Name of csv file with header
+        :param csv_params: parameters of csv.DictReader such as 'delimiter'
+        :return: tuple of restored AddressBook object and list of errors as in 'add_records_bulk'
+        (numbers of rows do not include the header)
+        """
+        address_book = cls()
+        with open(filename, 'r', encoding='utf-8', newline='') as fh:
+            errors = address_book.add_records_bulk(csv.DictReader(fh, **csv_params))
+        return address_book, errors
+
     def json_dump(self, filename: str = '') -> None:
         """
         saves current AddressBook object in json file with given 'filename'.
@@ -335,13 +1977,9 @@ class AddressBook(UserDict):
         """
         filename = filename or self.JSON_FILE
 
-        list_to_save = []
-        for rec_id, record in self.data.items():
-            list_to_save.append({'name': record.name.value,
-                                 'birthday': record.birthday.value.strftime('%d.%m.%Y') if record.birthday else None,
-                                 'phones': [str(phone) for phone in record.phones]})
+        list_to_save = self._json_list()
 
-        with open(filename, 'w', encoding='utf-8') as fh:
+        with atomic_write(filename, encoding='utf-8') as fh:
             json.dump(list_to_save, fh, ensure_ascii=False, indent=4)
 
     @classmethod
@@ -355,17 +1993,136 @@ class AddressBook(UserDict):
         filename = filename or cls.JSON_FILE
         with open(filename, 'r', encoding='utf-8') as fh:
             unpacked = json.load(fh)
-        address_book = AddressBook()
+        address_book = cls()
         for user in unpacked:
-            user_birthday = None
-            if user['birthday']:
-                user_birthday = Birthday(datetime.strptime(user['birthday'], '%d.%m.%Y'))
-            record = Record(name=Name(user['name']), birthday=user_birthday)
-            for phone_str in user['phones']:
-                record.add_phone(Phone(phone_str))
+            address_book.add_record(cls._record_from_dict(user))
+        return address_book
+
+    def ndjson_dump(self, filename: str = '') -> None:
+        """
+        saves current AddressBook object in newline-delimited json file with given 'filename'.
+        Each line of the file contains one record. Lines are written one by one,
+        so no copy of the whole address book is built in memory.
+        :param filename: str. Optional (if not given then 'self.NDJSON_FILE' is used)
+        :return: None
+        """
+        filename = filename or self.NDJSON_FILE
+        with open(filename, 'w', encoding='utf-8') as fh:
+            fh.writelines(json.dumps(self._record_to_dict(record), ensure_ascii=False) + '\n'
+                          for record in self.data.values())
+
+    @classmethod
+    def ndjson_load(cls, filename: str = ''):
+        """
+        loads and returns AddressBook object from newline-delimited json file with given 'filename'.
+        :param filename: str. Optional (if not given then 'self.NDJSON_FILE' is used)
+        :return: restored AddressBook object
+        @rtype: AddressBook
+        """
+        address_book = cls()
+        for record in cls.iter_json_records(filename):
             address_book.add_record(record)
         return address_book
 
+    @classmethod
+    def iter_json_records(cls, filename: str = ''):
+        """
+        creates generator which reads newline-delimited json file with given 'filename'
+        and returns Records one by one without building AddressBook
+        :param filename: str. Optional (if not given then 'self.NDJSON_FILE' is used)
+        :return: generator of Records
+        """
+        filename = filename or cls.NDJSON_FILE
+        with open(filename, 'r', encoding='utf-8') as fh:
+            for line in fh:
+                if line.strip():
+                    yield cls._record_from_dict(json.loads(line))
+
+    @staticmethod
+    def _record_to_dict(record: Record) -> dict:
+        """converts Record to dictionary which is saved in json files"""
+        return {'name': record.name.value,
+                'birthday': record.birthday.value.strftime('%d.%m.%Y') if record.birthday else None,
+                'phones': [str(phone) for phone in record.phones]}
+
+    @staticmethod
+    def _record_from_dict(user: dict) -> Record:
+        """creates Record from dictionary loaded from json files"""
+        user_birthday = None
+        if user['birthday']:
+            user_birthday = Birthday(datetime.strptime(user['birthday'], '%d.%m.%Y'))
+        record = Record(name=Name(user['name']), birthday=user_birthday)
+        for phone_str in user['phones']:
+            record.add_phone(Phone(phone_str))
+        return record
+
+    def open_journal(self, filename: str = '', sync: bool = False) -> None:
+        """
+        turns on journaled saving: saves snapshot of current AddressBook object to newline-delimited json file
+        with given 'filename' and then appends every change of the book to the log file '<filename>.log'.
+        The log is compacted to a new snapshot automatically when it grows bigger than the book.
+        :param filename: str. Optional (if not given then 'self.NDJSON_FILE' is used)
+        :param sync: bool. If True then every entry of the log is flushed to disk with fsync
+        :return: None
+        """
+        self.close_journal()
+        self._journal = _Journal(self, filename or self.NDJSON_FILE, sync)
+        self._journal.compact()
+        self._listeners.append(self._journal)
+
+    def compact_journal(self) -> None:
+        """saves snapshot of current AddressBook object to the journal and empties its log"""
+        if self._journal is None:
+            raise ValueError('Journal is not opened')
+        self._journal.compact()
+
+    def close_journal(self) -> None:
+        """turns off journaled saving. All the changes are already saved in the log"""
+        if self._journal is not None:
+            self._listeners.remove(self._journal)
+            self._journal.close()
+            self._journal = None
+
+    @classmethod
+    def journal_load(cls, filename: str = '', sync: bool = False):
+        """
+        loads and returns AddressBook object from snapshot file with given 'filename' and its log.
+        Loaded book continues journaled saving to the same files
+        :param filename: str. Optional (if not given then 'self.NDJSON_FILE' is used)
+        :param sync: bool. If True then every entry of the log is flushed to disk with fsync
+        :return: restored AddressBook object
+        @rtype: AddressBook
+        """
+        filename = filename or cls.NDJSON_FILE
+        address_book = cls.ndjson_load(filename) if os.path.exists(filename) else cls()
+        entries = _Journal.replay(address_book, filename)
+        address_book._journal = _Journal(address_book, filename, sync, entries)
+        address_book._listeners.append(address_book._journal)
+        return address_book
+
+    def snapshot_dump(self, filename: str = '') -> None:
+        """
+        saves current AddressBook object in binary snapshot file with given 'filename'.
+        The file contains records and index of their positions sorted by names,
+        so it can be opened with MappedAddressBook without loading all the records.
+        :param filename: str. Optional (if not given then 'self.SNAPSHOT_FILE' is used)
+        :return: None
+        """
+        filename = filename or self.SNAPSHOT_FILE
+        positions = []
+        with atomic_write(filename, 'wb') as fh:
+            fh.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, 0, 0))
+            position = _SNAPSHOT_HEADER.size
+            for key, record in self.data.items():
+                encoded = _encode_record(key, record)
+                positions.append((key, position))
+                fh.write(encoded)
+                position += len(encoded)
+            positions.sort()
+            fh.write(array('Q', (position for _, position in positions)).tobytes())
+            fh.seek(0)
+            fh.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, len(positions), position))
+
     def pickle_dump(self, filename: str = '') -> None:
         """
         saves current AddressBook object in binary file with given 'filename'.
@@ -374,8 +2131,7 @@ class AddressBook(UserDict):
         """
         filename = filename or self.BINARY_FILE
         with open(filename, 'wb') as fh:
-            pickle.dump(self, fh)
-        pass
+            pickle.dump(self, fh, pickle.HIGHEST_PROTOCOL)
 
     @classmethod
     def pickle_load(cls, filename: str = ''):
@@ -386,40 +2142,1866 @@ class AddressBook(UserDict):
         @rtype: AddressBook
         """
         filename = filename or cls.BINARY_FILE
-        with open(filename, 'rb') as fh:
+        with open(filename, 'rb') as fh, _gc_paused():
             unpacked = pickle.load(fh)
         return unpacked
 
-    def search(self, phrase: str, ignore_case=True) -> list[Record]:
+    def _snapshot(self) -> '_BookSnapshot':
         """
-        searches for records in fields of which there is
-        match with given 'phrase'.
-        @param phrase: str that we are looking for
-        @param ignore_case: bool. If True then search ignores case of phrase and values
+        returns the state of the book for saving it in another thread. The state is taken at once
+        and does not share anything which can be changed with the book, so later changes are not in it
+        """
+        return _BookSnapshot(type(self), self.__getstate__())
+
+    def _json_list(self) -> list[dict]:
+        """returns list of dictionaries of all the records which is saved in json file"""
+        return [self._record_to_dict(record) for record in self.data.values()]
+
+    @staticmethod
+    def _json_dump_list(list_to_save: list[dict], filename: str) -> None:
+        with atomic_write(filename, encoding='utf-8') as fh:
+            json.dump(list_to_save, fh, ensure_ascii=False, indent=4)
+
+    @staticmethod
+    def _pickle_dump_snapshot(snapshot, filename: str) -> None:
+        with atomic_write(filename, 'wb') as fh:
+            pickle.dump(snapshot, fh, pickle.HIGHEST_PROTOCOL)
+
+    async def json_dump_async(self, filename: str = '') -> None:
+        """
+        does the same as 'json_dump' in the default executor of the event loop, so the loop is not blocked.
+        The records which are in the book at the moment of the call are saved. The data is written
+        to temporary file which replaces the file only when it is complete
+        :param filename: str. Optional (if not given then 'self.JSON_FILE' is used)
+        :return: None
+        """
+        import asyncio
+        filename = filename or self.JSON_FILE
+        list_to_save = self._json_list()
+        await asyncio.get_running_loop().run_in_executor(None, self._json_dump_list, list_to_save, filename)
+
+    async def pickle_dump_async(self, filename: str = '') -> None:
+        """
+        does the same as 'pickle_dump' in the default executor of the event loop, so the loop is not blocked.
+        The records which are in the book at the moment of the call are saved. The data is written
+        to temporary file which replaces the file only when it is complete
+        :param filename: str. Optional (if not given then 'self.BINARY_FILE' is used)
+        :return: None
+        """
+        import asyncio
+        filename = filename or self.BINARY_FILE
+        snapshot = self._snapshot()
+        await asyncio.get_running_loop().run_in_executor(None, self._pickle_dump_snapshot, snapshot, filename)
+
+    @classmethod
+    async def json_load_async(cls, filename: str = ''):
+        """
+        does the same as 'json_load' in the default executor of the event loop, so the loop is not blocked
+        :param filename: str. Optional (if not given then 'self.JSON_FILE' is used)
+        :return: restored AddressBook object
+        """
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(None, cls.json_load, filename)
+
+    @classmethod
+    async def pickle_load_async(cls, filename: str = ''):
+        """
+        does the same as 'pickle_load' in the default executor of the event loop, so the loop is not blocked
+        :param filename: str. Optional (if not given then 'self.BINARY_FILE' is used)
+        :return: restored AddressBook object
+        """
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(None, cls.pickle_load, filename)
+
+    def search(self, phrase: str, ignore_case=True) -> list[Record]:
+        """
+        searches for records in fields of which there is
+        match with given 'phrase'.
+        @param phrase: str that we are looking for
+        @param ignore_case: bool. If True then search ignores case of phrase and values
         @return: list of matching records
         """
         result = []
         if not phrase:
             return result
+        if ignore_case:
+            phrase = phrase.lower()
+
+        candidates = self._search_index.candidates(phrase) if self._search_index is not None else None
+        if candidates is None:
+            records = self.data.items()
+        else:
+            records = ((rec_id, self.data[rec_id]) for rec_id in candidates)
+
+        for rec_id, record in records:
+            for text in self._search_texts(rec_id, record):
+                if ignore_case:
+                    text = text.lower()
+                if phrase in text:
+                    result.append(record)
+                    break
+        return result
 
-        for rec_id, record in self.data.items():
+    async def search_async(self, phrase: str, ignore_case=True, chunk_size: int = 1000):
+        """
+        async generator which yields the same records as 'search' returns. It gives control
+        to the event loop after checking every 'chunk_size' records. Records added during the search
+        are not checked and removed ones are skipped
+        @param phrase: str that we are looking for
+        @param ignore_case: bool. If True then search ignores case of phrase and values
+        @param chunk_size: int. Number of records checked between switches to other tasks
+        """
+        import asyncio
+        if not phrase:
+            return
+        if ignore_case:
+            phrase = phrase.lower()
+
+        keys = self._search_keys(phrase)
+        for start in range(0, len(keys), chunk_size):
+            for record in self._search_chunk(keys[start:start + chunk_size], phrase, ignore_case):
+                yield record
+            await asyncio.sleep(0)
+
+    def _search_keys(self, phrase: str) -> list[str]:
+        """returns keys of the records which 'search_async' checks for the 'phrase' (lowercased if case is ignored)"""
+        candidates = self._search_index.candidates(phrase) if self._search_index is not None else None
+        return list(self.data) if candidates is None else candidates
+
+    def _search_chunk(self, keys: list[str], phrase: str, ignore_case: bool) -> list[Record]:
+        """returns the records stored under given 'keys' which contain the 'phrase', removed keys are skipped"""
+        result = []
+        for rec_id in keys:
+            record = self.data.get(rec_id)
+            if record is None:
+                continue
+            for text in self._search_texts(rec_id, record):
+                if ignore_case:
+                    text = text.lower()
+                if phrase in text:
+                    result.append(record)
+                    break
+        return result
+
+    def fuzzy_search(self, name: str, max_distance: int = 2, limit: int | None = 10) -> list[Record]:
+        """
+        searches for records with names similar to given 'name' ignoring case. Every word of the 'name'
+        must be similar to some word of the name of the record, the sum of edit distances
+        (inserted, deleted or replaced letters) of the words must not be greater than 'max_distance'.
+        The index of words is built on the first call and is kept up to date after that
+        @param name: str. Name or its part (for example last name) with possible typos
+        @param max_distance: int. Maximal number of typos
+        @param limit: int. Maximal number of returned records (None means all of them)
+        @return: list of records ordered by the distance and by names
+        """
+        if self._fuzzy_index is None:
+            self._fuzzy_index = _FuzzyIndex()
+            self._add_listener(self._fuzzy_index)
+        return [self.data[key] for key in self._fuzzy_index.find(name, max_distance, limit)]
+
+    def _folded_keys(self) -> list[tuple[str, str]]:
+        """
+        returns sorted (folded key, key) pairs of all the records. The index of them is built
+        on the first call and follows all the changes. The list must not be changed
+        """
+        if self._folded_index is None:
+            self._folded_index = _FoldedKeys()
+            self._add_listener(self._folded_index)
+        return self._folded_index.keys()
 
-            user_name = rec_id
-            user_birthday = str(record.birthday)
-            user_phones = '|'.join(phone.value for phone in record.phones)
+    def find_duplicates(self, by_phone: bool = True, by_name: bool = True) -> list[list[Record]]:
+        """
+        finds groups of records which belong to the same person. By default records are duplicates when they
+        have the same name ignoring case, apostrophes, hyphens and order of words and share a phone number
+        (compared by the last 10 digits, so the country code does not matter). Records are grouped through
+        dictionary of these keys, so the time is linear in the number of records. Groups are not joined
+        through the records having a few phones: such record is put only in the first of its groups
+        @param by_phone: bool. If True then duplicates must share a phone number
+        @param by_name: bool. If True then duplicates must have the same normalized name
+        @return: list of groups of at least two records ordered by names, groups are ordered by their first names
+        """
+        return [[self.data[key] for key in keys] for keys in self._duplicate_keys(by_phone, by_name)]
+
+    def _duplicate_keys(self, by_phone: bool, by_name: bool) -> list[list[str]]:
+        """returns sorted keys of the groups of records found by 'find_duplicates'"""
+        if not by_phone and not by_name:
+            return []
+        blocks = defaultdict(list)  # (normalized name or None, phone key or None) -> keys of records having them
+        with _gc_paused():
+            for key, record in self.data.items():
+                name = _name_key(record.name.value) if by_name else None
+                if by_phone:
+                    for phone in dict.fromkeys(_phone_key(phone.value) for phone in record.phones):
+                        blocks[name, phone].append(key)
+                else:
+                    blocks[name, None].append(key)
+
+        groups, grouped = [], set()
+        for keys in sorted(sorted(keys) for keys in blocks.values() if len(keys) > 1):
+            keys = [key for key in keys if key not in grouped]
+            if len(keys) > 1:
+                grouped.update(keys)
+                groups.append(keys)
+        return sorted(groups)
+
+    def merge_duplicates(self, by_phone: bool = True, by_name: bool = True) -> list[dict]:
+        """
+        merges every group of records found by 'find_duplicates' into one record. The record with
+        the most phones is kept (then the one with birthday, then the first by name). Phones of the other
+        records are added to it in order of their names skipping the numbers it already has, the birthday
+        is taken from the first record having it if the kept record has none. Other records are deleted.
+        Records of different people having the same name are merged too if 'by_phone' is False
+        @param by_phone: bool. If True then duplicates must share a phone number
+        @param by_name: bool. If True then duplicates must have the same normalized name
+        @return: list of reports of the merges: dictionaries with name of the 'kept' record, names of 'merged'
+        records, 'added_phones' and 'dropped_birthdays' (name and birthday of merged records
+        differing from the kept one)
+        """
+        merges = []
+        for keys in self._duplicate_keys(by_phone, by_name):
+            group = [(key, self.data[key]) for key in keys]
+            kept_key, kept = min(group, key=lambda item: (-len(item[1].phones), item[1].birthday is None, item[0]))
+            others = [(key, record) for key, record in group if key != kept_key]
+            phones = [phone.value for phone in kept.phones]
+            known = {_phone_key(number) for number in phones}
+            added_phones = []
+            for _, record in others:
+                for phone in record.phones:
+                    if _phone_key(phone.value) not in known:
+                        known.add(_phone_key(phone.value))
+                        added_phones.append(phone.value)
+            birthdays = [record.birthday.value for _, record in [(kept_key, kept)] + others if record.birthday]
+            birthday = birthdays[0] if birthdays else None
+            merged = Record._from_fields(Name._from_value(kept.name.value),
+                                         Birthday._from_value(birthday) if birthday else None,
+                                         [Phone._from_value(number) for number in phones + added_phones])
+            self[kept_key] = merged
+            for key, _ in others:
+                del self[key]
+            merges.append({'kept': kept_key,
+                           'merged': [key for key, _ in others],
+                           'added_phones': added_phones,
+                           'dropped_birthdays': [(key, record.birthday.value) for key, record in others
+                                                 if record.birthday and record.birthday.value != birthday]})
+        return merges
+
+    def search_parallel(self, phrase: str, ignore_case=True, workers: int = 0) -> list[Record]:
+        """
+        does the same as 'search' in 'workers' processes. On the first call the records are split
+        between the processes which keep them and get only the changes of the book before the next calls.
+        Call 'stop_search_workers' to stop the processes
+        @param phrase: str that we are looking for
+        @param ignore_case: bool. If True then search ignores case of phrase and values
+        @param workers: int. Number of processes (if not given then the number of CPUs is used)
+        @return: list of matching records in the same order as 'search' returns them
+        """
+        workers = workers or os.cpu_count() or 1
+        if self._search_shards is not None and self._search_shards.workers != workers:
+            self.stop_search_workers()
+        if self._search_shards is None:
+            self._search_shards = _SearchShards(workers)
+            self._add_listener(self._search_shards)
+        if not phrase:
+            return []
+        if ignore_case:
+            phrase = phrase.lower()
+        return [self.data[key] for key in self._search_shards.search(phrase, ignore_case)]
+
+    def stop_search_workers(self) -> None:
+        """stops worker processes of 'search_parallel'"""
+        if self._search_shards is not None:
+            self._listeners.remove(self._search_shards)
+            self._search_shards.close()
+            self._search_shards = None
+
+    def find_by_phone(self, phone: str | int) -> list[Record]:
+        """
+        returns records which have given phone number. The number is sanitized as in Phone
+        @param phone: str or int representing phone
+        @return: list of records
+        """
+        number = Phone._sanitize_phone_number(str(phone))
+        if self._phone_index is None:
+            return self._scan_phones(lambda value: value == number)
+        return self._records_by_keys(self._phone_index.exact(number))
 
-            if ignore_case:
-                user_name = user_name.lower()
-                user_birthday = user_birthday.lower()
-                user_phones = user_phones.lower()
-                phrase = phrase.lower()
+    def find_by_phone_prefix(self, prefix: str | int) -> list[Record]:
+        """
+        returns records which have phone numbers starting with given 'prefix'
+        @param prefix: str or int with first digits of phone number
+        @return: list of records ordered by matching phone numbers
+        """
+        prefix = Phone._sanitize_phone_number(str(prefix))
+        if not prefix:
+            return []
+        if self._phone_index is None:
+            return self._scan_phones(lambda value: value.startswith(prefix))
+        return self._records_by_keys(self._phone_index.prefix(prefix))
+
+    def find_by_phone_suffix(self, suffix: str | int) -> list[Record]:
+        """
+        returns records which have phone numbers ending with given 'suffix'
+        @param suffix: str or int with last digits of phone number
+        @return: list of records
+        """
+        suffix = Phone._sanitize_phone_number(str(suffix))
+        if not suffix:
+            return []
+        if self._phone_index is None:
+            return self._scan_phones(lambda value: value.endswith(suffix))
+        return self._records_by_keys(self._phone_index.suffix(suffix))
+
+    def upcoming_birthdays(self, days: int, as_of: date = None) -> list[Record]:
+        """
+        returns records with birthdays in the next 'days' days, i.e. records for which
+        'days_to_birthday' is less than 'days'. Birthdays on 29th of February are on 28th in non-leap years
+        @param days: int. Number of days including the 'as_of' date
+        @param as_of: date from which days are counted. Optional (today if not given)
+        @return: list of records ordered by the date of the next birthday
+        """
+        as_of = as_of or datetime.now().date()
+        if self._birthday_index is None:
+            found = [(record.days_to_birthday(as_of), key, record)
+                     for key, record in self.data.items() if record.birthday]
+            return [record for days_to, _, record in sorted(found, key=lambda item: item[:2]) if days_to < days]
+        return [self.data[key] for key in self._birthday_index.upcoming(days, as_of)]
+
+    def query(self, query: Query) -> list[Record]:
+        """
+        returns records satisfying structured 'query' built of NameQuery, BirthdayQuery and PhoneQuery
+        combined with '&' and '|'. Candidates are got from the most selective index which can be used
+        and checked by the query, all the records are scanned only if there is no such index (see 'explain')
+        @param query: Query. For example
+            NameQuery(starts_with='Ко') & BirthdayQuery(month=3) & PhoneQuery(min_count=2)
+        @return: list of records ordered by names
+        """
+        lookup = self._plan_query(query)
+        if lookup is None:
+            items = self.data.items()
+        else:
+            items = ((key, self.data[key]) for key in dict.fromkeys(lookup.keys()))
+        return [record for key, record in sorted((key, record) for key, record in items if query.matches(key, record))]
+
+    def explain(self, query: Query) -> str:
+        """
+        returns description of the way 'query' method finds the records for given 'query':
+        the index lookup giving the candidates (or scan of all the records) and the filter checking them
+        """
+        lookup = self._plan_query(query)
+        if lookup is None:
+            return f'scan of all {len(self.data)} records\nfilter: {query}'
+        return f'index lookup: {lookup.description} (~{lookup.estimate} records)\nfilter: {query}'
+
+    def _plan_query(self, query: Query) -> _IndexLookup | None:
+        """returns the index lookup with the fewest candidates for the query, or None if records must be scanned"""
+        lookup = min(query._lookups(self), key=lambda lookup: lookup.estimate, default=None)
+        if lookup is None or lookup.estimate >= len(self.data):
+            return None
+        return lookup
+
+    def _scan_phones(self, matches) -> list[Record]:
+        """returns records having phone numbers for which 'matches' returns True (used when there is no phone index)"""
+        return [record for record in self.data.values() if any(matches(phone.value) for phone in record.phones)]
+
+    def _records_by_keys(self, keys: list[str]) -> list[Record]:
+        """returns records with given keys skipping repeated keys"""
+        return [self.data[key] for key in dict.fromkeys(keys)]
+
+    @staticmethod
+    def _search_texts(rec_id: str, record: Record) -> tuple[str, str, str]:
+        """returns texts of the record in which 'search' looks for the phrase: name, birthday and phones"""
+        return rec_id, str(record.birthday), '|'.join(phone.value for phone in record.phones)
+
+
+def _find_segments(text: str | bytes, starts: array, phrase: str | bytes):
+    """
+    creates generator of indexes of the segments of 'text' which contain 'phrase'.
+    Every segment of the text ends with newline, 'starts' are the positions where segments begin
+    """
+    pos = text.find(phrase)
+    while pos != -1:
+        segment = bisect_right(starts, pos) - 1
+        end = starts[segment + 1] - 1 if segment + 1 < len(starts) else len(text) - 1
+        if pos + len(phrase) <= end:
+            yield segment
+            pos = text.find(phrase, end + 1)
+        else:
+            pos = text.find(phrase, pos + 1)
+
+
+class _RecordColumns(MutableMapping):
+    """
+    Storage of records of ColumnarAddressBook in compact columns (struct of arrays).
+    Names are kept in a list, birthdays as ordinals in array, phones of every row as
+    '|'-joined digits in one flat buffer with offsets of the rows in it.
+    Getting the record returns a lightweight Record built from the columns. This Record is linked
+    to the address book, so its changes are written back to the columns. While the Record is used,
+    getting the same key returns it again, so changes made through different references are not lost
+    """
+
+    def __init__(self, book):
+        self._book = book
+        self._rows = {}  # key -> row
+        self._names = []  # row -> key, None for deleted rows
+        self._birthdays = array('i')  # row -> ordinal of birthday, 0 if birthday is not set
+        self._row_segments = array('q')  # row -> number of the segment with phones of the row
+        self._phones = bytearray()  # segments: '|'-joined digits of the phones of a row and newline
+        self._segment_starts = array('q')  # segment -> position of its start in '_phones'
+        self._segment_rows = array('q')  # segment -> row, -1 if the segment is not used anymore
+        self._garbage = 0  # length of the segments which are not used anymore
+        self._names_texts = {}  # ignore_case -> (text, starts) of names for search, built lazily
+        self._views = weakref.WeakValueDictionary()  # key -> Record of the row which is still used
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_names_texts'] = {}
+        del state['_views']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views = weakref.WeakValueDictionary()
+
+    def copy(self, book) -> '_RecordColumns':
+        """returns copy of the columns which belongs to given 'book' and shares no changeable data with them"""
+        columns = self.__class__.__new__(self.__class__)
+        columns.__dict__.update(self.__getstate__())
+        columns._book = book
+        columns._views = weakref.WeakValueDictionary()
+        columns._rows = self._rows.copy()
+        for name in ('_names', '_birthdays', '_row_segments', '_phones', '_segment_starts', '_segment_rows'):
+            setattr(columns, name, getattr(self, name)[:])
+        return columns
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __getitem__(self, key: str) -> Record:
+        return self.record(self._rows[key])
+
+    def __setitem__(self, key: str, record: Record):
+        if self._views and key in self._views:
+            self._views[key] = record  # the old Record of the row is not returned anymore
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._names)
+            self._rows[key] = row
+            self._names.append(key)
+            self._birthdays.append(0)
+            self._row_segments.append(-1)
+            self._names_texts.clear()
+        else:
+            self._drop_segment(row)
+        self._birthdays[row] = record.birthday.value.toordinal() if record.birthday else 0
+        self._row_segments[row] = len(self._segment_starts)
+        self._segment_starts.append(len(self._phones))
+        self._segment_rows.append(row)
+        self._phones += '|'.join(phone.value for phone in record.phones).encode('ascii') + b'\n'
+        if self._garbage > max(len(self._phones) // 2, 1 << 16):
+            self._compact()
+
+    def __delitem__(self, key: str):
+        row = self._rows.pop(key)
+        self._views.pop(key, None)
+        self._drop_segment(row)
+        self._names[row] = None
+        self._birthdays[row] = 0
+        self._names_texts.clear()
+        if len(self._names) > 2 * len(self._rows) + 1024:
+            self._compact()
+
+    def _drop_segment(self, row: int) -> None:
+        segment = self._row_segments[row]
+        self._segment_rows[segment] = -1
+        self._garbage += len(self._segment_phones(segment)) + 1
+
+    def _segment_phones(self, segment: int) -> bytes:
+        end = self._segment_starts[segment + 1] - 1 if segment + 1 < len(self._segment_starts) else -1
+        return self._phones[self._segment_starts[segment]:end]
+
+    def _compact(self) -> None:
+        """removes deleted rows and the segments of phones which are not used anymore"""
+        phones = [self._segment_phones(self._row_segments[row]) for row in self._rows.values()]
+        birthdays = [self._birthdays[row] for row in self._rows.values()]
+        self._names = list(self._rows)
+        self._rows = {key: row for row, key in enumerate(self._names)}
+        self._birthdays = array('i', birthdays)
+        self._row_segments = array('q', range(len(self._names)))
+        self._segment_rows = array('q', range(len(self._names)))
+        self._segment_starts = array('q')
+        position = 0
+        for row_phones in phones:
+            self._segment_starts.append(position)
+            position += len(row_phones) + 1
+        self._phones = bytearray(b''.join(row_phones + b'\n' for row_phones in phones))
+        self._garbage = 0
+        self._names_texts.clear()
+
+    def row_phones(self, row: int) -> list[str]:
+        """returns phone numbers of given row"""
+        phones = self._segment_phones(self._row_segments[row])
+        return phones.decode('ascii').split('|') if phones else []
+
+    def record(self, row: int) -> Record:
+        """returns Record of given row linked to the address book: the one which is still used or a new one"""
+        key = self._names[row]
+        record = self._views.get(key)
+        if record is not None:
+            return record
+        ordinal = self._birthdays[row]
+        record = Record._from_fields(Name._from_value(key),
+                                     Birthday._from_value(date.fromordinal(ordinal)) if ordinal else None,
+                                     [Phone._from_value(number) for number in self.row_phones(row)])
+        record._book, record._key = self._book, key
+        self._views[key] = record
+        return record
+
+    def share(self, key: str, record: Record) -> None:
+        """makes given Record stored under 'key' the one returned for this key while it is used"""
+        self._views[key] = record
+
+    def names_text(self, ignore_case: bool) -> tuple[str, array]:
+        """returns text with names of all the rows (one per line) and positions of the lines in it"""
+        if ignore_case not in self._names_texts:
+            names = [(name or '').lower() if ignore_case else (name or '') for name in self._names]
+            starts, position = array('q'), 0
+            for name in names:
+                starts.append(position)
+                position += len(name) + 1
+            self._names_texts[ignore_case] = (''.join(name + '\n' for name in names), starts)
+        return self._names_texts[ignore_case]
+
+    def search_rows(self, phrase: str, ignore_case: bool) -> list[int]:
+        """returns rows matching the 'phrase' as in AddressBook.search. 'phrase' must be lowercase if ignore_case"""
+        rows = set(_find_segments(*self.names_text(ignore_case), phrase))
+
+        matching_birthdays = set()
+        for ordinal in set(self._birthdays):
+            text = str(Birthday._from_value(date.fromordinal(ordinal))) if ordinal else 'None'
+            if phrase in (text.lower() if ignore_case else text):
+                matching_birthdays.add(ordinal)
+        if matching_birthdays:
+            rows.update(row for row, ordinal in enumerate(self._birthdays)
+                        if ordinal in matching_birthdays and self._names[row] is not None)
+
+        if phrase.isascii():
+            for segment in _find_segments(self._phones, self._segment_starts, phrase.encode('ascii')):
+                if self._segment_rows[segment] != -1:
+                    rows.add(self._segment_rows[segment])
+        return sorted(rows)
+
+    def phone_rows(self, number: str, from_start: bool, to_end: bool) -> list[int]:
+        """
+        returns rows having phone numbers which contain given 'number'. If 'from_start' (or 'to_end')
+        is True then the phone number must start (end) with it
+        """
+        rows, number = set(), number.encode('ascii')
+        pos = self._phones.find(number)
+        while pos != -1:
+            end = pos + len(number)
+            if ((not from_start or pos == 0 or self._phones[pos - 1] in b'|\n')
+                    and (not to_end or self._phones[end] in b'|\n')):
+                row = self._segment_rows[bisect_right(self._segment_starts, pos) - 1]
+                if row != -1:
+                    rows.add(row)
+            pos = self._phones.find(number, pos + 1)
+        return sorted(rows)
+
+    def birthday_rows(self) -> list[tuple[int, date]]:
+        """returns rows with birthdays and the birthdays"""
+        return [(row, date.fromordinal(ordinal)) for row, ordinal in enumerate(self._birthdays) if ordinal]
+
+
+class ColumnarAddressBook(AddressBook):
+    """
+    AddressBook which stores records in compact columns instead of Record objects.
+    Records got from the book are lightweight views built from the columns: their changes are
+    written back to the book. Keys of the records are always their names.
+    Search, phone lookups, birthday queries and printing scan the columns directly,
+    so the book does not keep phone and birthday indexes
+    """
+    _RECORDS_ARE_VIEWS = True
+
+    def __init__(self, search_index: bool = False):
+        super().__init__()
+        self.data = _RecordColumns(self)
+        if search_index:
+            self.enable_search_index()
+
+    def __repr__(self):
+        return f'ColumnarAddressBook({repr(dict(self.data))})'
+
+    def _create_indexes(self) -> None:
+        self._phone_index = self._birthday_index = self._render_cache = None
+        self._sorted_keys = _SortedKeys()
+        self._add_listener(self._sorted_keys)
+
+    def _attach(self, key: str, record: Record) -> None:
+        super()._attach(key, record)
+        self.data.share(key, record)  # so the record and the ones got from the book later are the same
+
+    def _link_records(self) -> None:
+        pass  # records are linked to the book when they are built from columns
+
+    def _snapshot(self) -> _BookSnapshot:
+        snapshot = super()._snapshot()
+        snapshot.state['data'] = self.data.copy(snapshot)
+        return snapshot
+
+    def _records_by_rows(self, rows: list[int]) -> list[Record]:
+        return [self.data.record(row) for row in rows]
+
+    def _get_records_strings(self, start: int = 0, stop: int | None = None) -> list[str]:
+        columns, lines = self.data, []
+        birthdays = {0: ''}  # ordinal -> formatted birthday, computed once for every distinct birthday
+        for i, name in enumerate(self._sorted_keys.keys()[start:stop], start + 1):
+            row = columns._rows[name]
+            ordinal = columns._birthdays[row]
+            if ordinal not in birthdays:
+                birthdays[ordinal] = str(Birthday._from_value(date.fromordinal(ordinal)))
+            line = Record._format_line(name, birthdays[ordinal],
+                                       [Phone._format_number(number) for number in columns.row_phones(row)])
+            lines.append(f'{i:>4} |' + line + '\n')
+        return lines
+
+    def search(self, phrase: str, ignore_case=True) -> list[Record]:
+        if self._search_index is not None or not phrase:
+            return super().search(phrase, ignore_case)
+        if ignore_case:
+            phrase = phrase.lower()
+        return self._records_by_rows(self.data.search_rows(phrase, ignore_case))
+
+    def find_by_phone(self, phone: str | int) -> list[Record]:
+        number = Phone._sanitize_phone_number(str(phone))
+        return self._records_by_rows(self.data.phone_rows(number, True, True)) if number.isdigit() else []
+
+    def find_by_phone_prefix(self, prefix: str | int) -> list[Record]:
+        """returns records which have phone numbers starting with given 'prefix' in order of their insertion"""
+        prefix = Phone._sanitize_phone_number(str(prefix))
+        return self._records_by_rows(self.data.phone_rows(prefix, True, False)) if prefix.isdigit() else []
+
+    def find_by_phone_suffix(self, suffix: str | int) -> list[Record]:
+        suffix = Phone._sanitize_phone_number(str(suffix))
+        return self._records_by_rows(self.data.phone_rows(suffix, False, True)) if suffix.isdigit() else []
+
+    def upcoming_birthdays(self, days: int, as_of: date = None) -> list[Record]:
+        as_of = as_of or datetime.now().date()
+        days_to = {}  # birthday -> days to its next date, computed once for every distinct birthday
+        found = []
+        for row, birthday in self.data.birthday_rows():
+            if birthday not in days_to:
+                next_birthday = _birthday_in_year(birthday, as_of.year)
+                if next_birthday < as_of:
+                    next_birthday = _birthday_in_year(birthday, as_of.year + 1)
+                days_to[birthday] = (next_birthday - as_of).days
+            if days_to[birthday] < days:
+                found.append((days_to[birthday], self.data._names[row], row))
+        return self._records_by_rows([row for _, _, row in sorted(found)])
+
+
+class _StreamedValues(ValuesView):
+    """values view of the storage which streams records with its 'iter_items' method"""
+
+    def __iter__(self):
+        for _, record in self._mapping.iter_items():
+            yield record
+
+
+class _StreamedItems(ItemsView):
+    """items view of the storage which streams records with its 'iter_items' method"""
+
+    def __iter__(self):
+        return self._mapping.iter_items()
+
+
+class _MappedRecords(MutableMapping):
+    """
+    Storage of records of MappedAddressBook. Records are decoded on demand from binary snapshot file
+    mapped to memory. Changed and added records are kept in memory, deleted ones are remembered
+    """
+
+    def __init__(self, book, filename: str):
+        self._book = book
+        with open(filename, 'rb') as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._index_position = _SNAPSHOT_HEADER.unpack_from(self._map)
+        if magic != _SNAPSHOT_MAGIC:
+            self._map.close()
+            raise ValueError(f'{filename} is not a snapshot of address book')
+        self._changed = {}  # key -> record added or changed after the snapshot was opened
+        self._deleted = set()  # keys of the records of the snapshot which are deleted
+        self._added = 0  # number of keys in '_changed' which are not in the snapshot
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _name(self, position: int) -> str:
+        name_length = _RECORD_HEADER.unpack_from(self._map, position)[0]
+        start = position + _RECORD_HEADER.size
+        return self._map[start:start + name_length].decode('utf-8')
+
+    def _decode_values(self, position: int) -> tuple[str, int, list[str], int]:
+        """
+        decodes record at given 'position' without building its fields and returns its key,
+        ordinal of birthday (0 if not set), phone numbers and position of the next record
+        """
+        name_length, ordinal, phones_number = _RECORD_HEADER.unpack_from(self._map, position)
+        position += _RECORD_HEADER.size
+        key = self._map[position:position + name_length].decode('utf-8')
+        position += name_length
+        phones = []
+        for _ in range(phones_number):
+            phone_length = _PHONE_HEADER.unpack_from(self._map, position)[0]
+            position += _PHONE_HEADER.size
+            phones.append(self._map[position:position + phone_length].decode('ascii'))
+            position += phone_length
+        return key, ordinal, phones, position
+
+    def _decode(self, position: int) -> tuple[str, Record, int]:
+        """decodes record at given 'position' and returns its key, record and position of the next record"""
+        key, ordinal, phones, position = self._decode_values(position)
+        record = Record._from_fields(Name._from_value(key),
+                                     Birthday._from_value(date.fromordinal(ordinal)) if ordinal else None,
+                                     [Phone._from_value(phone) for phone in phones])
+        record._book, record._key = self._book, key
+        return key, record, position
+
+    def _index_entry(self, i: int) -> int:
+        return struct.unpack_from('<Q', self._map, self._index_position + 8 * i)[0]
+
+    def _find(self, key: str) -> int | None:
+        """returns position of the record with given 'key' in the snapshot using binary search over the index"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name(self._index_entry(middle)) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._name(self._index_entry(low)) == key:
+            return self._index_entry(low)
+        return None
+
+    def _in_snapshot(self, key: str) -> bool:
+        return key not in self._deleted and self._find(key) is not None
+
+    def __len__(self):
+        return self._count - len(self._deleted) + self._added
+
+    def __contains__(self, key):
+        return key in self._changed or self._in_snapshot(key)
+
+    def __getitem__(self, key: str) -> Record:
+        if key in self._changed:
+            return self._changed[key]
+        position = self._find(key) if key not in self._deleted else None
+        if position is None:
+            raise KeyError(key)
+        return self._decode(position)[1]
+
+    def __setitem__(self, key: str, record: Record):
+        if key not in self._changed:
+            if key in self._deleted:
+                self._deleted.discard(key)
+            elif self._find(key) is None:
+                self._added += 1
+        self._changed[key] = record
+
+    def __delitem__(self, key: str):
+        in_snapshot = self._in_snapshot(key)
+        if key in self._changed:
+            del self._changed[key]
+            if not in_snapshot:
+                self._added -= 1
+        elif not in_snapshot:
+            raise KeyError(key)
+        if in_snapshot:
+            self._deleted.add(key)
+
+    def __iter__(self):
+        for key, _ in self.iter_items():
+            yield key
+
+    def values(self):
+        return _StreamedValues(self)
+
+    def items(self):
+        return _StreamedItems(self)
+
+    def iter_items(self):
+        """
+        creates generator of (key, record) pairs: records of the snapshot decoded one by one
+        in the order they were saved and then records added after the snapshot was opened
+        """
+        position = _SNAPSHOT_HEADER.size
+        while position < self._index_position:
+            key, record, position = self._decode(position)
+            if key in self._changed:
+                yield key, self._changed[key]
+            elif key not in self._deleted:
+                yield key, record
+        for key, record in self._changed.items():
+            if self._find(key) is None:
+                yield key, record
+
+    def iter_values(self):
+        """
+        creates generator of (key, ordinal of birthday, phone numbers) of the records in the order of 'iter_items'.
+        Records of the snapshot are not built, so scanning all of them is much cheaper than 'iter_items'
+        """
+        position = _SNAPSHOT_HEADER.size
+        while position < self._index_position:
+            key, ordinal, phones, position = self._decode_values(position)
+            if key in self._changed:
+                yield self._record_values(key, self._changed[key])
+            elif key not in self._deleted:
+                yield key, ordinal, phones
+        for key, record in self._changed.items():
+            if self._find(key) is None:
+                yield self._record_values(key, record)
+
+    @staticmethod
+    def _record_values(key: str, record: Record) -> tuple[str, int, list[str]]:
+        ordinal = record.birthday.value.toordinal() if record.birthday else 0
+        return key, ordinal, [phone.value for phone in record.phones]
+
+    def search_keys(self, phrase: str, ignore_case: bool) -> list[str]:
+        """returns keys of the records matching 'phrase' (lowercase if 'ignore_case') like AddressBook.search does"""
+        keys = []
+        birthday_matches = {0: phrase in ('none' if ignore_case else 'None')}  # ordinal -> whether its text matches
+        for key, ordinal, phones in self.iter_values():
+            if ordinal not in birthday_matches:
+                birthday_matches[ordinal] = phrase in date.fromordinal(ordinal).strftime('%d.%m.%Y')
+            if (birthday_matches[ordinal] or phrase in (key.lower() if ignore_case else key)
+                    or phrase in '|'.join(phones)):  # numbers have no letters, so their case does not matter
+                keys.append(key)
+        return keys
+
+    def _changed_and_hidden(self) -> tuple[list[str], list[str]]:
+        """returns sorted keys of the changed records and of the records of the snapshot which are deleted or changed"""
+        changed = sorted(self._changed)
+        return changed, sorted(self._deleted.union(key for key in changed if self._find(key) is not None))
+
+    def position(self, key: str, after: bool = False) -> int:
+        """
+        returns position of given 'key' among the sorted keys of the records: the number of the keys
+        less than 'key' (or not greater than it if 'after'). The key does not have to be in the book
+        """
+        changed, hidden = self._changed_and_hidden()
+        find = bisect_right if after else bisect_left
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            name = self._name(self._index_entry(middle))
+            if name < key or after and name == key:
+                low = middle + 1
+            else:
+                high = middle
+        return low - find(hidden, key) + find(changed, key)
+
+    def sorted_items(self, start: int = 0):
+        """
+        creates generator of (key, record) pairs sorted by keys using the index of the snapshot
+        starting from the pair at position 'start'. The position is found by binary search over the index,
+        so the records before it are not decoded
+        """
+        changed, hidden = self._changed_and_hidden()
+
+        def live_before(i: int) -> int:  # number of records of the snapshot before position 'i' of the index
+            return i - (bisect_left(hidden, self._name(self._index_entry(i))) if i < self._count else len(hidden))
+
+        low, high = 0, self._count
+        while low < high:  # the first position of the index with 'start' or more pairs before its key
+            middle = (low + high) // 2
+            if live_before(middle) + bisect_left(changed, self._name(self._index_entry(middle))) < start:
+                low = middle + 1
+            else:
+                high = middle
+
+        def from_snapshot():
+            for i in range(low, self._count):
+                key, record, _ = self._decode(self._index_entry(i))
+                if key not in self._deleted and key not in self._changed:
+                    yield key, record
+
+        changed = [(key, self._changed[key]) for key in changed[start - live_before(low):]]
+        return merge(from_snapshot(), changed, key=lambda item: item[0])
+
+
+class MappedAddressBook(AddressBook):
+    """
+    AddressBook opened from binary snapshot file (see AddressBook.snapshot_dump) via mmap.
+    Opening does not depend on the size of the book: records are decoded only when they are
+    accessed. Records are looked up by name with binary search over the index of the snapshot.
+    Changes are kept in memory, save them with snapshot_dump. Keys of the records are always their names.
+    The book does not keep phone and birthday indexes
+    """
+    _RECORDS_ARE_VIEWS = True
 
-            if (phrase in user_name
-                    or phrase in user_birthday
-                    or phrase in user_phones):
-                result.append(record)
+    def __init__(self, filename: str = '', search_index: bool = False):
+        super().__init__()
+        self.data = _MappedRecords(self, filename or self.SNAPSHOT_FILE)
+        if search_index:
+            self.enable_search_index()
+
+    def __repr__(self):
+        return f'MappedAddressBook({repr(dict(self.data.items()))})'
+
+    def __getstate__(self):
+        raise TypeError('MappedAddressBook cannot be pickled. Save it with snapshot_dump')
+
+    def _create_indexes(self) -> None:
+        self._phone_index = self._birthday_index = self._render_cache = self._sorted_keys = None
+
+    def _get_records_strings(self, start: int = 0, stop: int | None = None) -> list[str]:
+        items = islice(self.data.sorted_items(start), None if stop is None else max(stop - start, 0))
+        return [f'{i:>4} |' + str(record) + '\n' for i, (_, record) in enumerate(items, start + 1)]
+
+    def _page_items(self, after_key: str | None, count: int, descending: bool) -> list[tuple[str, Record]]:
+        data = self.data
+        if descending:
+            stop = len(data) if after_key is None else data.position(after_key)
+            start = max(stop - count, 0)
+            return list(islice(data.sorted_items(start), stop - start))[::-1]
+        start = 0 if after_key is None else data.position(after_key, after=True)
+        return list(islice(data.sorted_items(start), count))
+
+    def search(self, phrase: str, ignore_case=True) -> list[Record]:
+        if self._search_index is not None or not phrase:
+            return super().search(phrase, ignore_case)
+        if ignore_case:
+            phrase = phrase.lower()
+        return [self.data[key] for key in self.data.search_keys(phrase, ignore_case)]
+
+    def upcoming_birthdays(self, days: int, as_of: date = None) -> list[Record]:
+        as_of = as_of or datetime.now().date()
+        days_to = {}  # ordinal of birthday -> days to its next date, computed once for every distinct birthday
+        found = []
+        for key, ordinal, _ in self.data.iter_values():
+            if not ordinal:
+                continue
+            if ordinal not in days_to:
+                birthday = date.fromordinal(ordinal)
+                next_birthday = _birthday_in_year(birthday, as_of.year)
+                if next_birthday < as_of:
+                    next_birthday = _birthday_in_year(birthday, as_of.year + 1)
+                days_to[ordinal] = (next_birthday - as_of).days
+            if days_to[ordinal] < days:
+                found.append((days_to[ordinal], key))
+        return [self.data[key] for _, key in sorted(found)]
+
+    def close(self) -> None:
+        """closes snapshot file. The book cannot be used after that"""
+        self.data.close()
+
+
+class _LazyRecords(MutableMapping):
+    """
+    Storage of LazyAddressBook: keeps dictionaries loaded from json file and replaces them
+    with validated Records when they are accessed for the first time
+    """
+
+    def __init__(self, book, users: list[dict]):
+        self._book = book
+        self._items = {user['name']: user for user in users}  # key -> raw dictionary or Record
+        self._texts = {}  # key -> texts searched by AddressBook.search computed from raw dictionary
+        self.errors = {}  # key -> error of the raw dictionary which could not be built into Record
+
+    def __getitem__(self, key: str) -> Record:
+        item = self._items[key]
+        if type(item) is dict:
+            item = self._items[key] = AddressBook._record_from_dict(item)
+            self._texts.pop(key, None)
+            self._book._attach(key, item)
+        return item
+
+    def __setitem__(self, key: str, record: Record):
+        self._items[key] = record
+        self._texts.pop(key, None)
+        self.errors.pop(key, None)
+
+    def __delitem__(self, key: str):
+        del self._items[key]
+        self._texts.pop(key, None)
+        self.errors.pop(key, None)
+
+    def drop_raw(self, key: str) -> bool:
+        """
+        deletes the item under 'key' if its Record is not built yet, so invalid data can be deleted
+        or replaced without building it. Returns True if the item was deleted
+        """
+        if type(self._items.get(key)) is not dict:
+            return False
+        del self[key]
+        return True
+
+    def built(self, keys: list[str]) -> list[Record]:
+        """returns Records of given 'keys' skipping the ones which cannot be built, their errors are kept"""
+        records = []
+        for key in keys:
+            try:
+                records.append(self[key])
+            except (ValueError, TypeError, KeyError) as error:
+                self.errors[key] = f'{type(error).__name__}: {error}'
+        return records
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def hydrated(self) -> int:
+        """number of records which were built from the raw dictionaries"""
+        return sum(1 for item in self._items.values() if type(item) is not dict)
+
+    @staticmethod
+    def _birthday_text(birthday: str | None) -> str:
+        """
+        returns raw birthday as str(Birthday) of the built record shows it, e.g. '01.02.1990' for '1.2.1990'.
+        Invalid text is returned as it is, such record is skipped by the search when it is built
+        """
+        if not birthday:
+            return 'None'
+        try:
+            return _parse_date(birthday).strftime('%d.%m.%Y')
+        except (TypeError, ValueError):
+            return str(birthday)
+
+    def search_keys(self, phrase: str, ignore_case: bool) -> list[str]:
+        """
+        returns keys of records matching the phrase as AddressBook.search does. Raw dictionaries
+        are searched without building Records, their texts are the same as texts of the records built from them
+        """
+        keys = []
+        for key, item in self._items.items():
+            if type(item) is dict:
+                texts = self._texts.get(key)
+                if texts is None:
+                    phones = '|'.join(Phone._sanitize_phone_number(str(phone)) for phone in item.get('phones') or ())
+                    texts = self._texts[key] = (key, self._birthday_text(item.get('birthday')), phones)
+            else:
+                texts = AddressBook._search_texts(key, item)
+            for text in texts:
+                if ignore_case:
+                    text = text.lower()
+                if phrase in text:
+                    keys.append(key)
+                    break
+        return keys
+
+
+class LazyAddressBook(AddressBook):
+    """
+    AddressBook loaded from json file without building Records: 'json_load' keeps the parsed dictionaries,
+    and a Record is built and validated when it is accessed by key, returned by 'search' or by iteration.
+    Invalid data in the file raises the error when its record is built. The book does not keep phone,
+    birthday and printing indexes, so phone and birthday queries and printing of the whole book build all the records.
+    Invalid data can be deleted or replaced without building it, 'search' skips it and keeps its errors in 'errors'
+    """
+
+    def __init__(self, search_index: bool = False):
+        super().__init__()
+        self.data = _LazyRecords(self, [])
+        if search_index:
+            self.enable_search_index()
+
+    def __repr__(self):
+        return f'LazyAddressBook({repr(dict(self.data.items()))})'
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['data'] = self._pack_records(self.data.items())
+        state['_format'] = _PICKLE_FORMAT
+        return state
+
+    def __setstate__(self, state):
+        records = self._unpack_records(state.pop('data'), state.pop('_format', 1))
+        state['data'] = _LazyRecords(self, [])
+        state['data']._items.update(records)
+        super().__setstate__(state)
+
+    def _create_indexes(self) -> None:
+        self._phone_index = self._birthday_index = self._render_cache = self._sorted_keys = None
+
+    def __setitem__(self, key: str, record: Record):
+        if self.data.drop_raw(key):
+            self._raw_removed(key)
+        super().__setitem__(key, record)
+
+    def __delitem__(self, key: str):
+        if self.data.drop_raw(key):
+            self._raw_removed(key)
+        else:
+            super().__delitem__(key)
+
+    def _raw_removed(self, key: str) -> None:
+        # while some data is not built only the listeners which do not need records (sorted keys) can be added
+        for listener in self._listeners:
+            listener.record_removed(key, None)
+
+    @property
+    def errors(self) -> dict[str, str]:
+        """key -> error of the invalid data skipped by 'search'"""
+        return dict(self.data.errors)
+
+    def _link_records(self) -> None:
+        for key, item in self.data._items.items():
+            if type(item) is not dict:
+                self._attach(key, item)
+
+    @classmethod
+    def json_load(cls, filename: str = ''):
+        """
+        loads and returns LazyAddressBook object from json file with given 'filename'.
+        Only parsing of the file is done, Records are built when they are used
+        :param filename: str. Optional (if not given then 'self.JSON_FILE' is used)
+        :return: restored LazyAddressBook object
+        """
+        filename = filename or cls.JSON_FILE
+        with open(filename, 'r', encoding='utf-8') as fh:
+            unpacked = json.load(fh)
+        address_book = cls()
+        address_book.data = _LazyRecords(address_book, unpacked)
+        return address_book
+
+    def _get_records_strings(self, start: int = 0, stop: int | None = None) -> list[str]:
+        data = self.data
+        return [f'{i:>4} |' + str(data[key]) + '\n'
+                for i, key in enumerate(self._sorted_key_list()[start:stop], start + 1)]
+
+    def search(self, phrase: str, ignore_case=True) -> list[Record]:
+        if self._search_index is not None or not phrase:
+            return super().search(phrase, ignore_case)
+        if ignore_case:
+            phrase = phrase.lower()
+        return self.data.built(self.data.search_keys(phrase, ignore_case))
+
+
+_SQLITE_SCHEMA = """
+PRAGMA journal_mode = WAL;
+PRAGMA foreign_keys = ON;
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,  -- order of insertion
+    name TEXT NOT NULL UNIQUE,
+    birthday INTEGER,  -- ordinal of the date, NULL if not set
+    birth_month INTEGER,
+    birth_day INTEGER,
+    birthday_text TEXT NOT NULL,  -- birthday as it is searched by AddressBook.search
+    phones TEXT NOT NULL  -- '|'-joined phone numbers
+);
+CREATE INDEX IF NOT EXISTS records_birthday ON records (birth_month, birth_day);
+CREATE TABLE IF NOT EXISTS phones (
+    record_id INTEGER NOT NULL REFERENCES records (id) ON DELETE CASCADE,
+    number TEXT NOT NULL,
+    reversed_number TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phones_record ON phones (record_id);
+CREATE INDEX IF NOT EXISTS phones_number ON phones (number);
+CREATE INDEX IF NOT EXISTS phones_reversed_number ON phones (reversed_number);
+"""
+
+
+def _close_connection(connection: sqlite3.Connection) -> None:
+    connection.commit()
+    connection.close()
+
+
+class _SQLiteRecords(MutableMapping):
+    """
+    Storage of records of SQLiteAddressBook in SQLite database. Getting the record returns
+    Record built from the row. Every change is committed at once unless it is done inside 'batch' block,
+    so the write lock of the database is held only for short transactions.
+    The connection may be used by any thread (the async loaders open it in the executor), the lock
+    lets only one of them use it at once and keeps other threads out of the running 'batch' block
+    """
+    PAGE_SIZE = 1000
+    COLUMNS = 'name, birthday, phones'
+
+    def __init__(self, book, filename: str):
+        self._book = book
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._connection.create_function('fold', 1, str.lower, deterministic=True)
+        self._connection.executescript(_SQLITE_SCHEMA)
+        self._batches = 0  # number of 'batch' blocks which are running, changes are committed when the last one ends
+        # the changes are committed and the database is closed even if the book is dropped without close()
+        self._finalizer = weakref.finalize(self, _close_connection, self._connection)
+
+    def record(self, row: tuple) -> Record:
+        """builds Record from the row of COLUMNS linked to the address book"""
+        key, ordinal, phones = row
+        record = Record._from_fields(Name._from_value(key),
+                                     Birthday._from_value(date.fromordinal(ordinal)) if ordinal else None,
+                                     [Phone._from_value(number) for number in phones.split('|') if number])
+        record._book, record._key = self._book, key
+        return record
+
+    def select(self, condition: str = '', parameters=(), order: str = 'id', limit: int = -1,
+               offset: int = 0) -> list[Record]:
+        """returns records from the rows matching SQL 'condition' ('limit' -1 means all of them)"""
+        query = f'SELECT {self.COLUMNS} FROM records {f"WHERE {condition}" if condition else ""} ORDER BY {order}'
+        if limit >= 0 or offset:
+            query += ' LIMIT ? OFFSET ?'
+            parameters = (*parameters, limit, offset)
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+        return [self.record(row) for row in rows]
+
+    def name_at(self, position: int) -> str | None:
+        """returns name which is at given 'position' in the names sorted by the index of names"""
+        with self._lock:
+            row = self._connection.execute('SELECT name FROM records ORDER BY name LIMIT 1 OFFSET ?',
+                                           (position,)).fetchone()
+        return row[0] if row else None
+
+    def _written(self) -> None:
+        if not self._batches:
+            self._connection.commit()
+
+    @contextmanager
+    def batch(self):
+        """makes all the changes inside the block in one transaction which is committed when the block ends"""
+        with self._lock:
+            self._batches += 1
+            try:
+                yield
+            finally:
+                self._batches -= 1
+                self._written()
+
+    def commit(self) -> None:
+        with self._lock:
+            self._connection.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM records')
+            self._written()
+
+    def close(self) -> None:
+        with self._lock:
+            self._finalizer()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT count(*) FROM records').fetchone()[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._connection.execute('SELECT 1 FROM records WHERE name = ?', (key,)).fetchone() is not None
+
+    def __getitem__(self, key: str) -> Record:
+        records = self.select('name = ?', (key,))
+        if not records:
+            raise KeyError(key)
+        return records[0]
+
+    def __setitem__(self, key: str, record: Record):
+        birthday = record.birthday.value if record.birthday else None
+        numbers = [phone.value for phone in record.phones]
+        with self._lock:
+            record_id = self._connection.execute(
+                'INSERT INTO records (name, birthday, birth_month, birth_day, birthday_text, phones) '
+                'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET birthday = excluded.birthday, '
+                'birth_month = excluded.birth_month, birth_day = excluded.birth_day, '
+                'birthday_text = excluded.birthday_text, phones = excluded.phones RETURNING id',
+                (key, birthday.toordinal() if birthday else None, birthday.month if birthday else None,
+                 birthday.day if birthday else None, str(record.birthday), '|'.join(numbers))).fetchone()[0]
+            self._connection.execute('DELETE FROM phones WHERE record_id = ?', (record_id,))
+            self._connection.executemany('INSERT INTO phones (record_id, number, reversed_number) VALUES (?, ?, ?)',
+                                         [(record_id, number, number[::-1]) for number in numbers])
+            self._written()
+
+    def __delitem__(self, key: str):
+        with self._lock:
+            if not self._connection.execute('DELETE FROM records WHERE name = ?', (key,)).rowcount:
+                raise KeyError(key)
+            self._written()
+
+    def __iter__(self):
+        for key, _ in self.iter_items():
+            yield key
+
+    def values(self):
+        return _StreamedValues(self)
+
+    def items(self):
+        return _StreamedItems(self)
+
+    def iter_items(self, condition: str = '', parameters=()):
+        """
+        creates generator of (key, record) pairs in order of insertion. Rows are read by pages
+        of PAGE_SIZE, so the records may be changed during the iteration
+        """
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    f'SELECT id, {self.COLUMNS} FROM records WHERE id > ? {f"AND ({condition})" if condition else ""} '
+                    f'ORDER BY id LIMIT {self.PAGE_SIZE}', (last_id, *parameters)).fetchall()
+            for row in rows:
+                yield row[1], self.record(row[1:])
+            if len(rows) < self.PAGE_SIZE:
+                break
+            last_id = rows[-1][0]
+
+
+class SQLiteAddressBook(AddressBook):
+    """
+    AddressBook which stores records in SQLite database file instead of memory,
+    so the same book can be used by a few processes. Search, phone lookups, birthday queries
+    and printing are done by SQL queries using the indexes of the database.
+    Every change is committed at once, so the other processes see it and can write too. Make many changes
+    inside 'with book.batch():' block to commit them together. Keys of the records are always their names
+    """
+    DATABASE_FILE = 'address_book.db'
+    _RECORDS_ARE_VIEWS = True
+
+    def __init__(self, filename: str = '', search_index: bool = False):
+        super().__init__()
+        self.data = _SQLiteRecords(self, filename or self.DATABASE_FILE)
+        if search_index:
+            self.enable_search_index()
+
+    def __repr__(self):
+        return f'SQLiteAddressBook({repr(dict(self.data.items()))})'
+
+    def __getstate__(self):
+        raise TypeError('SQLiteAddressBook cannot be pickled. It is saved in the database')
+
+    def _create_indexes(self) -> None:
+        self._phone_index = self._birthday_index = self._render_cache = self._sorted_keys = None
+
+    def commit(self) -> None:
+        """commits all the changes to the database (the ones made inside running 'batch' block)"""
+        self.data.commit()
+
+    def batch(self):
+        """
+        returns context manager which makes all the changes inside its block in one transaction.
+        It is much faster for many changes, but other processes cannot write until the block ends
+        """
+        return self.data.batch()
+
+    def add_records_bulk(self, rows) -> list[tuple[int, str]]:
+        with self.batch():
+            return super().add_records_bulk(rows)
+
+    def close(self) -> None:
+        """commits all the changes and closes the database. The book cannot be used after that"""
+        self.data.close()
+
+    def _get_records_strings(self, start: int = 0, stop: int | None = None) -> list[str]:
+        limit = -1 if stop is None else max(stop - start, 0)
+        if start:  # the first name is found by the index of names only, then the page is read from it
+            name = self.data.name_at(start)
+            records = self.data.select('name >= ?', (name,), order='name', limit=limit) if name is not None else []
+        else:
+            records = self.data.select(order='name', limit=limit)
+        return [f'{i:>4} |' + str(record) + '\n' for i, record in enumerate(records, start + 1)]
+
+    def _page_items(self, after_key: str | None, count: int, descending: bool) -> list[tuple[str, Record]]:
+        if after_key is None:
+            records = self.data.select(order='name DESC' if descending else 'name', limit=count)
+        else:
+            records = self.data.select('name < ?' if descending else 'name > ?', (after_key,),
+                                       order='name DESC' if descending else 'name', limit=count)
+        return [(record.name.value, record) for record in records]
+
+    def search(self, phrase: str, ignore_case=True) -> list[Record]:
+        if self._search_index is not None or not phrase:
+            return super().search(phrase, ignore_case)
+        if ignore_case:
+            phrase = phrase.lower()
+            condition = 'instr(fold(name), ?) OR instr(lower(birthday_text), ?) OR instr(phones, ?)'
+        else:
+            condition = 'instr(name, ?) OR instr(birthday_text, ?) OR instr(phones, ?)'
+        return [record for _, record in self.data.iter_items(condition, (phrase,) * 3)]
+
+    def _select_by_phones(self, column: str, start: str, whole: bool) -> list[Record]:
+        condition = f'{column} = ?' if whole else f'{column} >= ? AND {column} < ?'
+        parameters = (start,) if whole else (start, start + ':')  # ':' follows digits in ASCII
+        return self.data.select(f'id IN (SELECT record_id FROM phones WHERE {condition})', parameters)
+
+    def find_by_phone(self, phone: str | int) -> list[Record]:
+        return self._select_by_phones('number', Phone._sanitize_phone_number(str(phone)), True)
+
+    def find_by_phone_prefix(self, prefix: str | int) -> list[Record]:
+        """returns records which have phone numbers starting with given 'prefix' in order of their insertion"""
+        prefix = Phone._sanitize_phone_number(str(prefix))
+        return self._select_by_phones('number', prefix, False) if prefix else []
+
+    def find_by_phone_suffix(self, suffix: str | int) -> list[Record]:
+        suffix = Phone._sanitize_phone_number(str(suffix))
+        return self._select_by_phones('reversed_number', suffix[::-1], False) if suffix else []
+
+    def upcoming_birthdays(self, days: int, as_of: date = None) -> list[Record]:
+        as_of = as_of or datetime.now().date()
+        result = []
+        for buckets in _birthday_buckets(days, as_of):
+            if buckets:
+                condition = ' OR '.join('(birth_month = ? AND birth_day = ?)' for _ in buckets)
+                result.extend(self.data.select(condition, [number for bucket in buckets for number in bucket], 'name'))
         return result
 
+    def json_dump(self, filename: str = '') -> None:
+        """
+        saves current AddressBook object in json file with given 'filename'.
+        Records are read from the database and written one by one
+        :param filename: str. Optional (if not given then 'self.JSON_FILE' is used)
+        :return: None
+        """
+        filename = filename or self.JSON_FILE
+        with atomic_write(filename, encoding='utf-8') as fh:
+            fh.write('[')
+            for i, record in enumerate(self.data.values()):
+                fh.write(',\n' if i else '\n')
+                text = json.dumps(self._record_to_dict(record), ensure_ascii=False, indent=4)
+                fh.write(textwrap.indent(text, '    '))
+            fh.write('\n]' if self.data else ']')
+
+    @classmethod
+    def json_load(cls, filename: str = '', database: str = ''):
+        """
+        loads records from json file with given 'filename' to the database file 'database'
+        and returns the book. Records which were in the database are deleted, the records
+        are written in one transaction
+        :param filename: str. Optional (if not given then 'self.JSON_FILE' is used)
+        :param database: str. Optional (if not given then 'self.DATABASE_FILE' is used)
+        @rtype: SQLiteAddressBook
+        """
+        filename = filename or cls.JSON_FILE
+        with open(filename, 'r', encoding='utf-8') as fh:
+            unpacked = json.load(fh)
+        address_book = cls(database)
+        with address_book.batch():
+            address_book.data.clear()
+            for user in unpacked:
+                address_book.add_record(cls._record_from_dict(user))
+        return address_book
+
+    @classmethod
+    async def json_load_async(cls, filename: str = '', database: str = ''):
+        """
+        does the same as 'json_load' in the default executor of the event loop, so the loop is not blocked.
+        The database is opened in the executor too, the book can be used in any thread after that
+        :param filename: str. Optional (if not given then 'self.JSON_FILE' is used)
+        :param database: str. Optional (if not given then 'self.DATABASE_FILE' is used)
+        @rtype: SQLiteAddressBook
+        """
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(None, cls.json_load, filename, database)
+
+
+class _RWLock:
+    """
+    Readers-writer lock: many threads may hold it for reading at once, a writer holds it alone.
+    Waiting writers go before new readers, so readers cannot starve them. The thread holding the lock
+    may take it again (the writer for reading or writing, a reader for reading)
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None  # ident of the thread holding the lock for writing
+        self._depth = 0  # times the writer took the lock
+        self._writers_waiting = 0
+        self._local = threading.local()  # 'reads' - times the current thread took the lock for reading
+
+    @contextmanager
+    def read(self):
+        local = self._local
+        with self._condition:
+            if self._writer != threading.get_ident() and not getattr(local, 'reads', 0):
+                while self._writer is not None or self._writers_waiting:
+                    self._condition.wait()
+            self._readers += 1
+            local.reads = getattr(local, 'reads', 0) + 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                local.reads -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._depth += 1
+            else:
+                if getattr(self._local, 'reads', 0):
+                    raise RuntimeError('Lock held for reading cannot be taken for writing')
+                self._writers_waiting += 1
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+                self._writers_waiting -= 1
+                self._writer, self._depth = me, 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._condition.notify_all()
+
+    def held_for_writing(self) -> bool:
+        """tells whether the current thread holds the lock for writing"""
+        return self._writer == threading.get_ident()
+
+
+class ThreadSafeAddressBook(AddressBook):
+    """
+    AddressBook which can be shared by threads. Changes take the readers-writer lock of the book for writing,
+    searches and lookups take it for reading, so many threads read at once and never see half-done changes.
+    Iteration goes over the snapshot of the records taken when it starts and does not hold the lock.
+    Records stored in the book must be changed with 'edit': it changes a copy of the record and puts
+    the copy into the book at once, so threads which got the old record keep seeing it unchanged.
+    Changing the fields or phones of the stored record in any other way raises RuntimeError
+    """
+
+    def __init__(self, search_index: bool = False):
+        self._lock = _RWLock()
+        self._records = None  # snapshot of the records for iteration, dropped on every change
+        super().__init__(search_index)
+
+    def __repr__(self):
+        return f'ThreadSafeAddressBook({repr(self.data)})'
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        del state['_lock'], state['_records']
+        return state
+
+    def __setstate__(self, state):
+        self._lock = _RWLock()
+        self._records = None
+        super().__setstate__(state)
+
+    def _records_snapshot(self) -> tuple[Record, ...]:
+        records = self._records
+        if records is None:
+            with self._lock.read():
+                records = self._records = tuple(self.data.values())
+        return records
+
+    def __iter__(self):
+        """creating generator which returns pages of the snapshot of the records taken at the start"""
+        records, size = self._records_snapshot(), self.number_records_return
+        for start in range(0, len(records) - len(records) % size, size):
+            yield list(records[start:start + size])
+        yield list(records[len(records) - len(records) % size:])
+
+    async def __aiter__(self):
+        """creating async generator which returns the same pages as __iter__ and lets other tasks run between them"""
+        import asyncio
+        for page in self:
+            yield page
+            await asyncio.sleep(0)
+
+    @contextmanager
+    def edit(self, key: str):
+        """
+        gives the copy of the record stored under 'key' to change any of its fields. When the block ends
+        without errors the copy replaces the record at once. The book is locked for writing inside the block
+        """
+        with self._lock.write():
+            record = self.data[key]
+            birthday = record.birthday
+            copy = Record._from_fields(Name._from_value(record.name.value),
+                                       Birthday._from_value(birthday.value) if birthday is not None else None,
+                                       [Phone._from_value(phone.value) for phone in record.phones])
+            yield copy
+            self[key] = copy
+
+    def __setitem__(self, key: str, record: Record):
+        with self._lock.write():
+            self._records = None
+            super().__setitem__(key, record)
+
+    def __delitem__(self, key: str):
+        with self._lock.write():
+            self._records = None
+            super().__delitem__(key)
+
+    def _record_changing(self, key: str, record: Record) -> None:
+        if not self._lock.held_for_writing():  # other threads may be reading the record now
+            raise RuntimeError(f"Record '{key}' of ThreadSafeAddressBook must be changed with edit('{key}')")
+
+    def _record_changed(self, key: str, record: Record) -> None:
+        with self._lock.write():
+            self._records = None
+            super()._record_changed(key, record)
+
+    def _add_listener(self, listener) -> None:
+        with self._lock.write():
+            super()._add_listener(listener)
+
+    def disable_search_index(self) -> None:
+        with self._lock.write():
+            super().disable_search_index()
+
+    def add_records_bulk(self, rows) -> list[tuple[int, str]]:
+        with self._lock.write():
+            self._records = None
+            return super().add_records_bulk(rows)
+
+    def add_fake_records(self, quantity: int, seed: int | None = None, workers: int = 1):
+        with self._lock.write():  # phones are added to the records which are already in the book
+            super().add_fake_records(quantity, seed, workers)
+
+    def open_journal(self, filename: str = '', sync: bool = False) -> None:
+        with self._lock.write():
+            super().open_journal(filename, sync)
+
+    def close_journal(self) -> None:
+        with self._lock.write():
+            super().close_journal()
+
+    # lazy indexes and caches are updated by the queries below, so they need the lock for writing
+
+    def page(self, after: str | None = None, limit: int = 0, order: str = 'name') -> tuple[list[Record], str | None]:
+        with self._lock.write():
+            return super().page(after, limit, order)
+
+    def _get_records_strings(self, start: int = 0, stop: int | None = None) -> list[str]:
+        with self._lock.write():
+            return super()._get_records_strings(start, stop)
+
+    def find_by_phone_prefix(self, prefix: str | int) -> list[Record]:
+        with self._lock.write():
+            return super().find_by_phone_prefix(prefix)
+
+    def find_by_phone_suffix(self, suffix: str | int) -> list[Record]:
+        with self._lock.write():
+            return super().find_by_phone_suffix(suffix)
+
+    def fuzzy_search(self, name: str, max_distance: int = 2, limit: int | None = 10) -> list[Record]:
+        with self._lock.write():
+            return super().fuzzy_search(name, max_distance, limit)
+
+    def search_parallel(self, phrase: str, ignore_case=True, workers: int = 0) -> list[Record]:
+        with self._lock.write():
+            return super().search_parallel(phrase, ignore_case, workers)
+
+    def stop_search_workers(self) -> None:
+        with self._lock.write():
+            super().stop_search_workers()
+
+    def find_duplicates(self, by_phone: bool = True, by_name: bool = True) -> list[list[Record]]:
+        with self._lock.read():
+            return super().find_duplicates(by_phone, by_name)
+
+    def merge_duplicates(self, by_phone: bool = True, by_name: bool = True) -> list[dict]:
+        with self._lock.write():
+            return super().merge_duplicates(by_phone, by_name)
+
+    def query(self, query: Query) -> list[Record]:
+        with self._lock.write():
+            return super().query(query)
+
+    def explain(self, query: Query) -> str:
+        with self._lock.write():
+            return super().explain(query)
+
+    def search(self, phrase: str, ignore_case=True) -> list[Record]:
+        with self._lock.read():
+            return super().search(phrase, ignore_case)
+
+    def find_by_phone(self, phone: str | int) -> list[Record]:
+        with self._lock.read():
+            return super().find_by_phone(phone)
+
+    def upcoming_birthdays(self, days: int, as_of: date = None) -> list[Record]:
+        with self._lock.read():
+            return super().upcoming_birthdays(days, as_of)
+
+    def json_dump(self, filename: str = '') -> None:
+        with self._lock.read():
+            super().json_dump(filename)
+
+    def ndjson_dump(self, filename: str = '') -> None:
+        with self._lock.read():
+            super().ndjson_dump(filename)
+
+    def snapshot_dump(self, filename: str = '') -> None:
+        with self._lock.read():
+            super().snapshot_dump(filename)
+
+    # the async methods take what they need under the lock, the lock is never held while they wait
+
+    def _json_list(self) -> list[dict]:
+        with self._lock.read():
+            return super()._json_list()
+
+    def _snapshot(self) -> _BookSnapshot:
+        with self._lock.read():
+            return super()._snapshot()
+
+    def _search_keys(self, phrase: str) -> list[str]:
+        with self._lock.read():
+            return super()._search_keys(phrase)
+
+    def _search_chunk(self, keys: list[str], phrase: str, ignore_case: bool) -> list[Record]:
+        with self._lock.read():
+            return super()._search_chunk(keys, phrase, ignore_case)
+
+    def pickle_dump(self, filename: str = '') -> None:
+        snapshot = self._snapshot()
+        with open(filename or self.BINARY_FILE, 'wb') as fh:
+            pickle.dump(snapshot, fh, pickle.HIGHEST_PROTOCOL)
+
+
+class _Metrics:
+    """
+    Opt-in instrumentation of AddressBook operations and validation of fields. When it is enabled
+    the measured methods of AddressBook and its subclasses and the 'value' setters of Name, Phone
+    and Birthday are replaced with wrappers; disabling puts the original ones back, so nothing
+    is measured and nothing is paid for when metrics are off
+    """
+    METHODS = ('search', 'add_record', 'json_dump', 'json_load', 'pickle_dump', 'pickle_load', 'page', '__iter__')
+    FIELDS = (Name, Phone, Birthday)
+    BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)  # upper bounds of latency histogram in seconds
+
+    def __init__(self):
+        self._originals = []  # (class, attribute name, original attribute) replaced by wrappers
+        self._hook = None
+        self._lock = threading.Lock()
+        self._active = threading.local()  # operations running in the thread, nested calls are not counted
+        self._stats = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._originals)
+
+    def enable(self, hook=None) -> None:
+        self.disable()
+        self._hook = hook
+        classes, pending = [], [AddressBook]
+        while pending:
+            cls = pending.pop()
+            classes.append(cls)
+            pending.extend(cls.__subclasses__())
+        for cls in classes:
+            for name in self.METHODS:
+                if name in vars(cls):
+                    self._replace(cls, name, self._wrap_method(cls, name, vars(cls)[name]))
+        for cls in self.FIELDS:
+            prop = vars(cls)['value']
+            wrapped = self._measured(f'{cls.__name__}.value', prop.fset)
+            self._replace(cls, 'value', property(prop.fget, wrapped, prop.fdel, prop.__doc__))
+
+    def disable(self) -> None:
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals.clear()
+        self._hook = None
+
+    def _replace(self, cls, name: str, attribute) -> None:
+        self._originals.append((cls, name, vars(cls)[name]))
+        setattr(cls, name, attribute)
+
+    def _wrap_method(self, cls, name: str, method):
+        if name == '__iter__':
+            return self._measured_pages(method)
+        if isinstance(method, classmethod):  # loaders: the size of the file is measured before loading
+            default_file = 'JSON_FILE' if name.startswith('json') else 'BINARY_FILE'
+            return classmethod(self._measured(name, method.__func__, default_file, before=True))
+        if name.endswith('_dump'):
+            return self._measured(name, method, 'JSON_FILE' if name.startswith('json') else 'BINARY_FILE')
+        return self._measured(name, method)
+
+    @staticmethod
+    def _file_size(args: tuple, kwargs: dict, default_file: str) -> int:
+        filename = args[1] if len(args) > 1 else kwargs.get('filename')
+        try:
+            return os.path.getsize(filename or getattr(args[0], default_file))
+        except OSError:
+            return 0
+
+    def _measured(self, operation: str, func, default_file: str = '', before: bool = False):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            active = self._active.__dict__
+            if active.get(operation):
+                return func(*args, **kwargs)
+            active[operation] = True
+            size = self._file_size(args, kwargs, default_file) if default_file and before else 0
+            failed = True
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                active[operation] = False
+                if default_file and not before:
+                    size = self._file_size(args, kwargs, default_file)
+                self.record(operation, elapsed, size, failed)
+        return wrapper
+
+    def _measured_pages(self, method):
+        @wraps(method)
+        def wrapper(book):
+            pages = method(book)
+            while True:
+                start = time.perf_counter()
+                try:
+                    page = next(pages)
+                except StopIteration:
+                    return
+                self.record('iter_page', time.perf_counter() - start)
+                yield page
+        return wrapper
+
+    def record(self, operation: str, seconds: float, size: int = 0, failed: bool = False) -> None:
+        """adds one call of the operation to the statistics and passes it to the hook"""
+        with self._lock:
+            stat = self._stats.get(operation)
+            if stat is None:
+                stat = self._stats[operation] = {'calls': 0, 'errors': 0, 'total_time': 0.0, 'max_time': 0.0,
+                                                 'bytes': 0, 'histogram': [0] * (len(self.BUCKETS) + 1)}
+            stat['calls'] += 1
+            stat['errors'] += failed
+            stat['total_time'] += seconds
+            stat['max_time'] = max(stat['max_time'], seconds)
+            stat['bytes'] += size
+            stat['histogram'][bisect_left(self.BUCKETS, seconds)] += 1
+        if self._hook is not None:
+            try:
+                self._hook(operation, seconds, size, failed)
+            except Exception as error:  # error of the hook must not fail the measured operation
+                warnings.warn(f'metrics hook failed on {operation}: {type(error).__name__}: {error}', RuntimeWarning)
+
+    def stats(self) -> dict:
+        labels = [f'<={bound:g}s' for bound in self.BUCKETS] + [f'>{self.BUCKETS[-1]:g}s']
+        with self._lock:
+            return {operation: {**stat, 'histogram': dict(zip(labels, stat['histogram']))}
+                    for operation, stat in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+_metrics = _Metrics()
+
 
 if __name__ == '__main__':
     # ALL THE TESTS ARE IN SEPARATE FILES
@@ -430,6 +4012,29 @@ if __name__ == '__main__':
     from Tests.test_pickle_dump_and_pickle_load_functions import test as test5
     from Tests.test_json_dump_and_json_load_functions import test as test6
     from Tests.test_search_method import test as test7
+    from Tests.test_search_index import test as test8
+    from Tests.test_phone_index import test as test9
+    from Tests.test_upcoming_birthdays import test as test10
+    from Tests.test_ndjson_dump_and_ndjson_load_functions import test as test11
+    from Tests.test_slots_and_pickle_compatibility import test as test12
+    from Tests.test_columnar_address_book import test as test13
+    from Tests.test_journal import test as test14
+    from Tests.test_mapped_address_book import test as test15
+    from Tests.test_sqlite_address_book import test as test16
+    from Tests.test_add_records_bulk import test as test17
+    from Tests.test_seeded_fake_records import test as test18
+    from Tests.test_render_page import test as test19
+    from Tests.test_search_parallel import test as test20
+    from Tests.test_async_api import test as test21
+    from Tests.test_fuzzy_search import test as test22
+    from Tests.test_thread_safe_address_book import test as test23
+    from Tests.test_metrics import test as test24
+    from Tests.test_lazy_json_load import test as test25
+    from Tests.test_compact_pickle import test as test26
+    from Tests.test_query import test as test27
+    from Tests.test_duplicates import test as test28
+    from Tests.test_keyset_pages import test as test29
+    from Tests.test_cli import test as test30
 
     test4()
     test1()
@@ -438,3 +4043,26 @@ if __name__ == '__main__':
     test5()
     test6()
     test7()
+    test8()
+    test9()
+    test10()
+    test11()
+    test12()
+    test13()
+    test14()
+    test15()
+    test16()
+    test17()
+    test18()
+    test19()
+    test20()
+    test21()
+    test22()
+    test23()
+    test24()
+    test25()
+    test26()
+    test27()
+    test28()
+    test29()
+    test30()
@@ -0,0 +1,184 @@
+"""
+Command line interface of the address book kept in json file. Run it from the root of the repository:
+
+    python cli.py add "Олена Петренко" --phone 0671234567 --birthday 17.05.1990
+    python cli.py search Петренко
+    python cli.py birthdays --days 7
+    python cli.py show --page 2 --size 20
+    python cli.py --file contacts.json --timing show
+
+The json file stays the main copy of the book. Next to it the binary snapshot of the book is kept
+(see AddressBook.snapshot_dump) together with the size, modification time and hash of the json file
+it was made from. The book is opened from the snapshot with MappedAddressBook without reading all the
+records; the json file is loaded again only when its hash has changed
+"""
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from functools import partial
+
+from assistant import AddressBook, Birthday, MappedAddressBook, Name, Phone, Record, atomic_write
+
+CACHE_SUFFIX = '.cache'  # snapshot of the book is saved to 'address_book.json.cache'
+META_SUFFIX = '.meta'  # and the description of the json file it was made from to 'address_book.json.cache.meta'
+
+
+def _file_hash(filename: str) -> str:
+    digest = hashlib.blake2b()
+    with open(filename, 'rb') as fh:
+        for chunk in iter(partial(fh.read, 1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_meta(filename: str) -> dict:
+    try:
+        with open(filename, 'r', encoding='utf-8') as fh:
+            meta = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return meta if type(meta) is dict else {}
+
+
+def _write_meta(json_file: str, stat: os.stat_result, digest: str) -> None:
+    cache_file = json_file + CACHE_SUFFIX
+    meta = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest,
+            'cache_size': os.path.getsize(cache_file)}
+    with atomic_write(cache_file + META_SUFFIX, encoding='utf-8') as fh:
+        json.dump(meta, fh)
+
+
+def _cache_is_valid(cache_file: str, meta: dict) -> bool:
+    try:
+        return os.path.getsize(cache_file) == meta.get('cache_size')
+    except OSError:
+        return False
+
+
+def save_cache(book: AddressBook, json_file: str, digest: str = '') -> None:
+    """saves the snapshot of the 'book' loaded from or saved to 'json_file' and the description of the file"""
+    stat = os.stat(json_file)
+    book.snapshot_dump(json_file + CACHE_SUFFIX)
+    _write_meta(json_file, stat, digest or _file_hash(json_file))
+
+
+def open_book(json_file: str) -> tuple[AddressBook, str]:
+    """
+    opens the book saved in 'json_file' from its snapshot. The snapshot is trusted while the size
+    and modification time of the json file are the same. Otherwise the hash of the file is compared:
+    if only the time has changed the description is updated, else the snapshot is made again
+    :return: tuple of the book and how it was opened: 'cache', 'revalidated', 'rebuilt' or 'new' (no json file)
+    """
+    try:
+        stat = os.stat(json_file)
+    except FileNotFoundError:
+        return AddressBook(), 'new'
+    cache_file = json_file + CACHE_SUFFIX
+    meta = _read_meta(cache_file + META_SUFFIX)
+    how = 'cache'
+    if not _cache_is_valid(cache_file, meta):
+        how = 'rebuilt'
+    elif (meta.get('size'), meta.get('mtime_ns')) != (stat.st_size, stat.st_mtime_ns):
+        digest = _file_hash(json_file)
+        how = 'revalidated' if meta.get('hash') == digest else 'rebuilt'
+        if how == 'revalidated':
+            _write_meta(json_file, stat, digest)
+    if how == 'rebuilt':
+        save_cache(AddressBook.json_load(json_file), json_file)
+    try:
+        return MappedAddressBook(cache_file), how
+    except ValueError:  # the snapshot is damaged although its size is right
+        save_cache(AddressBook.json_load(json_file), json_file)
+        return MappedAddressBook(cache_file), 'rebuilt'
+
+
+def save_book(book: AddressBook, json_file: str) -> None:
+    """
+    saves the book to 'json_file' and makes its snapshot, so the next start does not load the json file.
+    Both files are replaced only when they are written completely
+    """
+    book.json_dump(json_file)
+    save_cache(book, json_file)
+
+
+def _date(text: str):
+    try:
+        return datetime.strptime(text, '%d.%m.%Y').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{text!r} is not a date in format DD.MM.YYYY') from None
+
+
+def _print_records(records: list[Record]) -> None:
+    lines = [f'{i:>4} |' + str(record) + '\n' for i, record in enumerate(records, 1)]
+    print(AddressBook._render_table(lines), end='')
+
+
+def run_command(book: AddressBook, args: argparse.Namespace) -> bool:
+    """runs the command given in 'args' on the 'book' and returns True if the book was changed"""
+    if args.command == 'add':
+        if args.name in book:
+            record = book[args.name]
+        else:
+            record = Record(Name(args.name))
+            book.add_record(record)
+        for number in args.phone:
+            record.add_phone(Phone(number))
+        if args.birthday:
+            record.birthday = Birthday(args.birthday)
+        print(f'Saved: {record.name.value}')
+        return True
+    if args.command == 'search':
+        _print_records(book.search(args.phrase, ignore_case=not args.match_case))
+    elif args.command == 'birthdays':
+        _print_records(book.upcoming_birthdays(args.days))
+    elif args.command == 'show':
+        print(book.render_page(args.page, args.size), end='')
+    return False
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Address book')
+    parser.add_argument('--file', default=AddressBook.JSON_FILE, help='json file of the book')
+    parser.add_argument('--timing', action='store_true', help='print time of the start to stderr')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='add contact or phones and birthday to existing one')
+    add.add_argument('name')
+    add.add_argument('--phone', action='append', default=[], help='phone number, may be given a few times')
+    add.add_argument('--birthday', type=_date, help='date in format DD.MM.YYYY')
+    search = commands.add_parser('search', help='find contacts by part of name, birthday or phone')
+    search.add_argument('phrase')
+    search.add_argument('--match-case', action='store_true')
+    birthdays = commands.add_parser('birthdays', help='contacts having birthday in the next days')
+    birthdays.add_argument('--days', type=int, default=7)
+    show = commands.add_parser('show', help='show one page of all the contacts sorted by names')
+    show.add_argument('--page', type=int, default=1)
+    show.add_argument('--size', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    imported = time.perf_counter()
+    book, how = open_book(args.file)
+    if args.timing:
+        opened = time.perf_counter()
+        print(f'Started in {(opened - _START) * 1000:.1f} ms: imports {(imported - _START) * 1000:.1f} ms, '
+              f'book opened in {(opened - imported) * 1000:.1f} ms ({how})', file=sys.stderr)
+    try:
+        if run_command(book, args):
+            save_book(book, args.file)
+    except (ValueError, TypeError) as error:
+        print(f'Error: {error}', file=sys.stderr)
+        return 1
+    finally:
+        if isinstance(book, MappedAddressBook):
+            book.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())